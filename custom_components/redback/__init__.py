@@ -3,9 +3,24 @@ from __future__ import annotations
 
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
+import homeassistant.helpers.config_validation as cv
+from homeassistant.helpers.event import async_track_time_change
+from homeassistant.helpers.typing import ConfigType
 
 from .const import DOMAIN, PLATFORMS, LOGGER
-from .coordinator import RedbackDataUpdateCoordinator
+from .coordinator import RedbackDataUpdateCoordinator, energy_store, token_store
+from .metrics import async_get_metrics
+from .services import async_setup_services
+from .session import async_close_pool
+from .websocket import async_setup_websocket
+
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
+
+async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
+    """Set up the Redback services and websocket commands."""
+    async_setup_services(hass)
+    async_setup_websocket(hass)
+    return True
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up Redback from a config entry."""
@@ -16,22 +31,51 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     # 1. calls into Redback API every SCAN_INTERVAL to download and refresh data cache
     # 2. then calls each entity to update its own data from cache
     coordinator = RedbackDataUpdateCoordinator(hass, entry)
+    await coordinator.async_restore_token()
+    await coordinator.async_restore_energy()
+    entry.async_on_unload(
+        async_track_time_change(hass, coordinator.async_rollover_periods, hour=0, minute=0, second=0)
+    )
+    entry.async_on_unload(coordinator.async_cancel_token_refresh)
     await coordinator.async_config_entry_first_refresh()
+    coordinator.async_start_polling()
     hass.data[DOMAIN][entry.entry_id] = coordinator
 
     LOGGER.info("New Redback integration is setup (entry_id=%s)", entry.entry_id)
 
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
 
+    entry.async_on_unload(entry.add_update_listener(async_update_options))
+
     return True
 
+async def async_update_options(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Apply changed Redback options: intervals live, derived metrics by reloading the config entry."""
+    coordinator: RedbackDataUpdateCoordinator = hass.data[DOMAIN][entry.entry_id]
+    if coordinator.requires_reload(entry.options):
+        await hass.config_entries.async_reload(entry.entry_id)
+    else:
+        coordinator.async_apply_options(entry.options)
+        LOGGER.debug("Applied new Redback options (entry_id=%s)", entry.entry_id)
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload Redback config entry."""
     if unload_ok := await hass.config_entries.async_unload_platforms(entry, PLATFORMS):
-        hass.data[DOMAIN].pop(entry.entry_id)
+        coordinator = hass.data[DOMAIN].pop(entry.entry_id)
+        await coordinator.async_close_archive()
+        await coordinator.async_save_energy()
+        async_get_metrics(hass).remove(entry.entry_id)
+        # the connection pool is shared by all entries, close it with the last one
+        if not hass.data[DOMAIN]:
+            await async_close_pool(hass)
 
     return unload_ok
 
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Remove Redback config entry data kept outside the entry (persisted bearer token and energy totals)."""
+    await token_store(hass, entry.entry_id).async_remove()
+    await energy_store(hass, entry.entry_id).async_remove()
+
 async def async_migrate_entry(hass, entry: ConfigEntry):
     """Migrate outdated Redback config entry."""
     LOGGER.debug("Migrating config entry from version %s", entry.version)
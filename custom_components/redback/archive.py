@@ -0,0 +1,240 @@
+"""Columnar, memory-mapped archive of the raw dynamic snapshots, one file per site and local day.
+
+Requires numpy, which is only imported when the archive is enabled.
+"""
+from __future__ import annotations
+
+import json
+from collections.abc import Mapping
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from .buffer import AGGREGATES
+
+# rows per day file, one sample every 10 seconds (the minimum poll interval)
+DAY_CAPACITY = 8640
+TIME_DTYPE = np.dtype(np.float64)
+VALUE_DTYPE = np.dtype(np.float32)
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+class ArchiveDay:
+    """One day of samples: a float64 time column followed by a float32 column per field.
+
+    Every column is capacity rows long, so a row is located without an index and a read
+    only touches the pages of the requested columns and rows. The file is created sparse
+    and unused rows are never written (zero time), missing values of used rows are NaN.
+    Fields first seen during the day are added as columns at the end of the file. The
+    fields are listed in a JSON sidecar file.
+    """
+
+    def __init__(self, path: Path, fields: list[str], capacity: int, mode: str) -> None:
+        self.path = path
+        self.capacity = capacity
+        self._mode = mode
+        self._map(fields)
+        # rows are appended in time order, unused rows have a zero time
+        self.count = int(np.count_nonzero(self.times > 0))
+
+    def _map(self, fields: list[str]) -> None:
+        self.fields = fields
+        self._index = {field: i for i, field in enumerate(fields)}
+        self.times = np.memmap(self.path, TIME_DTYPE, self._mode, 0, (self.capacity,))
+        self.values = np.memmap(
+            self.path, VALUE_DTYPE, "r" if self._mode == "r" else "r+", self.capacity * TIME_DTYPE.itemsize, (len(fields), self.capacity)
+        )
+
+    def _size(self, fields: list[str]) -> int:
+        return self.capacity * (TIME_DTYPE.itemsize + len(fields) * VALUE_DTYPE.itemsize)
+
+    @classmethod
+    def create(cls, path: Path, fields: list[str], capacity: int = DAY_CAPACITY) -> ArchiveDay:
+        """Create an empty day file (sparse where the filesystem allows, nothing is written)"""
+        with open(path, "wb") as file:
+            file.truncate(capacity * (TIME_DTYPE.itemsize + len(fields) * VALUE_DTYPE.itemsize))
+        path.with_suffix(".json").write_text(json.dumps({"fields": fields, "capacity": capacity}))
+        return cls(path, fields, capacity, "r+")
+
+    @classmethod
+    def open(cls, path: Path, mode: str = "r+") -> ArchiveDay:
+        header = json.loads(path.with_suffix(".json").read_text())
+        return cls(path, header["fields"], header["capacity"], mode)
+
+    def add_fields(self, fields: list[str]) -> None:
+        """Add columns for new fields, NaN in the rows written so far"""
+        if not (new := [field for field in fields if field not in self._index]):
+            return
+        self.flush()
+        fields = self.fields + new
+        with open(self.path, "r+b") as file:
+            file.truncate(self._size(fields))
+        # the sidecar is written last, readers never see columns the file doesn't have yet
+        self.path.with_suffix(".json").write_text(json.dumps({"fields": fields, "capacity": self.capacity}))
+        self._map(fields)
+        self.values[len(fields) - len(new):, :self.count] = np.nan
+
+    def append(self, timestamp: float, snapshot: Mapping[str, Any]) -> bool:
+        """Store a sample, False when the file is full or timestamp isn't after the last sample"""
+        if self.count >= self.capacity or (self.count and timestamp <= self.times[self.count - 1]):
+            return False
+        if new := [field for field, value in snapshot.items() if field not in self._index and _is_number(value)]:
+            self.add_fields(sorted(new))
+        row = self.count
+        for field, i in self._index.items():
+            value = snapshot.get(field)
+            self.values[i, row] = value if _is_number(value) else np.nan
+        # the time is written last, readers only see complete rows
+        self.times[row] = timestamp
+        self.count += 1
+        return True
+
+    def read(self, start: float, end: float, fields: list[str]) -> tuple[np.ndarray, dict[str, np.ndarray]]:
+        """Returns the times in [start, end) and the matching rows of fields (NaN for unknown fields)"""
+        times = self.times[:self.count]
+        lo, hi = np.searchsorted(times, [start, end])
+        columns = {
+            field: np.array(self.values[self._index[field], lo:hi], dtype=np.float64)
+            if field in self._index else np.full(hi - lo, np.nan)
+            for field in fields
+        }
+        return np.array(times[lo:hi]), columns
+
+    def flush(self) -> None:
+        self.times.flush()
+        self.values.flush()
+
+
+class SnapshotArchive:
+    """Appends the snapshots of one site to day files (named after the local date) and reads ranges back.
+
+    A new day file starts with the columns of the previous day and the numeric fields of its
+    first snapshot, fields first seen later are added as they come. Files older than
+    retention days are deleted when a new day starts. All methods do file I/O.
+    """
+
+    def __init__(self, directory: str | Path, retention: int, capacity: int = DAY_CAPACITY) -> None:
+        self.directory = Path(directory)
+        self.retention = retention
+        self.capacity = capacity
+        self.day: date | None = None
+        self._file: ArchiveDay | None = None
+
+    def _path(self, day: date) -> Path:
+        return self.directory / f"{day.isoformat()}.bin"
+
+    def append(self, timestamp: float, day: date, snapshot: Mapping[str, Any]) -> None:
+        """Archive a snapshot taken at timestamp (epoch seconds) on the local date day"""
+        if day != self.day:
+            self._rotate(day, snapshot)
+        self._file.append(timestamp, snapshot)
+
+    def _rotate(self, day: date, snapshot: Mapping[str, Any]) -> None:
+        # a field missing from the first snapshot of the day still gets its column
+        previous = self.fields()
+        self.close()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self._path(day)
+        if path.exists():
+            # restarted during the day
+            self._file = ArchiveDay.open(path)
+        else:
+            fields = sorted(set(previous).union(key for key, value in snapshot.items() if _is_number(value)))
+            self._file = ArchiveDay.create(path, fields, self.capacity)
+        self.day = day
+        self.purge(day)
+
+    def purge(self, today: date) -> None:
+        """Delete the day files older than the retention"""
+        oldest = today - timedelta(days=self.retention)
+        for path in self.directory.glob("*.bin"):
+            try:
+                expired = date.fromisoformat(path.stem) < oldest
+            except ValueError:
+                continue
+            if expired:
+                path.unlink(missing_ok=True)
+                path.with_suffix(".json").unlink(missing_ok=True)
+
+    def days(self) -> list[date]:
+        """Dates of the archived days, oldest first"""
+        days = []
+        for path in self.directory.glob("*.bin"):
+            try:
+                days.append(date.fromisoformat(path.stem))
+            except ValueError:
+                continue
+        return sorted(days)
+
+    def fields(self) -> list[str]:
+        """Fields of the current day file"""
+        return list(self._file.fields) if self._file is not None else []
+
+    def query(
+        self, start: float, end: float, fields: list[str] | None, interval: float, aggregate: str = "mean"
+    ) -> dict[str, Any]:
+        """Aggregate fields (default: those of the current day) over buckets of interval seconds between start and end.
+
+        Only the requested rows and columns are read from the day files. Returns the bucket
+        start times (epoch seconds) and one list of values per field, None for empty buckets.
+        """
+        if aggregate not in AGGREGATES:
+            raise ValueError(f"Unknown aggregate {aggregate}")
+        fields = fields or self.fields()
+        # day files are named after local dates, allow a day either side for timezone differences
+        first = date.fromtimestamp(start) - timedelta(days=1)
+        last = date.fromtimestamp(end) + timedelta(days=1)
+        times, columns = [], {field: [] for field in fields}
+        for day in self.days():
+            if not first <= day <= last:
+                continue
+            # the current day file is shared through the page cache, unflushed rows are visible
+            day_times, day_columns = ArchiveDay.open(self._path(day), "r").read(start, end, fields)
+            times.append(day_times)
+            for field in fields:
+                columns[field].append(day_columns[field])
+
+        if not times or not sum(len(t) for t in times):
+            return {"timestamps": [], "values": {field: [] for field in fields}}
+        times = np.concatenate(times)
+        buckets = ((times - start) // interval).astype(np.int64)
+        starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+        return {
+            "timestamps": (start + buckets[starts] * interval).tolist(),
+            "values": {
+                field: _to_list(_reduce(np.concatenate(columns[field]), starts, aggregate))
+                for field in fields
+            },
+        }
+
+    def close(self) -> None:
+        """Flush the current day file"""
+        if self._file is not None:
+            self._file.flush()
+            self._file = None
+            self.day = None
+
+
+def _reduce(values: np.ndarray, starts: np.ndarray, aggregate: str) -> np.ndarray:
+    """Aggregate the groups of values starting at the indices starts, ignoring NaN"""
+    valid = ~np.isnan(values)
+    if aggregate == "mean":
+        sums = np.add.reduceat(np.where(valid, values, 0.0), starts)
+        counts = np.add.reduceat(valid.astype(np.int64), starts)
+        return np.divide(sums, counts, out=np.full(len(starts), np.nan), where=counts > 0)
+    if aggregate == "min":
+        return np.fmin.reduceat(values, starts)
+    if aggregate == "max":
+        return np.fmax.reduceat(values, starts)
+    # last: the value of the last valid row of each group
+    last = np.maximum.reduceat(np.where(valid, np.arange(len(values)), -1), starts)
+    return np.where(last >= starts, values[np.maximum(last, 0)], np.nan)
+
+
+def _to_list(values: np.ndarray) -> list[float | None]:
+    return [None if np.isnan(value) else round(value, 6) for value in values.tolist()]
@@ -0,0 +1,102 @@
+"""In-memory sample ring buffer for the Redback integration."""
+from __future__ import annotations
+
+from array import array
+from collections.abc import Iterator, Mapping
+from math import isnan, nan
+from typing import Any
+
+AGGREGATES = ["mean", "min", "max", "last"]
+
+
+class SampleRingBuffer:
+    """Fixed-capacity ring buffer of recent dynamic snapshots.
+
+    Numeric fields are stored column-wise in preallocated float arrays (NaN marks a
+    missing value), so appending a sample never allocates once a field has been seen.
+    Non-numeric fields (e.g. Status, InverterMode) only keep their latest value.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = capacity
+        self._times = array("d", [nan]) * capacity
+        self._columns: dict[str, array] = {}
+        self._head = 0  # next write position
+        self._count = 0
+        self.latest: Mapping[str, Any] | None = None
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def fields(self) -> list[str]:
+        """Numeric fields held by the buffer"""
+        return list(self._columns)
+
+    def append(self, timestamp: float, snapshot: Mapping[str, Any]) -> None:
+        """Store a snapshot taken at timestamp (seconds, monotonically increasing)"""
+        i = self._head
+        self._times[i] = timestamp
+        for key, column in self._columns.items():
+            value = snapshot.get(key)
+            column[i] = value if _is_number(value) else nan
+        for key, value in snapshot.items():
+            if key not in self._columns and _is_number(value):
+                column = self._columns[key] = array("d", [nan]) * self.capacity
+                column[i] = value
+        self._head = (i + 1) % self.capacity
+        self._count = min(self._count + 1, self.capacity)
+        self.latest = snapshot
+
+    def _indices(self, since: float | None = None) -> Iterator[int]:
+        """Yields buffer positions in chronological order, newer than since"""
+        start = (self._head - self._count) % self.capacity
+        for n in range(self._count):
+            i = (start + n) % self.capacity
+            if since is None or self._times[i] > since:
+                yield i
+
+    def values(self, key: str, since: float | None = None) -> list[float]:
+        """Returns the non-missing values of a numeric field, oldest first"""
+        column = self._columns.get(key)
+        if column is None:
+            return []
+        return [column[i] for i in self._indices(since) if not isnan(column[i])]
+
+    def samples(self, since: float | None = None) -> list[tuple[float, dict[str, float]]]:
+        """Returns (timestamp, numeric fields) pairs, oldest first"""
+        return [
+            (self._times[i], {key: column[i] for key, column in self._columns.items() if not isnan(column[i])})
+            for i in self._indices(since)
+        ]
+
+    def columns(
+        self, fields: list[str] | None = None, since: float | None = None
+    ) -> tuple[list[float], dict[str, list[float | None]]]:
+        """Returns the timestamps and, column-wise, the numeric fields (None where missing), oldest first"""
+        indices = list(self._indices(since))
+        columns = {
+            key: [None if isnan(column[i]) else column[i] for i in indices]
+            for key, column in self._columns.items()
+            if fields is None or key in fields
+        }
+        return [self._times[i] for i in indices], columns
+
+    def aggregate(self, key: str, aggregate: str, since: float | None = None) -> float | None:
+        """Returns mean/min/max/last of a numeric field over the samples newer than since"""
+        values = self.values(key, since)
+        if not values:
+            return None
+        if aggregate == "mean":
+            return sum(values) / len(values)
+        if aggregate == "min":
+            return min(values)
+        if aggregate == "max":
+            return max(values)
+        if aggregate == "last":
+            return values[-1]
+        raise ValueError(f"Unknown aggregate {aggregate}")
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
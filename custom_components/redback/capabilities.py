@@ -0,0 +1,71 @@
+"""Which dynamic data fields a site actually reports, from its static data and the snapshots seen so far."""
+from __future__ import annotations
+
+from collections.abc import Iterable, Mapping
+from typing import Any
+
+# fields only reported by sites with a battery
+BATTERY_FIELDS = {"BatterySoCInstantaneous0to1", "BatteryPowerNegativeIsChargingkW"}
+# fields also reported per phase, as '<field>_<phase id>'
+PHASE_FIELDS = {"VoltageInstantaneousV", "CurrentInstantaneousA", "PowerFactorInstantaneousMinus1to1"}
+
+
+class SiteCapabilities:
+    """Per-site map of the supported fields.
+
+    A field is unsupported when it's a battery field and the site has no battery, a phase
+    field of a phase the site doesn't have, or not measured (DynamicDataMetadata) and
+    without a value in every snapshot seen so far: fields the cloud calculates (often PV
+    power and load energy) are supported once it fills them in. Support is only ever
+    added, so a transient None can't remove a field. Unknowns (no metadata, BatteryCount
+    or phases, e.g. with the private API) count as supported.
+    """
+
+    def __init__(
+        self,
+        measured: Mapping[str, bool | None] | None = None,
+        battery_count: int | None = None,
+        phases: Iterable[str] | None = None,
+        reported: Iterable[str] = (),
+    ) -> None:
+        self.measured = dict(measured or {})
+        self.battery_count = battery_count
+        self.phases = list(phases) if phases is not None else None
+        # fields seen with a value
+        self.reported = set(reported)
+
+    @classmethod
+    def from_site(
+        cls, inverter_info: Mapping[str, Any] | None, phases: Iterable[str] | None, reported: Iterable[str] = ()
+    ) -> SiteCapabilities:
+        inverter_info = inverter_info or {}
+        return cls(inverter_info.get("DynamicDataMeasured"), inverter_info.get("BatteryCount"), phases, reported)
+
+    @property
+    def has_battery(self) -> bool:
+        return self.battery_count is None or self.battery_count > 0
+
+    def observe(self, snapshot: Mapping[str, Any]) -> set[str]:
+        """Record the fields of snapshot that have a value, returns the not measured ones seen for the first time"""
+        seen = {field for field in self.measured if field not in self.reported and snapshot.get(field) is not None}
+        self.reported.update(seen)
+        return {field for field in seen if self.measured[field] is False}
+
+    def supports(self, field: str) -> bool:
+        """True unless the site is known not to report field (so far)"""
+        base, _, phase = field.rpartition("_")
+        if base in PHASE_FIELDS:
+            if self.phases is not None and phase not in self.phases:
+                return False
+            field = base
+        if field in BATTERY_FIELDS and not self.has_battery:
+            return False
+        return self.measured.get(field) is not False or field in self.reported
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "battery_count": self.battery_count,
+            "phases": self.phases,
+            "calculated": sorted(field for field, measured in self.measured.items() if measured is False and field in self.reported),
+            "unreported": sorted(field for field, measured in self.measured.items() if measured is False and field not in self.reported),
+        }
@@ -6,13 +6,37 @@ from typing import Any
 import voluptuous as vol
 
 from homeassistant import config_entries
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.data_entry_flow import FlowResult
 from homeassistant.exceptions import (HomeAssistantError, ConfigEntryAuthFailed)
-from homeassistant.helpers.aiohttp_client import async_get_clientsession
-
-from .const import LOGGER, DOMAIN, API_METHODS, TEST_MODE
-from .redbacklib import RedbackInverter, TestRedbackInverter, RedbackError, RedbackAPIError, RedbackConnectionError
+from homeassistant.helpers.selector import TextSelector, TextSelectorConfig
+
+from .const import (
+    LOGGER,
+    DOMAIN,
+    API_METHODS,
+    TEST_MODE,
+    CONF_POLL_INTERVAL,
+    CONF_PUBLISH_INTERVAL,
+    DEFAULT_POLL_INTERVAL,
+    DEFAULT_PUBLISH_INTERVAL,
+    MIN_POLL_INTERVAL,
+    CONF_STALENESS_LIMIT,
+    DEFAULT_STALENESS_LIMIT,
+    CONF_STATIC_INTERVAL,
+    DEFAULT_STATIC_INTERVAL,
+    CONF_ADAPTIVE_POLLING,
+    DEFAULT_ADAPTIVE_POLLING,
+    MIN_STATIC_INTERVAL,
+    CONF_DERIVED_METRICS,
+    CONF_ARCHIVE,
+    CONF_ARCHIVE_RETENTION,
+    DEFAULT_ARCHIVE_RETENTION,
+)
+from .coordinator import token_store
+from .derived import BUILTIN_METRICS, DerivedMetricEngine, DerivedMetricError, parse_metrics
+from .session import async_get_governor, async_get_pool, async_get_requests
+from .redbacklib import RedbackInverter, RedbackError, RedbackAPIError, RedbackConnectionError
 
 STEP_USER_DATA_SCHEMA = vol.Schema(
     {
@@ -35,16 +59,21 @@ async def validate_input(hass: HomeAssistant, data: dict[str, Any]) -> dict[str,
     Data has the keys from STEP_USER_DATA_SCHEMA with values provided by the user.
     """
 
-    clientsession = async_get_clientsession(hass)
+    clientsession = async_get_pool(hass).getSession()
 
     # RedbackInverter is the API connection to the Redback cloud portal
     if TEST_MODE:
-        redback = TestRedbackInverter(
-            auth=data["auth"], auth_id=data["client_id"], apimethod=data.get("apimethod","public"), session=clientsession, site_index=data["site_index"]
+        # the simulator is only imported in test mode
+        from .simulator import SimulatedRedbackInverter
+
+        redback = SimulatedRedbackInverter(
+            auth=data["auth"], auth_id=data["client_id"], apimethod=data.get("apimethod","public"), session=clientsession, site_index=data["site_index"],
+            requests=async_get_requests(hass), governor=async_get_governor(hass, data["client_id"]),
         )
     else:
         redback = RedbackInverter(
-            auth=data["auth"], auth_id=data["client_id"], apimethod=data.get("apimethod","public"), session=clientsession, site_index=data["site_index"]
+            auth=data["auth"], auth_id=data["client_id"], apimethod=data.get("apimethod","public"), session=clientsession, site_index=data["site_index"],
+            requests=async_get_requests(hass), governor=async_get_governor(hass, data["client_id"]),
         )
 
     try:
@@ -76,6 +105,14 @@ class RedbackConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
     VERSION = 2
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(
+        config_entry: config_entries.ConfigEntry,
+    ) -> config_entries.OptionsFlow:
+        """Create the options flow."""
+        return RedbackOptionsFlow(config_entry)
+
     async def async_step_user(
         self, user_input: dict[str, Any] | None = None
     ) -> FlowResult:
@@ -127,15 +164,20 @@ class RedbackConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
             # check new credentials actually work
             # (TODO: should really call validate_input() but would need to untangle some of the setup stuff)
-            clientsession = async_get_clientsession(self.hass)
+            clientsession = async_get_pool(self.hass).getSession()
 
             if TEST_MODE:
-                redback = TestRedbackInverter(
-                    auth=new["auth"], auth_id=new["client_id"], apimethod=new.get("apimethod","public"), session=clientsession, site_index=new["site_index"]
+                # the simulator is only imported in test mode
+                from .simulator import SimulatedRedbackInverter
+
+                redback = SimulatedRedbackInverter(
+                    auth=new["auth"], auth_id=new["client_id"], apimethod=new.get("apimethod","public"), session=clientsession, site_index=new["site_index"],
+                    requests=async_get_requests(self.hass), governor=async_get_governor(self.hass, new["client_id"]),
                 )
             else:
                 redback = RedbackInverter(
-                    auth=new["auth"], auth_id=new["client_id"], apimethod=new.get("apimethod","public"), session=clientsession, site_index=new["site_index"]
+                    auth=new["auth"], auth_id=new["client_id"], apimethod=new.get("apimethod","public"), session=clientsession, site_index=new["site_index"],
+                    requests=async_get_requests(self.hass), governor=async_get_governor(self.hass, new["client_id"]),
                 )
 
             try:
@@ -143,6 +185,8 @@ class RedbackConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                 assert result == True
                 # it works - update the config entry and notify the user
                 self.hass.config_entries.async_update_entry(self.reauth_entry, data=new)
+                # the persisted bearer token belongs to the old credentials
+                await token_store(self.hass, self.reauth_entry.entry_id).async_remove()
                 await self.hass.config_entries.async_reload(self.reauth_entry.entry_id)
                 return self.async_abort(reason="reauth_successful")
 
@@ -167,6 +211,97 @@ class RedbackConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             errors=errors,
         )
 
+class RedbackOptionsFlow(config_entries.OptionsFlow):
+    """Handle Redback options."""
+
+    def __init__(self, config_entry: config_entries.ConfigEntry) -> None:
+        """Initialize options flow."""
+        self.config_entry = config_entry
+        self.options: dict[str, Any] = {}
+
+    async def async_step_init(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Manage the polling, publishing and static data intervals, the staleness limit and the archive."""
+        errors = {}
+
+        if user_input is not None:
+            # publishing faster than polling would just republish the same sample
+            if user_input[CONF_PUBLISH_INTERVAL] < user_input[CONF_POLL_INTERVAL]:
+                errors["base"] = "publish_faster_than_poll"
+            elif user_input[CONF_ARCHIVE] and not await self.hass.async_add_executor_job(_numpy_available):
+                errors[CONF_ARCHIVE] = "numpy_missing"
+            else:
+                self.options.update(user_input)
+                return await self.async_step_derived_metrics()
+
+        options = self.config_entry.options
+        return self.async_show_form(
+            step_id="init",
+            data_schema=vol.Schema({
+                vol.Required(
+                    CONF_POLL_INTERVAL, default=options.get(CONF_POLL_INTERVAL, DEFAULT_POLL_INTERVAL)
+                ): vol.All(vol.Coerce(int), vol.Range(min=MIN_POLL_INTERVAL)),
+                vol.Required(
+                    CONF_PUBLISH_INTERVAL, default=options.get(CONF_PUBLISH_INTERVAL, DEFAULT_PUBLISH_INTERVAL)
+                ): vol.All(vol.Coerce(int), vol.Range(min=MIN_POLL_INTERVAL)),
+                vol.Required(
+                    CONF_ADAPTIVE_POLLING, default=options.get(CONF_ADAPTIVE_POLLING, DEFAULT_ADAPTIVE_POLLING)
+                ): bool,
+                vol.Required(
+                    CONF_STATIC_INTERVAL, default=options.get(CONF_STATIC_INTERVAL, DEFAULT_STATIC_INTERVAL)
+                ): vol.All(vol.Coerce(int), vol.Range(min=MIN_STATIC_INTERVAL)),
+                vol.Required(
+                    CONF_STALENESS_LIMIT, default=options.get(CONF_STALENESS_LIMIT, DEFAULT_STALENESS_LIMIT)
+                ): vol.All(vol.Coerce(int), vol.Range(min=0)),
+                vol.Required(
+                    CONF_ARCHIVE, default=options.get(CONF_ARCHIVE, False)
+                ): bool,
+                vol.Required(
+                    CONF_ARCHIVE_RETENTION, default=options.get(CONF_ARCHIVE_RETENTION, DEFAULT_ARCHIVE_RETENTION)
+                ): vol.All(vol.Coerce(int), vol.Range(min=1)),
+            }),
+            errors=errors,
+        )
+
+    async def async_step_derived_metrics(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Manage the user-defined derived metrics."""
+        errors = {}
+        placeholders = {"builtin": ", ".join(metric.name for metric in BUILTIN_METRICS), "error": ""}
+
+        if user_input is not None:
+            definitions = user_input.get(CONF_DERIVED_METRICS, "")
+            try:
+                DerivedMetricEngine([*BUILTIN_METRICS, *parse_metrics(definitions)])
+            except DerivedMetricError as err:
+                errors[CONF_DERIVED_METRICS] = "invalid_derived_metrics"
+                placeholders["error"] = str(err)
+            else:
+                return self.async_create_entry(title="", data={**self.options, CONF_DERIVED_METRICS: definitions})
+        else:
+            definitions = self.config_entry.options.get(CONF_DERIVED_METRICS, "")
+
+        return self.async_show_form(
+            step_id="derived_metrics",
+            data_schema=vol.Schema({
+                vol.Optional(
+                    CONF_DERIVED_METRICS, description={"suggested_value": definitions}
+                ): TextSelector(TextSelectorConfig(multiline=True)),
+            }),
+            errors=errors,
+            description_placeholders=placeholders,
+        )
+
+def _numpy_available() -> bool:
+    """The archive needs numpy, which is not a requirement of the integration"""
+    try:
+        import numpy  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
 class CannotConnect(HomeAssistantError):
     """Error to indicate we cannot connect."""
 
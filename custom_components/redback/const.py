@@ -18,3 +18,70 @@ API_METHODS = [
 
 INVERTER_MODES = ["NoMode", "Auto", "ChargeBattery", "DischargeBattery", "ImportPower", "ExportPower", "Conserve", "Offgrid", "Hibernate", "BuyPower", "SellPower", "ForceChargeBattery", "ForceDischargeBattery", "Stop"]
 INVERTER_STATUS = ["OK", "Offline", "Fault"]
+
+# Options: polling (sampling) rate vs publishing rate, in seconds
+CONF_POLL_INTERVAL = "poll_interval"
+CONF_PUBLISH_INTERVAL = "publish_interval"
+DEFAULT_POLL_INTERVAL = int(SCAN_INTERVAL.total_seconds())
+DEFAULT_PUBLISH_INTERVAL = int(SCAN_INTERVAL.total_seconds())
+MIN_POLL_INTERVAL = 10
+
+# Options: stretch the poll interval (up to ADAPTIVE_MAX_INTERVAL) while the site is quiet, e.g. at night
+CONF_ADAPTIVE_POLLING = "adaptive_polling"
+DEFAULT_ADAPTIVE_POLLING = True
+ADAPTIVE_MAX_INTERVAL = timedelta(minutes=5)
+
+# Options: how often the static (inverter/battery configuration) data is refreshed, in seconds
+CONF_STATIC_INTERVAL = "static_interval"
+DEFAULT_STATIC_INTERVAL = 900
+MIN_STATIC_INTERVAL = 300
+
+# Options: how long the last good snapshot is served while the API fails, in seconds (0 = never)
+CONF_STALENESS_LIMIT = "staleness_limit"
+DEFAULT_STALENESS_LIMIT = 900
+
+# Options: local archive of the raw dynamic snapshots (needs numpy), kept for archive_retention days
+CONF_ARCHIVE = "archive"
+CONF_ARCHIVE_RETENTION = "archive_retention"
+DEFAULT_ARCHIVE_RETENTION = 90
+ARCHIVE_DIRECTORY = "redback_archive"
+# largest number of buckets a query_archive call may return
+ARCHIVE_QUERY_LIMIT = 10000
+
+# Options: user-defined derived metrics, one 'name [unit] = expression' per line
+CONF_DERIVED_METRICS = "derived_metrics"
+
+# number of dynamic snapshots kept in memory per site (1 hour at the minimum poll interval)
+SAMPLE_BUFFER_SIZE = 360
+
+# rolling-window power statistics, maintained per site from every sample
+STATISTICS_WINDOW = timedelta(minutes=5)
+STATISTICS_PERCENTILE = 95
+STATISTICS_FIELDS = ["grid_import", "pv", "battery", "load"]
+
+# data freshness telemetry (seconds): device sample age when fetched and when published, poll-to-publish delay
+FRESHNESS_WINDOW = timedelta(hours=1)
+FRESHNESS_FIELDS = ["fetch_age", "publish_age", "publish_delay"]
+FRESHNESS_PERCENTILES = [50, 95]
+
+# integration-owned HTTP connection pool, shared by every config entry
+POOL_LIMIT = 20
+POOL_LIMIT_PER_HOST = 4
+POOL_KEEPALIVE_TIMEOUT = 75  # seconds, longer than the default poll interval so connections are reused
+POOL_DNS_CACHE_TTL = 300  # seconds
+
+# total time budget for one coordinator refresh (capped at the poll interval)
+REFRESH_TIMEOUT = timedelta(seconds=45)
+
+# the OAuth2 bearer token is renewed in the background this long before it expires
+TOKEN_REFRESH_MARGIN = timedelta(minutes=5)
+TOKEN_RETRY_INTERVAL = timedelta(minutes=1)
+TOKEN_STORAGE_VERSION = 1
+
+# energy delta engine state, saved at most once per delay
+ENERGY_STORAGE_VERSION = 1
+ENERGY_SAVE_DELAY = 60  # seconds
+
+# request governor, shared by every config entry of a Redback account
+GOVERNOR_RATE = 2.0  # requests per second
+GOVERNOR_BURST = 10
@@ -1,15 +1,77 @@
 """DataUpdateCoordinator for the Redback integration."""
 from __future__ import annotations
 
-from homeassistant.core import HomeAssistant
+import asyncio
+from collections import Counter
+from datetime import timedelta
+from functools import partial
+from collections.abc import Callable, Mapping
+from time import monotonic
+from typing import Any
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
 from homeassistant.config_entries import ConfigEntry
+from homeassistant.helpers.event import async_call_later, async_track_point_in_utc_time
+from homeassistant.helpers.storage import Store
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+from homeassistant.util import dt as dt_util
 
-from homeassistant.helpers.aiohttp_client import async_get_clientsession
 from homeassistant.exceptions import ConfigEntryAuthFailed
 
-from .const import DOMAIN, LOGGER, SCAN_INTERVAL, TEST_MODE
-from .redbacklib import RedbackInverter, TestRedbackInverter, RedbackError, RedbackAPIError, RedbackConnectionError
+from .buffer import SampleRingBuffer
+from .capabilities import SiteCapabilities
+from .derived import BUILTIN_METRICS, DerivedMetric, DerivedMetricEngine, DerivedMetricError, parse_metrics
+from .energy import EnergyDeltaEngine, PeriodMeters
+from .filters import default_filters
+from .rolling import RollingStatistics
+from .const import (
+    DOMAIN,
+    LOGGER,
+    TEST_MODE,
+    CONF_POLL_INTERVAL,
+    CONF_PUBLISH_INTERVAL,
+    DEFAULT_POLL_INTERVAL,
+    DEFAULT_PUBLISH_INTERVAL,
+    CONF_STALENESS_LIMIT,
+    DEFAULT_STALENESS_LIMIT,
+    CONF_STATIC_INTERVAL,
+    DEFAULT_STATIC_INTERVAL,
+    CONF_ADAPTIVE_POLLING,
+    DEFAULT_ADAPTIVE_POLLING,
+    ADAPTIVE_MAX_INTERVAL,
+    CONF_DERIVED_METRICS,
+    CONF_ARCHIVE,
+    CONF_ARCHIVE_RETENTION,
+    DEFAULT_ARCHIVE_RETENTION,
+    ARCHIVE_DIRECTORY,
+    SAMPLE_BUFFER_SIZE,
+    STATISTICS_WINDOW,
+    STATISTICS_FIELDS,
+    FRESHNESS_WINDOW,
+    FRESHNESS_FIELDS,
+    REFRESH_TIMEOUT,
+    TOKEN_REFRESH_MARGIN,
+    TOKEN_RETRY_INTERVAL,
+    TOKEN_STORAGE_VERSION,
+    ENERGY_STORAGE_VERSION,
+    ENERGY_SAVE_DELAY,
+)
+from .metrics import async_get_metrics, render_site
+from .scheduler import AdaptivePollingPolicy
+from .session import async_get_governor, async_get_pool, async_get_requests, async_get_scheduler
+from .redbacklib import RedbackInverter, RedbackError, RedbackAPIError, RedbackConnectionError, RedbackRateLimitError
+
+_MISSING = object()
+
+
+def token_store(hass: HomeAssistant, entry_id: str) -> Store:
+    """Return the storage holding the bearer token of a config entry."""
+    return Store(hass, TOKEN_STORAGE_VERSION, f"{DOMAIN}.{entry_id}.token")
+
+
+def energy_store(hass: HomeAssistant, entry_id: str) -> Store:
+    """Return the storage holding the energy delta engine state of a config entry."""
+    return Store(hass, ENERGY_STORAGE_VERSION, f"{DOMAIN}.{entry_id}.energy")
 
 
 class RedbackDataUpdateCoordinator(DataUpdateCoordinator):
@@ -17,22 +79,112 @@ class RedbackDataUpdateCoordinator(DataUpdateCoordinator):
 
     config_entry: ConfigEntry
 
-    def __init__(self, hass: HomeAssistant, entry: ConfigEntry) -> None:
-        """Initialize the Redback coordinator."""
+    def __init__(
+        self, hass: HomeAssistant, entry: ConfigEntry, clock: Callable[[], float] = monotonic
+    ) -> None:
+        """Initialize the Redback coordinator.
+
+        clock returns monotonic seconds; it drives the library's rate limiting, the sample
+        timestamps and the entities' integration, and can be replaced to control time in tests.
+        """
         self.config_entry = entry
-        clientsession = async_get_clientsession(hass)
+        self.clock = clock
+        clientsession = async_get_pool(hass).getSession()
 
         # RedbackInverter is the API connection to the Redback cloud portal
         if TEST_MODE:
-            self.redback = TestRedbackInverter(
-                auth=entry.data["auth"], auth_id=entry.data["client_id"], apimethod=entry.data.get("apimethod","public"), session=clientsession, site_index=entry.data["site_index"]
+            # the simulator is only imported in test mode
+            from .simulator import SimulatedRedbackInverter
+
+            self.redback = SimulatedRedbackInverter(
+                auth=entry.data["auth"], auth_id=entry.data["client_id"], apimethod=entry.data.get("apimethod","public"), session=clientsession, site_index=entry.data["site_index"],
+                requests=async_get_requests(hass), governor=async_get_governor(hass, entry.data["client_id"]), clock=clock,
             )
         else:
             self.redback = RedbackInverter(
-                auth=entry.data["auth"], auth_id=entry.data["client_id"], apimethod=entry.data.get("apimethod","public"), session=clientsession, site_index=entry.data["site_index"]
+                auth=entry.data["auth"], auth_id=entry.data["client_id"], apimethod=entry.data.get("apimethod","public"), session=clientsession, site_index=entry.data["site_index"],
+                requests=async_get_requests(hass), governor=async_get_governor(hass, entry.data["client_id"]), clock=clock,
             )
 
-        super().__init__(hass, LOGGER, name=DOMAIN, update_interval=SCAN_INTERVAL)
+        # intervals and staleness limit are set by async_apply_options(), at creation and on options changes
+        self.poll_interval = timedelta(seconds=DEFAULT_POLL_INTERVAL)
+        # the poll interval in use (adaptive polling changes it), refreshes are scheduled by
+        # async_schedule_refresh() rather than the base class, whose update_interval stays None
+        self.refresh_interval: timedelta | None = None
+        self._unsub_slot: CALLBACK_TYPE | None = None
+        self._polling = False
+        self.publish_interval = timedelta(seconds=DEFAULT_PUBLISH_INTERVAL)
+        # the poll interval in use is stretched while the site is quiet (None: always poll_interval)
+        self.adaptive: AdaptivePollingPolicy | None = None
+        self.staleness_limit = timedelta(seconds=DEFAULT_STALENESS_LIMIT)
+        self.last_success: float | None = None
+        self.stale = False
+        self.samples = SampleRingBuffer(SAMPLE_BUFFER_SIZE)
+        # out of range, missing and spiking values of each new snapshot are replaced before use
+        self.filters = default_filters()
+        self.archive = None
+        if entry.options.get(CONF_ARCHIVE, False):
+            # numpy is only needed (and imported) with the archive enabled
+            from .archive import SnapshotArchive
+
+            self.archive = SnapshotArchive(
+                hass.config.path(ARCHIVE_DIRECTORY, entry.data["site_id"]),
+                entry.options.get(CONF_ARCHIVE_RETENTION, DEFAULT_ARCHIVE_RETENTION),
+            )
+        # calculated values (built-in and user-defined) are evaluated into each new snapshot, in dependency order
+        self.derived_definitions = entry.options.get(CONF_DERIVED_METRICS, "")
+        try:
+            self.user_metrics = parse_metrics(self.derived_definitions)
+            self.derived = self._derived_engine(self.user_metrics)
+        except DerivedMetricError as err:
+            LOGGER.error("Ignoring the derived metrics of %s: %s", entry.title, err)
+            self.user_metrics = []
+            self.derived = self._derived_engine([])
+        self.inverter_info = None
+        # fields the site reports, entities and computations of the others aren't created
+        self.capabilities = SiteCapabilities()
+        self.energy_data = None
+        self.static_attributes: dict[str, dict[str, Any]] = {}
+        self._attributes_source = None
+        self.window_start: float | None = None
+        self._last_publish: float | None = None
+        # whether the last publish was of a successful update
+        self._published_success = False
+        self._window_cache: dict[tuple[str, str], Any] = {}
+        self.statistics = RollingStatistics(STATISTICS_FIELDS, STATISTICS_WINDOW.total_seconds())
+        # where stale values come from: device upload/cloud (fetch age) or our polling/publishing (delay)
+        self.freshness = RollingStatistics(FRESHNESS_FIELDS, FRESHNESS_WINDOW.total_seconds())
+        self.freshness_latest: dict[str, float | None] = dict.fromkeys(FRESHNESS_FIELDS)
+        self.sample_time: float | None = None  # device sample time of the latest snapshot (epoch seconds)
+        self.fetch_time: float | None = None  # when the latest snapshot was fetched (epoch seconds)
+        # number of added entities needing each optional computation (e.g. a statistics field)
+        self.demand: Counter[str] = Counter()
+        # called with (epoch seconds, snapshot) for every new snapshot, e.g. by websocket subscriptions
+        self._sample_listeners: list[Callable[[float, dict[str, Any]], None]] = []
+        # called when the entry unloads, so sample listeners outside the entry (websocket clients) end
+        self._sample_closers: dict[Callable[[float, dict[str, Any]], None], Callable[[], None]] = {}
+        # called when the capabilities were rebuilt or a field got its first value, e.g. to add entities
+        self._capability_listeners: list[Callable[[], None]] = []
+        self.metrics = async_get_metrics(hass)
+
+        # energy totals come from the all-time counters, the engine state survives restarts
+        self.energy = EnergyDeltaEngine()
+        self.energy_deltas: dict[str, float] = {}
+        self.periods = PeriodMeters()
+        self._energy_store = energy_store(hass, entry.entry_id)
+
+        # the bearer token is persisted and renewed in the background, so neither a restart
+        # nor an expiry makes the update path wait for Auth/token
+        self._token_store = token_store(hass, entry.entry_id)
+        self._saved_token: str | None = None
+        self._unsub_token_refresh: CALLBACK_TYPE | None = None
+
+        # polls of all sites are spread over the poll interval instead of all firing in the same second
+        self.scheduler = async_get_scheduler(hass)
+        self.scheduler.add(entry.data["site_id"])
+
+        super().__init__(hass, LOGGER, name=DOMAIN)
+        self.async_apply_options(entry.options)
 
     async def _async_update_data(self):
         """Fetch system status from Redback."""
@@ -40,17 +192,414 @@ class RedbackDataUpdateCoordinator(DataUpdateCoordinator):
             "Syncing data with Redback (entry_id=%s)", self.config_entry.entry_id
         )
 
+        # bound the whole refresh, a hung request must not stall every future update
+        budget = min(REFRESH_TIMEOUT, self.refresh_interval).total_seconds()
         try:
-            # the Redback integration has built-in timers to rate-limit the data updates and not hammer the API
-            self.inverter_info = await self.redback.getInverterInfo()
-            self.energy_data = await self.redback.getEnergyData()
+            async with asyncio.timeout(budget):
+                # the Redback integration has built-in timers to rate-limit the data updates and not hammer the API
+                self.inverter_info = await self.redback.getInverterInfo()
+                energy_data = await self.redback.getEnergyData()
+        except TimeoutError as err:
+            # remaining requests were cancelled
+            return self._serve_stale(f"Refresh deadline of {budget}s exceeded", err)
+        except RedbackRateLimitError as err:
+            # usage limit, not a credentials problem: the governor holds requests back until Retry-After
+            return self._serve_stale(f"Rate limited: {err}", err)
         except RedbackError as err:
-            raise UpdateFailed(f"HTTP error: {err}") from err
+            return self._serve_stale(f"HTTP error: {err}", err)
         except RedbackConnectionError as err:
-            raise UpdateFailed(f"Connection error: {err}") from err
+            return self._serve_stale(f"Connection error: {err}", err)
         except RedbackAPIError as err:
             LOGGER.debug(f"API error: {err}")
             raise ConfigEntryAuthFailed("Invalid credentials") from err
 
+        # static attributes are rebuilt only when the library downloaded new inverter info
+        static_changed = self.inverter_info is not self._attributes_source
+        if static_changed:
+            self._attributes_source = self.inverter_info
+            self.static_attributes = self._static_attributes(self.inverter_info)
+            if not self.redback.isPrivateAPI():
+                # the fields seen with values so far stay supported
+                self.capabilities = SiteCapabilities.from_site(
+                    self.inverter_info, self.redback.getPhaseIds(), self.capabilities.reported
+                )
+                self.energy.battery = self.capabilities.has_battery
+        capabilities_changed = static_changed
+
+        # a token obtained on the update path (first run or failed background refresh) is kept too
+        await self._async_save_token()
+
+        # the library hands back the cached snapshot when rate-limited, only buffer fresh ones
+        if energy_data is not self.energy_data:
+            now = self.clock()
+            timestamp = dt_util.utcnow()
+            self._record_fetch(timestamp.timestamp(), energy_data)
+            if self.archive is not None:
+                # raw snapshot (without derived metrics), the memory-mapped files are written off the event loop
+                await self.hass.async_add_executor_job(
+                    self.archive.append, timestamp.timestamp(), dt_util.as_local(timestamp).date(), dict(energy_data)
+                )
+            self.filters.apply(energy_data)
+            if self.capabilities.observe(energy_data):
+                capabilities_changed = True
+            self.derived.evaluate(energy_data)
+            if self.adaptive is not None:
+                # applies from the next poll on, the slot after this refresh is scheduled with the new interval
+                self._set_poll_interval(timedelta(seconds=self.adaptive.update(energy_data)))
+            self.samples.append(now, energy_data)
+            for listener in list(self._sample_listeners):
+                listener(timestamp.timestamp(), energy_data)
+            if not self.redback.isPrivateAPI():
+                if fields := [field for field in STATISTICS_FIELDS if self.demand[field]]:
+                    sample = self._statistics_sample(energy_data)
+                    self.statistics.add(now, {field: sample[field] for field in fields})
+                self.energy_deltas = self.energy.update(energy_data)
+                self.periods.update(dt_util.now().date(), self.energy_deltas)
+                self._energy_store.async_delay_save(self._energy_state, ENERGY_SAVE_DELAY)
+        if capabilities_changed:
+            for listener in list(self._capability_listeners):
+                listener()
+        if static_changed or energy_data is not self.energy_data:
+            # rendered at most once per snapshot (by the next scrape), scrapes only concatenate text
+            self.metrics.update(
+                self.config_entry.entry_id,
+                partial(render_site, self.config_entry.data["site_id"], self.config_entry.title, energy_data, self.inverter_info),
+            )
+        self.energy_data = energy_data
+        self.last_success = self.clock()
+        if self.stale:
+            LOGGER.info("Redback data is fresh again (entry_id=%s)", self.config_entry.entry_id)
+            self.stale = False
+
+        return self.energy_data
+
+    @callback
+    def async_apply_options(self, options: Mapping[str, Any]) -> None:
+        """Apply the interval and retention options; also used while running, without a reload or refetching any data."""
+        # polling (sampling) rate is decoupled from the publishing rate: every poll is stored in
+        # the sample buffer, entities are only updated once per publish interval with a window aggregate
+        self.poll_interval = timedelta(seconds=options.get(CONF_POLL_INTERVAL, DEFAULT_POLL_INTERVAL))
+        self.publish_interval = timedelta(seconds=options.get(CONF_PUBLISH_INTERVAL, DEFAULT_PUBLISH_INTERVAL))
+        # failed refreshes keep serving the last good snapshot until it is older than the staleness limit
+        self.staleness_limit = timedelta(seconds=options.get(CONF_STALENESS_LIMIT, DEFAULT_STALENESS_LIMIT))
+        # the library's own rate limit follows, the next static refresh moves with the new interval
+        self.redback.setUpdateIntervals(
+            inverterInfo=timedelta(seconds=options.get(CONF_STATIC_INTERVAL, DEFAULT_STATIC_INTERVAL)),
+        )
+        if self.archive is not None:
+            # expired day files are deleted on the next rotation
+            self.archive.retention = options.get(CONF_ARCHIVE_RETENTION, DEFAULT_ARCHIVE_RETENTION)
+        # new options restart at full rate
+        if options.get(CONF_ADAPTIVE_POLLING, DEFAULT_ADAPTIVE_POLLING):
+            if self.adaptive is None:
+                self.adaptive = AdaptivePollingPolicy(self.poll_interval.total_seconds(), ADAPTIVE_MAX_INTERVAL.total_seconds())
+            self.adaptive.reset(self.poll_interval.total_seconds())
+        else:
+            self.adaptive = None
+        if self.poll_interval != self.refresh_interval:
+            self._set_poll_interval(self.poll_interval)
+            if self._polling:
+                self.async_schedule_refresh()
+
+    def _set_poll_interval(self, interval: timedelta) -> None:
+        """Poll at interval, the library's dynamic data rate limit follows (its next update moves with it)"""
+        if interval != self.refresh_interval:
+            LOGGER.debug("Polling %s every %s", self.config_entry.title, interval)
+            self.refresh_interval = interval
+            self.redback.setUpdateIntervals(energyData=interval)
+
+    @callback
+    def async_start_polling(self) -> None:
+        """Start refreshing in this site's slot of the shared schedule (after the first refresh)."""
+        self._polling = True
+        self.async_schedule_refresh()
+
+    @callback
+    def async_schedule_refresh(self) -> None:
+        """Schedule the next refresh in this site's slot, replacing the one already scheduled."""
+        if self._unsub_slot is not None:
+            self._unsub_slot()
+            self._unsub_slot = None
+        if not self._polling or self.config_entry.pref_disable_polling:
+            return
+        when = self.scheduler.next_refresh(
+            self.config_entry.data["site_id"], self.refresh_interval.total_seconds(), dt_util.utcnow().timestamp()
+        )
+        self._unsub_slot = async_track_point_in_utc_time(self.hass, self._async_refresh_in_slot, dt_util.utc_from_timestamp(when))
+
+    async def _async_refresh_in_slot(self, _now) -> None:
+        self._unsub_slot = None
+        try:
+            await self.async_refresh()
+        finally:
+            self.async_schedule_refresh()
+
+    async def async_shutdown(self) -> None:
+        """Stop polling and free this site's slot, the remaining sites spread over the interval again."""
+        await super().async_shutdown()
+        self._polling = False
+        self.async_schedule_refresh()
+        self.scheduler.remove(self.config_entry.data["site_id"])
+        closers = list(self._sample_closers.values())
+        self._sample_listeners.clear()
+        self._sample_closers.clear()
+        for close in closers:
+            close()
+
+    def requires_reload(self, options: Mapping[str, Any]) -> bool:
+        """True when options changed that async_apply_options() can't apply (entities come and go, archive on/off)"""
+        return (
+            options.get(CONF_DERIVED_METRICS, "") != self.derived_definitions
+            or options.get(CONF_ARCHIVE, False) != (self.archive is not None)
+        )
+
+    async def async_close_archive(self) -> None:
+        """Flush the archive's current day file"""
+        if self.archive is not None:
+            await self.hass.async_add_executor_job(self.archive.close)
+
+    def _serve_stale(self, message: str, err: Exception) -> dict[str, Any]:
+        """Returns the last good snapshot after a failed refresh, or raises UpdateFailed once it is too old."""
+        if (
+            self.inverter_info is None
+            or self.energy_data is None
+            or self.clock() - self.last_success > self.staleness_limit.total_seconds()
+        ):
+            self.stale = False
+            raise UpdateFailed(message) from err
+
+        if not self.stale:
+            LOGGER.warning("%s, serving previous Redback data for up to %s", message, self.staleness_limit)
+            self.stale = True
+        else:
+            LOGGER.debug("%s, still serving previous Redback data", message)
+        # the coordinator keeps polling at the normal rate, so the next good refresh replaces it
         return self.energy_data
 
+    def _derived_engine(self, user_metrics: list[DerivedMetric]) -> DerivedMetricEngine:
+        """Returns the engine of the built-in (public API snapshot) and user-defined derived metrics"""
+        builtin = [] if self.redback.isPrivateAPI() else BUILTIN_METRICS
+        return DerivedMetricEngine([*builtin, *user_metrics])
+
+    @property
+    def snapshot_age(self) -> float | None:
+        """Seconds since the last successful refresh while stale data is served, otherwise None."""
+        return self.clock() - self.last_success if self.stale else None
+
+    async def async_restore_token(self) -> None:
+        """Reuse the bearer token saved by a previous run, if it is still valid."""
+        if self.redback.isPrivateAPI():
+            return
+        if (state := await self._token_store.async_load()) is not None:
+            self.redback.setTokenState(state)
+            self._saved_token = state["token"]
+        self._schedule_token_refresh()
+
+    @callback
+    def async_add_capability_listener(self, listener: Callable[[], None]) -> CALLBACK_TYPE:
+        """Call listener when the capabilities may have changed, returns the function removing it."""
+        self._capability_listeners.append(listener)
+
+        @callback
+        def remove_listener() -> None:
+            self._capability_listeners.remove(listener)
+
+        return remove_listener
+
+    def async_add_sample_listener(
+        self, listener: Callable[[float, dict[str, Any]], None], on_close: Callable[[], None] | None = None
+    ) -> CALLBACK_TYPE:
+        """Call listener with every new snapshot (not only on publish), returns the function removing it.
+
+        on_close is called instead when the entry unloads (or reloads), the listener is removed then.
+        """
+        self._sample_listeners.append(listener)
+        if on_close is not None:
+            self._sample_closers[listener] = on_close
+
+        @callback
+        def remove_listener() -> None:
+            if listener in self._sample_listeners:
+                self._sample_listeners.remove(listener)
+            self._sample_closers.pop(listener, None)
+
+        return remove_listener
+
+    @callback
+    def async_add_demand(self, key: str) -> CALLBACK_TYPE:
+        """Register an entity's need for an optional computation, returns the function removing it."""
+        self.demand[key] += 1
+
+        @callback
+        def remove_demand() -> None:
+            self.demand[key] -= 1
+
+        return remove_demand
+
+    async def async_restore_energy(self) -> None:
+        """Restore the energy delta engine, so energy produced while stopped is still counted."""
+        if (state := await self._energy_store.async_load()) is not None:
+            self.energy.restore(state)
+            if "periods" in state:
+                self.periods.restore(state["periods"])
+
+    async def async_save_energy(self) -> None:
+        """Write the energy state now, replacing a pending delayed save (on unload, so a reload can't overwrite it)"""
+        if not self.redback.isPrivateAPI():
+            await self._energy_store.async_save(self._energy_state())
+
+    def _energy_state(self) -> dict[str, Any]:
+        """Returns the energy state to persist: engine baselines and totals plus the period meters."""
+        return {**self.energy.as_dict(), "periods": self.periods.as_dict()}
+
+    @callback
+    def async_rollover_periods(self, _now=None) -> None:
+        """Start the new day's periods at local midnight, even when no snapshot arrives."""
+        self.periods.rollover(dt_util.now().date())
+        # a restart must not bring the previous day's periods back
+        self._energy_store.async_delay_save(self._energy_state, ENERGY_SAVE_DELAY)
+
+    def period_attributes(self, field: str) -> dict[str, float]:
+        """Returns today's, yesterday's and this month's energy (kWh) of an energy field"""
+        return {period: round(value, 3) for period, value in self.periods.values(field).items()}
+
+    async def _async_save_token(self) -> None:
+        """Persist the bearer token when it changed and schedule its renewal."""
+        state = self.redback.getTokenState()
+        if state is None or state["token"] == self._saved_token:
+            return
+        self._saved_token = state["token"]
+        await self._token_store.async_save(state)
+        self._schedule_token_refresh()
+
+    @callback
+    def _schedule_token_refresh(self, delay: float | None = None) -> None:
+        """Schedule the background renewal of the bearer token ahead of its expiry."""
+        self.async_cancel_token_refresh()
+        if delay is None:
+            if (expires_in := self.redback.getTokenExpiresIn()) is None:
+                return  # no token yet, the first refresh requests one
+            delay = max(expires_in - TOKEN_REFRESH_MARGIN.total_seconds(), 0)
+        self._unsub_token_refresh = async_call_later(self.hass, delay, self._async_refresh_token)
+
+    @callback
+    def async_cancel_token_refresh(self) -> None:
+        """Cancel the scheduled bearer token renewal."""
+        if self._unsub_token_refresh is not None:
+            self._unsub_token_refresh()
+            self._unsub_token_refresh = None
+
+    async def _async_refresh_token(self, _now) -> None:
+        """Renew the bearer token in the background."""
+        self._unsub_token_refresh = None
+        try:
+            await self.redback.refreshBearerToken()
+        except (RedbackError, RedbackConnectionError, RedbackAPIError) as err:
+            # the current token stays in use until it expires, try again shortly
+            LOGGER.debug("Background token refresh failed: %s", err)
+            self._schedule_token_refresh(TOKEN_RETRY_INTERVAL.total_seconds())
+            return
+        await self._async_save_token()
+
+    def _record_fetch(self, fetch_time: float, energy_data: dict[str, Any]) -> None:
+        """Track the age of a new snapshot's device sample (None for the private API, which has no sample time)"""
+        sample_time = dt_util.parse_datetime(energy_data.get("TimestampUtc") or "")
+        self.sample_time = sample_time.timestamp() if sample_time is not None else None
+        self.fetch_time = fetch_time
+        fetch_age = fetch_time - self.sample_time if self.sample_time is not None else None
+        self.freshness_latest["fetch_age"] = fetch_age
+        self.freshness.add(self.clock(), {"fetch_age": fetch_age})
+
+    def _record_publish(self) -> None:
+        """Track the age of the published sample and how long after its poll it is published"""
+        if self.fetch_time is None:
+            return
+        publish_time = dt_util.utcnow().timestamp()
+        sample = {
+            "publish_age": publish_time - self.sample_time if self.sample_time is not None else None,
+            "publish_delay": publish_time - self.fetch_time,
+        }
+        self.freshness_latest.update(sample)
+        self.freshness.add(self.clock(), sample)
+
+    @staticmethod
+    def _static_attributes(inverter_info: dict[str, Any]) -> dict[str, dict[str, Any]]:
+        """Returns the extra state attributes of the static sensors, shared by every state write"""
+        return {
+            "status": {
+                "serial_number": inverter_info.get("SerialNumber"),
+                "software_version": inverter_info.get("SoftwareVersion"),
+                "ross_version": inverter_info.get("SoftwareVersion"),
+                "model_name": inverter_info.get("ModelName"),
+                "system_type": inverter_info.get("SystemType"),
+                "latest_dynamic_data_utc": inverter_info.get("LatestDynamicDataUtc"),
+                "site_id": inverter_info.get("SiteId"),
+                "inverter_max_export_power_w": inverter_info.get("InverterMaxExportPowerW"),
+                "inverter_max_import_power_w": inverter_info.get("InverterMaxImportPowerW"),
+            },
+            "storage": {
+                "usable_battery_offgrid_kwh": inverter_info.get("UsableBatteryCapacitykWh"),
+                "usable_battery_ongrid_kwh": inverter_info.get("UsableBatteryCapacityOnGridkWh"),
+                "max_discharge_power_w": inverter_info.get("BatteryMaxDischargePowerW"),
+                "max_charge_power_w": inverter_info.get("BatteryMaxChargePowerW"),
+            },
+            "charge": {
+                "min_offgrid_soc_0to1": inverter_info.get("MinOffgridSoC0to1"),
+                "min_ongrid_soc_0to1": inverter_info.get("MinSoC0to1"),
+            },
+        }
+
+    @staticmethod
+    def _statistics_sample(energy_data: dict[str, Any]) -> dict[str, float | None]:
+        """Returns the power flows (kW) tracked by the rolling statistics sensors"""
+        # fields rejected by the filters may be missing
+        battery = energy_data.get("BatteryPowerNegativeIsChargingkW") or 0
+        return {
+            "grid_import": energy_data.get("ActiveImportedPowerInstantaneouskW"),
+            "pv": energy_data.get("PvPowerInstantaneouskW"),
+            "battery": battery,
+            "load": energy_data.get("SiteLoadkW"),
+        }
+
+    @callback
+    def async_update_listeners(self) -> None:
+        """Update entities, but only once per publish interval while updates succeed.
+
+        A change of the success state is always published, so entities become available
+        again with the first successful refresh after a failure.
+        """
+        now = self.clock()
+        # allow half a poll of scheduling jitter, so equal poll and publish intervals publish every poll
+        threshold = (self.publish_interval - self.refresh_interval / 2).total_seconds()
+        if (
+            self.last_update_success
+            and self._published_success
+            and self._last_publish is not None
+            and now - self._last_publish < threshold
+        ):
+            return
+
+        # the publish window covers every sample since the previous publish
+        self.window_start = self._last_publish
+        self._last_publish = now
+        self._published_success = self.last_update_success
+        self._window_cache = {}
+        self._record_publish()
+        super().async_update_listeners()
+
+    def window_value(self, key: str, aggregate: str = "last", default: Any = _MISSING) -> Any:
+        """Returns a dynamic data field aggregated (mean/min/max/last) over the current publish window.
+
+        Fields missing from the latest snapshot (e.g. dropped by the filters) return default, None if not given.
+        """
+        if key not in self.energy_data:
+            return None if default is _MISSING else default
+        if aggregate == "last":
+            return self.energy_data[key]
+
+        cache_key = (key, aggregate)
+        if cache_key not in self._window_cache:
+            value = self.samples.aggregate(key, aggregate, self.window_start)
+            # non-numeric or missing fields fall back to the latest snapshot
+            self._window_cache[cache_key] = self.energy_data[key] if value is None else value
+        return self._window_cache[cache_key]
@@ -0,0 +1,146 @@
+"""Derived metrics: named expressions over the dynamic data fields, evaluated once per snapshot."""
+from __future__ import annotations
+
+import ast
+import re
+from collections import Counter
+from collections.abc import Iterable, Mapping, MutableMapping
+from graphlib import CycleError, TopologicalSorter
+from keyword import iskeyword
+from typing import Any
+
+# functions available to expressions, everything else (attributes, subscripts, lambdas...) is rejected
+FUNCTIONS = {"abs": abs, "min": min, "max": max, "round": round}
+
+_NODES = (
+    ast.Expression, ast.Name, ast.Load, ast.Constant, ast.Call,
+    ast.BinOp, ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod,
+    ast.UnaryOp, ast.UAdd, ast.USub, ast.Not,
+    ast.BoolOp, ast.And, ast.Or, ast.IfExp,
+    ast.Compare, ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE,
+)
+
+# dynamic data fields of the public and private API, a metric can't shadow them
+API_FIELDS = frozenset({
+    "FrequencyInstantaneousHz", "BatterySoCInstantaneous0to1", "PvPowerInstantaneouskW", "InverterTemperatureC",
+    "BatteryPowerNegativeIsChargingkW", "PvAllTimeEnergykWh", "ExportAllTimeEnergykWh", "ImportAllTimeEnergykWh",
+    "LoadAllTimeEnergykWh", "Status", "TimestampUtc", "VoltageInstantaneousV", "CurrentInstantaneousA",
+    "ActiveExportedPowerInstantaneouskW", "ActiveImportedPowerInstantaneouskW", "ActiveNetPowerInstantaneouskW",
+    "InverterMode", "InverterPowerW",
+    "ACLoadW", "BackupLoadW", "SupportsConnectedPV", "PVW", "ThirdPartyW", "GridStatus", "GridNegativeIsImportW",
+    "ConfiguredWithBatteries", "BatteryNegativeIsChargingW", "BatteryStatus", "BatterySoC0to100", "CtComms",
+})
+# fields also reported per phase, as '<field>_<phase id>'
+_PHASE_FIELD = re.compile(r"^(VoltageInstantaneousV|CurrentInstantaneousA|PowerFactorInstantaneousMinus1to1)_\w+$")
+
+# one definition per line: name [unit] = expression
+_DEFINITION = re.compile(r"^\s*(?P<name>[A-Za-z_]\w*)\s*(?:\[(?P<unit>[^\]]*)\])?\s*=\s*(?P<expression>.+?)\s*$")
+
+
+class DerivedMetricError(ValueError):
+    """Invalid derived metric definition"""
+
+
+class DerivedMetric:
+    """A named expression over dynamic data fields and other derived metrics.
+
+    The expression is checked against a small whitelist of syntax (arithmetic, comparisons,
+    and/or, if-else and FUNCTIONS, numeric constants) and compiled once. Every other name
+    is a dependency.
+    """
+
+    def __init__(self, name: str, expression: str, unit: str | None = None) -> None:
+        if not name.isidentifier() or iskeyword(name) or name.startswith("_") or name in FUNCTIONS:
+            raise DerivedMetricError(f"Invalid metric name '{name}'")
+        if name in API_FIELDS or _PHASE_FIELD.match(name):
+            raise DerivedMetricError(f"'{name}' is a Redback data field")
+        try:
+            tree = ast.parse(expression, mode="eval")
+        except SyntaxError as err:
+            raise DerivedMetricError(f"{name}: invalid expression ({err.msg})") from err
+
+        dependencies = set()
+        for node in ast.walk(tree):
+            if not isinstance(node, _NODES):
+                raise DerivedMetricError(f"{name}: {type(node).__name__} is not allowed")
+            if isinstance(node, ast.Call):
+                if not isinstance(node.func, ast.Name) or node.func.id not in FUNCTIONS or node.keywords:
+                    raise DerivedMetricError(f"{name}: only {', '.join(FUNCTIONS)} can be called")
+            elif isinstance(node, ast.Name) and node.id not in FUNCTIONS:
+                if node.id.startswith("_"):
+                    raise DerivedMetricError(f"{name}: invalid name '{node.id}'")
+                dependencies.add(node.id)
+            elif isinstance(node, ast.Constant) and not isinstance(node.value, (int, float)):
+                raise DerivedMetricError(f"{name}: invalid constant {node.value!r}")
+
+        self.name = name
+        self.expression = expression
+        self.unit = unit or None
+        self.dependencies = frozenset(dependencies)
+        self._code = compile(tree, f"<{name}>", "eval")
+
+    def evaluate(self, values: Mapping[str, Any]) -> float | None:
+        """Returns the value of the expression, None when a dependency is missing or unusable (e.g. None)
+
+        values should only hold numbers (and None): with a string, '*' could build a huge one.
+        """
+        try:
+            value = eval(self._code, {"__builtins__": {}, **FUNCTIONS}, values)  # noqa: S307, syntax was whitelisted
+        except (NameError, TypeError, ValueError, ArithmeticError):
+            return None
+        if isinstance(value, bool):
+            return float(value)
+        return float(value) if isinstance(value, (int, float)) else None
+
+
+class DerivedMetricEngine:
+    """Evaluates derived metrics in dependency order and stores the results in the snapshot.
+
+    Each metric is computed once per snapshot, sensors, statistics and the sample buffer
+    then read it like any other dynamic data field.
+    """
+
+    def __init__(self, metrics: Iterable[DerivedMetric]) -> None:
+        metrics = list(metrics)
+        if duplicates := [name for name, count in Counter(metric.name for metric in metrics).items() if count > 1]:
+            raise DerivedMetricError(f"{', '.join(duplicates)} defined more than once")
+        metrics = {metric.name: metric for metric in metrics}
+        graph = {name: metric.dependencies & metrics.keys() for name, metric in metrics.items()}
+        try:
+            self.metrics = [metrics[name] for name in TopologicalSorter(graph).static_order()]
+        except CycleError as err:
+            raise DerivedMetricError(f"Circular dependency between {', '.join(dict.fromkeys(err.args[1]))}") from err
+
+    def evaluate(self, snapshot: MutableMapping[str, Any]) -> None:
+        """Add the derived metrics to snapshot; fields already present (earlier evaluation) are kept"""
+        # expressions only see the numeric fields (and None), e.g. Status or TimestampUtc are unknown names
+        values = {key: value for key, value in snapshot.items() if value is None or isinstance(value, (int, float))}
+        for metric in self.metrics:
+            if metric.name not in snapshot:
+                snapshot[metric.name] = values[metric.name] = metric.evaluate(values)
+
+
+def parse_metrics(text: str) -> list[DerivedMetric]:
+    """Parse definitions of the form 'name [unit] = expression', one per line ('#' starts a comment line)"""
+    metrics = []
+    names = set()
+    for number, line in enumerate(text.splitlines(), 1):
+        if not line.strip() or line.lstrip().startswith("#"):
+            continue
+        if (match := _DEFINITION.match(line)) is None:
+            raise DerivedMetricError(f"Line {number}: expected 'name [unit] = expression'")
+        try:
+            metric = DerivedMetric(match["name"], match["expression"], match["unit"] and match["unit"].strip())
+        except DerivedMetricError as err:
+            raise DerivedMetricError(f"Line {number}: {err}") from err
+        if metric.name in names:
+            raise DerivedMetricError(f"Line {number}: {metric.name} is defined twice")
+        names.add(metric.name)
+        metrics.append(metric)
+    return metrics
+
+
+# derived metrics of the public API snapshot, always evaluated
+BUILTIN_METRICS = parse_metrics("""
+SiteLoadkW [kW] = PvPowerInstantaneouskW + (BatteryPowerNegativeIsChargingkW or 0) - ActiveExportedPowerInstantaneouskW + ActiveImportedPowerInstantaneouskW
+""")
@@ -0,0 +1,33 @@
+"""Diagnostics support for the Redback integration."""
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN
+from .session import async_get_governor, async_get_pool
+
+TO_REDACT = {"auth", "client_id"}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a Redback config entry."""
+    coordinator = hass.data[DOMAIN][entry.entry_id]
+
+    return {
+        "entry": async_redact_data(entry.as_dict(), TO_REDACT),
+        "connection_pool": async_get_pool(hass).getStats(),
+        "request_governor": async_get_governor(hass, entry.data["client_id"]).getStats(),
+        "capabilities": coordinator.capabilities.as_dict(),
+        "samples_buffered": len(coordinator.samples),
+        "poll_interval": coordinator.refresh_interval.total_seconds(),
+        "freshness": coordinator.freshness_latest,
+        "rejected_values": coordinator.filters.stats(),
+        "archive_days": [day.isoformat() for day in await hass.async_add_executor_job(coordinator.archive.days)]
+        if coordinator.archive is not None else None,
+    }
@@ -0,0 +1,130 @@
+"""Energy totals derived from the Redback cumulative counters."""
+from __future__ import annotations
+
+from collections.abc import Mapping
+from datetime import date, timedelta
+from typing import Any
+
+# engine field -> all-time counter of the dynamic data (kWh)
+COUNTERS = {
+    "pv": "PvAllTimeEnergykWh",
+    "export": "ExportAllTimeEnergykWh",
+    "import": "ImportAllTimeEnergykWh",
+    "load": "LoadAllTimeEnergykWh",
+}
+COUNTER_FIELDS = {key: field for field, key in COUNTERS.items()}
+BATTERY_FIELDS = ["battery_charge", "battery_discharge"]
+FIELDS = [*COUNTERS, *BATTERY_FIELDS]
+
+# a counter dropping below this fraction of its previous value was reset, smaller drops are ignored
+RESET_RATIO = 0.5
+# the counters have 0.1 kWh resolution, the battery balance is only attributed once it leaves this band
+BATTERY_DEADBAND = 0.15  # kWh
+
+
+class EnergyDeltaEngine:
+    """Turns the all-time counters of successive snapshots into per-snapshot deltas and running totals.
+
+    Battery energy is not counted by the API, it is derived from the energy balance
+    (charge = dPV + dImport - dExport - dLoad). Its residual is carried over between
+    snapshots, so counter rounding can't inflate both the charge and discharge totals.
+    """
+
+    def __init__(self) -> None:
+        self.baselines: dict[str, float] = {}
+        self.totals: dict[str, float] = {field: 0.0 for field in FIELDS}
+        self.resets = 0
+        # without a battery the balance is only counter rounding, it isn't attributed
+        self.battery = True
+        self._battery_residual = 0.0
+
+    def update(self, snapshot: Mapping[str, Any]) -> dict[str, float]:
+        """Advance the engine with a new snapshot, returns the energy (kWh) of each field since the previous one"""
+        deltas = {}
+        for field, key in COUNTERS.items():
+            value = snapshot.get(key)
+            if not isinstance(value, (int, float)):
+                continue
+            previous = self.baselines.get(field)
+            if previous is None or value >= previous:
+                delta = value - previous if previous is not None else 0.0
+            elif value < previous * RESET_RATIO:
+                # counter reset (e.g. inverter replaced), start over from the new value
+                self.resets += 1
+                delta = 0.0
+            else:
+                # small regression (API correction), keep the higher baseline until the counter passes it
+                continue
+            self.baselines[field] = value
+            deltas[field] = delta
+            self.totals[field] += delta
+
+        if self.battery and len(deltas) == len(COUNTERS):
+            self._battery_residual += deltas["pv"] + deltas["import"] - deltas["export"] - deltas["load"]
+            if abs(self._battery_residual) >= BATTERY_DEADBAND:
+                field = "battery_charge" if self._battery_residual > 0 else "battery_discharge"
+                deltas[field] = abs(self._battery_residual)
+                self.totals[field] += deltas[field]
+                self._battery_residual = 0.0
+        return deltas
+
+    def as_dict(self) -> dict[str, Any]:
+        """Engine state, to be persisted"""
+        return {
+            "baselines": self.baselines,
+            "totals": self.totals,
+            "resets": self.resets,
+            "battery_residual": self._battery_residual,
+        }
+
+    def restore(self, state: Mapping[str, Any]) -> None:
+        """Restore the state saved by as_dict(); counter growth while stopped is counted by the next update"""
+        self.baselines = dict(state["baselines"])
+        self.totals.update(state["totals"])
+        self.resets = state.get("resets", 0)
+        self._battery_residual = state.get("battery_residual", 0.0)
+
+
+class PeriodMeters:
+    """Today, yesterday and this month totals of every energy field, fed with the engine's deltas.
+
+    Periods roll over on the first update of a new local day/month, so the energy of the
+    snapshot straddling midnight (or of a restart gap) is counted in the new period.
+    """
+
+    PERIODS = ["today", "yesterday", "this_month"]
+
+    def __init__(self) -> None:
+        self.day: date | None = None
+        self.periods: dict[str, dict[str, float]] = {period: dict.fromkeys(FIELDS, 0.0) for period in self.PERIODS}
+
+    def rollover(self, day: date) -> None:
+        """Start new periods when the local date changed"""
+        if day == self.day:
+            return
+        if self.day is not None and day > self.day:
+            consecutive = day - self.day == timedelta(days=1)
+            self.periods["yesterday"] = self.periods["today"] if consecutive else dict.fromkeys(FIELDS, 0.0)
+            self.periods["today"] = dict.fromkeys(FIELDS, 0.0)
+            if (day.year, day.month) != (self.day.year, self.day.month):
+                self.periods["this_month"] = dict.fromkeys(FIELDS, 0.0)
+        self.day = day
+
+    def update(self, day: date, deltas: Mapping[str, float]) -> None:
+        """Add the deltas of a snapshot taken on the local date day"""
+        self.rollover(day)
+        for field, delta in deltas.items():
+            self.periods["today"][field] += delta
+            self.periods["this_month"][field] += delta
+
+    def values(self, field: str) -> dict[str, float]:
+        """Period totals of one field"""
+        return {period: totals[field] for period, totals in self.periods.items()}
+
+    def as_dict(self) -> dict[str, Any]:
+        return {"day": self.day.isoformat() if self.day else None, "periods": self.periods}
+
+    def restore(self, state: Mapping[str, Any]) -> None:
+        self.day = date.fromisoformat(state["day"]) if state["day"] else None
+        for period, totals in state["periods"].items():
+            self.periods[period].update(totals)
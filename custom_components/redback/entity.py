@@ -1,6 +1,9 @@
 """Redback entity base class for the Redback integration."""
 from __future__ import annotations
 
+from collections.abc import Mapping
+from typing import Any
+
 from homeassistant.helpers.entity import DeviceInfo
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
@@ -13,6 +16,10 @@ class RedbackEntity(CoordinatorEntity[RedbackDataUpdateCoordinator]):
 
     coordinator: RedbackDataUpdateCoordinator
     _attr_has_entity_name = True
+    # how dynamic data is aggregated over each publish window (mean/min/max/last)
+    _default_aggregate = "last"
+    # only present while the coordinator serves a stale snapshot, changes with every publish
+    _unrecorded_attributes = frozenset({"snapshot_age"})
 
     def __init__(self, coordinator: RedbackDataUpdateCoordinator, details) -> None:
         # initialise the entity
@@ -29,9 +36,16 @@ class RedbackEntity(CoordinatorEntity[RedbackDataUpdateCoordinator]):
             self._attr_name = details["name"]
             self.id_suffix = details["id_suffix"]
             self.data_source = details.get("data_source")
+            # dynamic data field the site must report for the entity to be created
+            self.requires = details.get("requires", self.data_source)
             self.direction = details.get("direction")
             self.convertPercent = details.get("convertPercent")
             self.convertkW = details.get("convertkW")
+            self.aggregate = details.get("aggregate", self._default_aggregate)
+            # rarely used sensors are created disabled, they then cost nothing until enabled
+            # (without the detail the class default applies)
+            if "enabled_default" in details:
+                self._attr_entity_registry_enabled_default = details["enabled_default"]
 
         # link to the base Redback device
         self._attr_device_info = DeviceInfo(
@@ -42,3 +56,22 @@ class RedbackEntity(CoordinatorEntity[RedbackDataUpdateCoordinator]):
             sw_version=coordinator.inverter_info["FirmwareVersion"],
             configuration_url="https://portal.redbacktech.com/",
         )
+
+    @property
+    def demand(self) -> str | None:
+        """Coordinator computation this entity needs (None if it only reads snapshot data)."""
+        return None
+
+    async def async_added_to_hass(self) -> None:
+        """Register the entity's demand, disabled entities are never added and never register."""
+        await super().async_added_to_hass()
+        if (demand := self.demand) is not None:
+            self.async_on_remove(self.coordinator.async_add_demand(demand))
+
+    @property
+    def extra_state_attributes(self) -> Mapping[str, Any] | None:
+        """Return the entity's attributes, plus the snapshot age while stale data is served."""
+        attributes = super().extra_state_attributes
+        if (age := self.coordinator.snapshot_age) is None:
+            return attributes
+        return {**(attributes or {}), "snapshot_age": round(age)}
@@ -0,0 +1,207 @@
+"""Filter stages cleaning transient garbage out of the dynamic snapshots before they are used."""
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from bisect import bisect_left, insort
+from collections import Counter, deque
+from collections.abc import Iterable, Mapping, MutableMapping
+from fnmatch import fnmatchcase
+from typing import Any
+
+# plausible value range of each field ('*' matches the phase suffix), values outside are rejected
+FIELD_RANGES = {
+    "VoltageInstantaneousV*": (150.0, 450.0),
+    "CurrentInstantaneousA*": (-250.0, 250.0),  # signed on some sites
+    "FrequencyInstantaneousHz": (45.0, 65.0),
+    "BatterySoCInstantaneous0to1": (0.0, 1.0),
+    "InverterTemperatureC": (-40.0, 120.0),
+    "PvPowerInstantaneouskW": (0.0, 200.0),
+    "BatteryPowerNegativeIsChargingkW": (-200.0, 200.0),
+    "Active*PowerInstantaneouskW*": (-200.0, 200.0),
+}
+# fields sometimes missing (None) although the site has them, the previous value is held
+HELD_FIELDS = ["BatteryPowerNegativeIsChargingkW", "BatterySoCInstantaneous0to1"]
+# fields checked for spikes against their recent median, with the smallest deviation that counts;
+# only fields whose isolated jumps are artifacts: current, PV and load power genuinely step (a kettle,
+# a cloud edge) and are left alone
+OUTLIER_FIELDS = {
+    "VoltageInstantaneousV*": 5.0,
+    "FrequencyInstantaneousHz": 0.2,
+    "InverterTemperatureC": 3.0,
+}
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+class _Patterns:
+    """Maps field names to the value of the first matching pattern, memoised per field"""
+
+    def __init__(self, patterns: Mapping[str, Any]) -> None:
+        self._patterns = patterns
+        self._fields: dict[str, Any] = {}
+
+    def get(self, field: str) -> Any:
+        if field not in self._fields:
+            self._fields[field] = next(
+                (value for pattern, value in self._patterns.items() if fnmatchcase(field, pattern)), None
+            )
+        return self._fields[field]
+
+
+class SampleFilter(ABC):
+    """A filter stage: replaces the values of a snapshot it rejects, and counts them per field"""
+
+    reason = "rejected"
+
+    def __init__(self) -> None:
+        self.rejected: Counter[str] = Counter()
+
+    @abstractmethod
+    def apply(self, snapshot: MutableMapping[str, Any]) -> None:
+        """Filter snapshot in place"""
+
+    def _reject(self, snapshot: MutableMapping[str, Any], field: str, replacement: Any) -> None:
+        snapshot[field] = replacement
+        self.rejected[field] += 1
+
+
+class RangeFilter(SampleFilter):
+    """Rejects values outside their field's range, the last accepted value is used instead.
+
+    Without an accepted value yet the field is dropped from the snapshot, so the entities
+    keep their previous state.
+    """
+
+    reason = "range"
+
+    def __init__(self, ranges: Mapping[str, tuple[float, float]] = FIELD_RANGES) -> None:
+        super().__init__()
+        self._ranges = _Patterns(ranges)
+        self._last: dict[str, float] = {}
+
+    def apply(self, snapshot: MutableMapping[str, Any]) -> None:
+        for field, value in list(snapshot.items()):
+            if not _is_number(value) or (bounds := self._ranges.get(field)) is None:
+                continue
+            if bounds[0] <= value <= bounds[1]:
+                self._last[field] = value
+            elif field in self._last:
+                self._reject(snapshot, field, self._last[field])
+            else:
+                del snapshot[field]
+                self.rejected[field] += 1
+
+
+class MissingFilter(SampleFilter):
+    """Holds the previous value of fields that turn None after having had values"""
+
+    reason = "missing"
+
+    def __init__(self, fields: Iterable[str] = HELD_FIELDS) -> None:
+        super().__init__()
+        self._fields = list(fields)
+        self._last: dict[str, float] = {}
+
+    def apply(self, snapshot: MutableMapping[str, Any]) -> None:
+        for field in self._fields:
+            value = snapshot.get(field)
+            if _is_number(value):
+                self._last[field] = value
+            elif field in self._last and field in snapshot:
+                self._reject(snapshot, field, self._last[field])
+
+
+class _MedianWindow:
+    """Last size accepted values of a field, also kept sorted for the median"""
+
+    __slots__ = ("values", "ordered", "pending")
+
+    def __init__(self, size: int) -> None:
+        self.values: deque[float] = deque(maxlen=size)
+        self.ordered: list[float] = []
+        # last rejected value, a next value close to it means a level change rather than a spike
+        self.pending: float | None = None
+
+    def push(self, value: float) -> None:
+        if len(self.values) == self.values.maxlen:
+            del self.ordered[bisect_left(self.ordered, self.values[0])]
+        self.values.append(value)
+        insort(self.ordered, value)
+
+    def reset(self, values: Iterable[float]) -> None:
+        self.values.clear()
+        self.ordered.clear()
+        self.pending = None
+        for value in values:
+            self.push(value)
+
+
+class HampelFilter(SampleFilter):
+    """Streaming Hampel filter: replaces spikes by the median of the field's last window values.
+
+    A value is a spike when it is further from the median than threshold scaled MADs (but
+    at least the field's minimum deviation). The window has a fixed size, so each sample
+    costs constant time. The filter can't see future samples, so a rejected value that the
+    next sample confirms is taken as a level change: the window restarts from both values.
+    """
+
+    reason = "outlier"
+
+    def __init__(self, fields: Mapping[str, float] = OUTLIER_FIELDS, window: int = 7, threshold: float = 3.0) -> None:
+        super().__init__()
+        self._deviations = _Patterns(fields)
+        self._size = window
+        self._threshold = threshold
+        self._windows: dict[str, _MedianWindow] = {}
+
+    def apply(self, snapshot: MutableMapping[str, Any]) -> None:
+        for field, value in list(snapshot.items()):
+            if not _is_number(value) or (deviation := self._deviations.get(field)) is None:
+                continue
+            window = self._windows.get(field)
+            if window is None:
+                window = self._windows[field] = _MedianWindow(self._size)
+            # too few values yet to tell a spike
+            if len(window.ordered) < self._size // 2 + 1:
+                window.push(value)
+                continue
+
+            ordered = window.ordered
+            median = ordered[len(ordered) // 2]
+            mad = sorted(abs(v - median) for v in ordered)[len(ordered) // 2]
+            limit = max(self._threshold * 1.4826 * mad, deviation)
+            if abs(value - median) <= limit:
+                window.pending = None
+                window.push(value)
+            elif window.pending is not None and abs(value - window.pending) <= limit:
+                window.reset([window.pending, value])
+            else:
+                window.pending = value
+                self._reject(snapshot, field, median)
+
+
+class FilterChain:
+    """Runs the filter stages in order over each new snapshot (in place)"""
+
+    def __init__(self, stages: Iterable[SampleFilter]) -> None:
+        self.stages = list(stages)
+
+    def apply(self, snapshot: MutableMapping[str, Any]) -> None:
+        for stage in self.stages:
+            stage.apply(snapshot)
+
+    @property
+    def total(self) -> int:
+        """Number of rejected values since start"""
+        return sum(sum(stage.rejected.values()) for stage in self.stages)
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        """Rejected values per stage reason and field"""
+        return {stage.reason: dict(stage.rejected) for stage in self.stages}
+
+
+def default_filters() -> FilterChain:
+    """Range checks first (so garbage never reaches a median window), then held values, then spikes"""
+    return FilterChain([RangeFilter(), MissingFilter(), HampelFilter()])
@@ -0,0 +1,201 @@
+"""Headless Redback fleet poller, streams normalized dynamic snapshots as JSON Lines or CSV.
+
+Runs outside Home Assistant, only needs aiohttp:
+
+    REDBACK_CLIENT_ID=... REDBACK_CLIENT_SECRET=... \\
+        python custom_components/redback/fleet.py --sites S1234,S5678 --format csv --output redback.csv
+
+Without --sites/--sites-file every site of the account is polled.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import csv
+import io
+import json
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+from time import monotonic
+
+try:
+    from .redbacklib import RedbackConnectionPool, RedbackRateGovernor, RedbackInverter, RedbackAPIError, RedbackConnectionError, RedbackError
+except ImportError:  # run as a script
+    from redbacklib import RedbackConnectionPool, RedbackRateGovernor, RedbackInverter, RedbackAPIError, RedbackConnectionError, RedbackError
+
+# fixed CSV columns, so every file of a fleet has the same layout whatever the site's phase count
+CSV_FIELDS = [
+    "Timestamp",
+    "SiteId",
+    "Status",
+    "InverterMode",
+    "InverterPowerW",
+    "FrequencyInstantaneousHz",
+    "InverterTemperatureC",
+    "BatterySoCInstantaneous0to1",
+    "BatteryPowerNegativeIsChargingkW",
+    "PvPowerInstantaneouskW",
+    "ActiveExportedPowerInstantaneouskW",
+    "ActiveImportedPowerInstantaneouskW",
+    "ActiveNetPowerInstantaneouskW",
+    "VoltageInstantaneousV",
+    "CurrentInstantaneousA",
+    "PvAllTimeEnergykWh",
+    "ExportAllTimeEnergykWh",
+    "ImportAllTimeEnergykWh",
+    "LoadAllTimeEnergykWh",
+] + [f"{field}_{phase}" for phase in "ABC" for field in ("VoltageInstantaneousV", "CurrentInstantaneousA", "PowerFactorInstantaneousMinus1to1")]
+
+
+class SnapshotWriter:
+    """Writes snapshots to stdout or to size-rotated files (name, name.1 ... name.N)"""
+
+    def __init__(self, format, path=None, maxBytes=0, backupCount=5):
+        self.format = format
+        self.path = path
+        self.maxBytes = maxBytes
+        self.backupCount = backupCount
+        self._stream = None
+        self._size = 0
+        # CSV rows are rendered into a reusable buffer first, so their size is known before writing
+        self._buffer = io.StringIO()
+        self._rowWriter = csv.DictWriter(self._buffer, CSV_FIELDS, restval="", extrasaction="ignore")
+
+    def _open(self):
+        if self.path is None:
+            self._stream = sys.stdout
+            self._size = 0
+        else:
+            self._stream = open(self.path, "a", encoding="utf-8", newline="")
+            self._size = self._stream.tell()
+        if self.format == "csv" and self._size == 0:
+            self._stream.write(",".join(CSV_FIELDS) + "\r\n")
+
+    def _rotate(self):
+        self._stream.close()
+        for n in range(self.backupCount - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{n}"):
+                os.replace(f"{self.path}.{n}", f"{self.path}.{n + 1}")
+        if self.backupCount > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self._open()
+
+    def write(self, snapshot):
+        if self._stream is None:
+            self._open()
+        if self.format == "csv":
+            self._buffer.seek(0)
+            self._buffer.truncate()
+            self._rowWriter.writerow(snapshot)
+            line = self._buffer.getvalue()
+        else:
+            line = json.dumps(snapshot, separators=(",", ":")) + "\n"
+        if self.path is not None and self.maxBytes and self._size and self._size + len(line) > self.maxBytes:
+            self._rotate()
+        self._stream.write(line)
+        self._size += len(line)
+
+    def flush(self):
+        if self._stream is not None:
+            self._stream.flush()
+
+    def close(self):
+        if self._stream is not None and self._stream is not sys.stdout:
+            self._stream.close()
+        self._stream = None
+
+
+async def pollSite(inverter, writer, semaphore):
+    """Polls one site and writes its normalized snapshot, returns False on error"""
+    async with semaphore:
+        try:
+            energyData = await inverter.getEnergyData()
+        except (RedbackError, RedbackConnectionError, RedbackAPIError) as e:
+            print(f"{inverter.siteId}: {e}", file=sys.stderr)
+            return False
+        except (KeyError, IndexError, TypeError, ValueError, ArithmeticError) as e:
+            # a malformed payload of one site must not fail the whole round
+            print(f"{inverter.siteId}: malformed energy data ({type(e).__name__}: {e})", file=sys.stderr)
+            return False
+    writer.write({
+        "Timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "SiteId": inverter.siteId,
+        **energyData,
+    })
+    return True
+
+
+async def run(args):
+    clientId = args.client_id or os.environ.get("REDBACK_CLIENT_ID")
+    clientSecret = args.client_secret or os.environ.get("REDBACK_CLIENT_SECRET")
+    if not clientId or not clientSecret:
+        raise SystemExit("Redback client ID and secret are required (--client-id/--client-secret or REDBACK_CLIENT_ID/REDBACK_CLIENT_SECRET)")
+
+    pool = RedbackConnectionPool(limit=args.concurrency, limitPerHost=args.concurrency)
+    session = pool.getSession()
+    writer = SnapshotWriter(args.format, args.output, args.max_bytes, args.backup_count)
+    try:
+        # one client owns the account's bearer token and request governor, every site client borrows them
+        governor = RedbackRateGovernor(rate=args.rate, burst=args.burst)
+        account = RedbackInverter(auth_id=clientId, auth=clientSecret, apimethod="public", session=session, base_url=args.base_url, governor=governor)
+        siteIds = args.sites
+        if args.sites_file:
+            with open(args.sites_file, encoding="utf-8") as file:
+                siteIds = siteIds + [line.strip() for line in file if line.strip() and not line.startswith("#")]
+        if not siteIds:
+            siteIds = await account.getSiteIds()
+        inverters = [
+            RedbackInverter(auth_id=clientId, auth=clientSecret, apimethod="public", session=session, site_id=siteId, base_url=args.base_url, token_owner=account)
+            for siteId in dict.fromkeys(siteIds)
+        ]
+        for inverter in inverters:
+            # the polling rounds are the rate limit, every round fetches fresh data
+            inverter.setUpdateIntervals(energyData=timedelta(0))
+
+        semaphore = asyncio.Semaphore(args.concurrency)
+        rounds = 0
+        while True:
+            started = monotonic()
+            results = await asyncio.gather(*(pollSite(inverter, writer, semaphore) for inverter in inverters))
+            writer.flush()
+            rounds += 1
+            if args.verbose:
+                print(f"round {rounds}: {sum(results)}/{len(results)} sites in {monotonic() - started:.2f}s, governor {governor.getStats()}", file=sys.stderr)
+            if args.count and rounds >= args.count:
+                break
+            await asyncio.sleep(max(args.interval - (monotonic() - started), 0))
+    finally:
+        writer.close()
+        await pool.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Poll Redback sites concurrently and stream their dynamic data.")
+    parser.add_argument("--client-id", help="Redback API client ID (default: $REDBACK_CLIENT_ID)")
+    parser.add_argument("--client-secret", help="Redback API client secret (default: $REDBACK_CLIENT_SECRET)")
+    parser.add_argument("--sites", default=[], type=lambda value: [site for site in value.split(",") if site], help="comma-separated site IDs (default: every site of the account)")
+    parser.add_argument("--sites-file", help="file with one site ID per line")
+    parser.add_argument("--base-url", help="API base URL, e.g. a local stand-in server (default: Redback public API)")
+    parser.add_argument("--format", choices=["jsonl", "csv"], default="jsonl")
+    parser.add_argument("--output", help="output file, rotated by size (default: stdout)")
+    parser.add_argument("--max-bytes", type=int, default=64 * 1024 * 1024, help="rotate the output file at this size, 0 disables rotation")
+    parser.add_argument("--backup-count", type=int, default=5, help="rotated files to keep")
+    parser.add_argument("--concurrency", type=int, default=8, help="maximum requests in flight")
+    parser.add_argument("--rate", type=float, default=2.0, help="maximum requests per second for the account")
+    parser.add_argument("--burst", type=int, default=10, help="requests allowed in a burst above --rate")
+    parser.add_argument("--interval", type=float, default=60, help="seconds between polling rounds")
+    parser.add_argument("--count", type=int, default=0, help="number of polling rounds, 0 polls forever")
+    parser.add_argument("--verbose", action="store_true", help="report each round on stderr")
+    args = parser.parse_args(argv)
+
+    try:
+        asyncio.run(run(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""OpenMetrics endpoint serving the latest Redback snapshots."""
+from __future__ import annotations
+
+from collections.abc import Callable, Mapping
+from typing import Any
+
+from aiohttp import web
+
+from homeassistant.components.http import HomeAssistantView
+from homeassistant.core import HomeAssistant, callback
+
+from .const import DOMAIN, INVERTER_MODES, INVERTER_STATUS
+
+DATA_METRICS = f"{DOMAIN}_metrics"
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+# data key: (metric family, type, help); phase keys (<key>_<phase>) get a phase label
+DYNAMIC_METRICS = {
+    "PvPowerInstantaneouskW": ("redback_pv_power_kilowatts", "gauge", "Solar generation power"),
+    "BatteryPowerNegativeIsChargingkW": ("redback_battery_power_kilowatts", "gauge", "Battery power, negative is charging"),
+    "ActiveExportedPowerInstantaneouskW": ("redback_grid_export_power_kilowatts", "gauge", "Grid export power"),
+    "ActiveImportedPowerInstantaneouskW": ("redback_grid_import_power_kilowatts", "gauge", "Grid import power"),
+    "ActiveNetPowerInstantaneouskW": ("redback_grid_net_power_kilowatts", "gauge", "Grid net power, positive is export"),
+    "BatterySoCInstantaneous0to1": ("redback_battery_soc_ratio", "gauge", "Battery state of charge"),
+    "FrequencyInstantaneousHz": ("redback_grid_frequency_hertz", "gauge", "Grid frequency"),
+    "InverterTemperatureC": ("redback_inverter_temperature_celsius", "gauge", "Inverter temperature"),
+    "VoltageInstantaneousV": ("redback_grid_voltage_volts", "gauge", "Grid voltage (total available for three-phase)"),
+    "CurrentInstantaneousA": ("redback_grid_current_amperes", "gauge", "Grid current, sum of phases"),
+    "InverterPowerW": ("redback_inverter_power_setpoint_watts", "gauge", "Inverter power setpoint"),
+    "PvAllTimeEnergykWh": ("redback_pv_energy_kilowatthours", "counter", "Solar generation energy"),
+    "ExportAllTimeEnergykWh": ("redback_grid_export_energy_kilowatthours", "counter", "Grid export energy"),
+    "ImportAllTimeEnergykWh": ("redback_grid_import_energy_kilowatthours", "counter", "Grid import energy"),
+    "LoadAllTimeEnergykWh": ("redback_load_energy_kilowatthours", "counter", "Site load energy"),
+}
+PHASE_METRICS = {
+    "VoltageInstantaneousV": ("redback_phase_voltage_volts", "gauge", "Grid voltage per phase"),
+    "CurrentInstantaneousA": ("redback_phase_current_amperes", "gauge", "Grid current per phase"),
+    "PowerFactorInstantaneousMinus1to1": ("redback_phase_power_factor", "gauge", "Power factor per phase"),
+}
+STATIC_METRICS = {
+    "BatteryCapacitykWh": ("redback_battery_capacity_kilowatthours", "gauge", "Battery capacity"),
+    "UsableBatteryCapacitykWh": ("redback_battery_usable_capacity_kilowatthours", "gauge", "Usable battery capacity (off-grid)"),
+    "BatteryCount": ("redback_battery_count", "gauge", "Number of batteries"),
+    "PanelSizekW": ("redback_pv_panel_size_kilowatts", "gauge", "Installed solar panel size"),
+    "InverterMaxExportPowerW": ("redback_inverter_max_export_power_watts", "gauge", "Inverter maximum export power"),
+    "InverterMaxImportPowerW": ("redback_inverter_max_import_power_watts", "gauge", "Inverter maximum import power"),
+    "MinSoC0to1": ("redback_battery_min_soc_ratio", "gauge", "Minimum on-grid state of charge"),
+    "MinOffgridSoC0to1": ("redback_battery_min_offgrid_soc_ratio", "gauge", "Minimum off-grid state of charge"),
+}
+STATE_METRICS = {
+    "Status": ("redback_inverter_status", "stateset", "Inverter status"),
+    "InverterMode": ("redback_inverter_mode", "stateset", "Inverter mode"),
+}
+# possible states of each stateset, every one gets a sample (1 for the current state, else 0)
+STATES = {"Status": INVERTER_STATUS, "InverterMode": INVERTER_MODES}
+INFO_METRIC = ("redback_site", "info", "Redback site details")
+INFO_LABELS = {"SerialNumber": "serial", "ModelName": "model", "FirmwareVersion": "firmware", "SoftwareVersion": "software"}
+
+# family name -> (type, help) in output order
+FAMILIES = {
+    name: (kind, help)
+    for name, kind, help in [
+        INFO_METRIC,
+        *DYNAMIC_METRICS.values(),
+        *PHASE_METRICS.values(),
+        *STATIC_METRICS.values(),
+        *STATE_METRICS.values(),
+    ]
+}
+
+
+class RedbackMetrics:
+    """Pre-rendered metric lines of every site, assembled into one exposition body on demand.
+
+    A new snapshot only replaces the site's renderer, its lines are rendered by the next
+    scrape; nothing is rendered at all until the endpoint is scraped.
+    """
+
+    def __init__(self) -> None:
+        self._sites: dict[str, dict[str, list[str]]] = {}
+        self._pending: dict[str, Callable[[], dict[str, list[str]]]] = {}
+        self._body: str | None = None
+
+    @callback
+    def update(self, entry_id: str, render: Callable[[], dict[str, list[str]]]) -> None:
+        """Replace the metric lines of a site with those of a new snapshot (rendered at most once)."""
+        self._pending[entry_id] = render
+        self._body = None
+
+    @callback
+    def remove(self, entry_id: str) -> None:
+        """Drop the metric lines of an unloaded site."""
+        self._pending.pop(entry_id, None)
+        self._sites.pop(entry_id, None)
+        self._body = None
+
+    @callback
+    def body(self) -> str:
+        """Return the exposition body, only rebuilt after a site changed."""
+        if self._pending:
+            for entry_id, render in self._pending.items():
+                self._sites[entry_id] = render()
+            self._pending = {}
+        if self._body is None:
+            lines = []
+            for name, (kind, help) in FAMILIES.items():
+                samples = [line for families in self._sites.values() for line in families.get(name, ())]
+                if samples:
+                    lines.append(f"# TYPE {name} {kind}")
+                    lines.append(f"# HELP {name} {help}.")
+                    lines.extend(samples)
+            lines.append("# EOF")
+            self._body = "\n".join(lines) + "\n"
+        return self._body
+
+
+def render_site(
+    site_id: str, name: str, energy_data: Mapping[str, Any] | None, inverter_info: Mapping[str, Any] | None
+) -> dict[str, list[str]]:
+    """Render the metric lines of one site, grouped by family."""
+    labels = f'site="{_escape(site_id)}",name="{_escape(name)}"'
+    families: dict[str, list[str]] = {}
+
+    def add(family: str, value: Any, extra: str = "", suffix: str = "") -> None:
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            families.setdefault(family, []).append(f"{family}{suffix}{{{labels}{extra}}} {value}")
+
+    if inverter_info:
+        info = "".join(
+            f',{label}="{_escape(inverter_info[key])}"' for key, label in INFO_LABELS.items() if inverter_info.get(key) is not None
+        )
+        add(INFO_METRIC[0], 1, info, "_info")
+        for key, (family, _, _) in STATIC_METRICS.items():
+            add(family, inverter_info.get(key))
+
+    if energy_data:
+        for key, value in energy_data.items():
+            if key in DYNAMIC_METRICS:
+                family, kind, _ = DYNAMIC_METRICS[key]
+                add(family, value, suffix="_total" if kind == "counter" else "")
+            elif key in STATE_METRICS:
+                if value is None:
+                    continue
+                family = STATE_METRICS[key][0]
+                states = STATES[key] if value in STATES[key] else [*STATES[key], value]
+                for state in states:
+                    add(family, int(state == value), f',{family}="{_escape(state)}"')
+            elif "_" in key:
+                base, phase = key.rsplit("_", 1)
+                if base in PHASE_METRICS:
+                    add(PHASE_METRICS[base][0], value, f',phase="{_escape(phase)}"')
+
+    return families
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+@callback
+def async_get_metrics(hass: HomeAssistant) -> RedbackMetrics:
+    """Return the metrics registry, registering the HTTP view on first use."""
+    if (metrics := hass.data.get(DATA_METRICS)) is None:
+        metrics = hass.data[DATA_METRICS] = RedbackMetrics()
+        hass.http.register_view(RedbackMetricsView(metrics))
+    return metrics
+
+
+class RedbackMetricsView(HomeAssistantView):
+    """Serve the latest Redback values in OpenMetrics text format."""
+
+    url = "/api/redback/metrics"
+    name = "api:redback:metrics"
+    requires_auth = True
+
+    def __init__(self, metrics: RedbackMetrics) -> None:
+        self._metrics = metrics
+
+    async def get(self, request: web.Request) -> web.Response:
+        """Return the pre-rendered exposition body."""
+        return web.Response(body=self._metrics.body().encode(), headers={"Content-Type": CONTENT_TYPE})
@@ -3,10 +3,15 @@
 import aiohttp
 import asyncio
 from math import sqrt
-from datetime import datetime, timedelta
+from datetime import timedelta
+from time import monotonic, time
 from urllib.request import Request, urlopen
 from urllib.error import URLError, HTTPError
 import json
+from copy import deepcopy
+from email.utils import parsedate_to_datetime
+from heapq import heappush, heappop
+from itertools import count
 from json.decoder import JSONDecodeError
 
 
@@ -20,6 +25,247 @@ class RedbackConnectionError(Exception):
 class RedbackAPIError(Exception):
     """Redback Inverter API error"""
 
+class RedbackRateLimitError(RedbackError):
+    """Redback Inverter API usage limit reached (HTTP 429)"""
+
+
+class RedbackConnectionPool:
+    """Dedicated aiohttp session for the Redback hosts: capped, kept-alive, DNS-cached connections with usage counters"""
+
+    def __init__(self, limit=20, limitPerHost=4, keepaliveTimeout=75, dnsCacheTtl=300, ssl=None):
+        self._connectorArgs = {
+            "limit": limit,
+            "limit_per_host": limitPerHost,
+            "keepalive_timeout": keepaliveTimeout,
+            "ttl_dns_cache": dnsCacheTtl,
+            "use_dns_cache": True,
+        }
+        if ssl is not None:
+            self._connectorArgs["ssl"] = ssl
+        self._session = None
+        self.stats = {
+            "requests": 0,
+            "requests_in_flight": 0,
+            "request_errors": 0,
+            "connections_created": 0,
+            "connections_reused": 0,
+            "dns_cache_hits": 0,
+            "dns_cache_misses": 0,
+        }
+
+    def getSession(self):
+        """Returns the pooled session, creating it on first use (must be called from the event loop)"""
+        if self._session is None or self._session.closed:
+            trace = aiohttp.TraceConfig()
+            trace.on_request_start.append(self._onRequestStart)
+            trace.on_request_end.append(self._onRequestEnd)
+            trace.on_request_exception.append(self._onRequestException)
+            trace.on_connection_create_end.append(self._count("connections_created"))
+            trace.on_connection_reuseconn.append(self._count("connections_reused"))
+            trace.on_dns_cache_hit.append(self._count("dns_cache_hits"))
+            trace.on_dns_cache_miss.append(self._count("dns_cache_misses"))
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(**self._connectorArgs),
+                headers={"Accept-Encoding": "gzip"},
+                trace_configs=[trace],
+            )
+        return self._session
+
+    def getStats(self):
+        """Returns the pool limits and usage counters"""
+        return {
+            "limit": self._connectorArgs["limit"],
+            "limit_per_host": self._connectorArgs["limit_per_host"],
+            "keepalive_timeout": self._connectorArgs["keepalive_timeout"],
+            "ttl_dns_cache": self._connectorArgs["ttl_dns_cache"],
+            **self.stats,
+        }
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def _count(self, key):
+        async def handler(session, context, params):
+            self.stats[key] += 1
+        return handler
+
+    async def _onRequestStart(self, session, context, params):
+        self.stats["requests"] += 1
+        self.stats["requests_in_flight"] += 1
+
+    async def _onRequestEnd(self, session, context, params):
+        self.stats["requests_in_flight"] -= 1
+
+    async def _onRequestException(self, session, context, params):
+        self.stats["requests_in_flight"] -= 1
+        self.stats["request_errors"] += 1
+
+
+class ManualClock:
+    """Deterministic clock for tests and simulations, time only moves when advance() is called"""
+
+    def __init__(self, start=0.0):
+        self.now = start
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+class _Flight:
+    """One in-flight call shared by RedbackSingleFlight callers"""
+
+    __slots__ = ("task", "waiters", "callers")
+
+    def __init__(self, task):
+        self.task = task
+        self.waiters = 0
+        self.callers = 0
+
+
+class RedbackSingleFlight:
+    """Lets concurrent callers with the same key share one in-flight call instead of repeating it"""
+
+    def __init__(self):
+        self._flights = {}
+
+    def inFlight(self, key):
+        return key in self._flights
+
+    async def run(self, key, factory, copyResult=False):
+        """Awaits factory() once per key; set copyResult when callers may mutate the (shared) result"""
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = self._flights[key] = _Flight(asyncio.ensure_future(factory()))
+
+            def done(task):
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+
+            flight.task.add_done_callback(done)
+
+        flight.waiters += 1
+        flight.callers += 1
+        try:
+            result = await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            # only cancel the shared call once nobody is waiting for it any more
+            if flight.waiters == 1 and not flight.task.done():
+                flight.task.cancel()
+            raise
+        finally:
+            flight.waiters -= 1
+
+        # every caller gets its own copy once the result has been shared
+        return deepcopy(result) if copyResult and flight.callers > 1 else result
+
+
+class RedbackRateGovernor:
+    """Token-bucket request governor for one Redback account, shared by all its clients
+
+    Requests wait for a token in priority order (auth, dynamic, config, static data). A 429
+    response pauses the bucket for Retry-After and halves the rate, which then climbs back
+    linearly to the full rate over recoveryTime seconds.
+    """
+
+    PRIORITY_AUTH = 0
+    PRIORITY_DYNAMIC = 1
+    PRIORITY_CONFIG = 2
+    PRIORITY_STATIC = 3
+
+    def __init__(self, rate=2.0, burst=10, recoveryTime=300, defaultRetryAfter=60, clock=monotonic):
+        """rate is in requests per second, burst is the bucket size"""
+        self.maxRate = rate
+        self.burst = burst
+        self.recoveryTime = recoveryTime
+        self.defaultRetryAfter = defaultRetryAfter
+        self.clock = clock
+        self._tokens = float(burst)
+        self._updated = clock()
+        self._slowedRate = rate
+        self._pausedUntil = None
+        self._waiting = [] # heap of (priority, sequence, future)
+        self._sequence = count()
+        self._pump = None
+        self.stats = {"granted": 0, "delayed": 0, "rate_limited": 0}
+
+    def getRate(self):
+        """Returns the current rate (requests per second)"""
+        if self._pausedUntil is None:
+            return self.maxRate
+        elapsed = self.clock() - self._pausedUntil
+        if elapsed >= self.recoveryTime:
+            return self.maxRate
+        return self._slowedRate + (self.maxRate - self._slowedRate) * max(elapsed, 0) / self.recoveryTime
+
+    def getStats(self):
+        waiting = sum(not future.done() for _, _, future in self._waiting)
+        return {**self.stats, "waiting": waiting, "rate": round(self.getRate(), 3)}
+
+    def _refill(self):
+        now = self.clock()
+        if self._pausedUntil is not None and now < self._pausedUntil:
+            self._updated = now
+            return self._pausedUntil - now
+        self._tokens = min(self._tokens + (now - self._updated) * self.getRate(), self.burst)
+        self._updated = now
+        return 0
+
+    async def acquire(self, priority):
+        """Waits until a request of the given priority may be sent"""
+        if not self._waiting and self._refill() == 0 and self._tokens >= 1:
+            self._tokens -= 1
+            self.stats["granted"] += 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heappush(self._waiting, (priority, next(self._sequence), future))
+        self.stats["delayed"] += 1
+        if self._pump is None or self._pump.done():
+            self._pump = asyncio.ensure_future(self._run())
+        await future
+
+    async def _run(self):
+        """Hands out tokens to the waiting requests, highest priority first"""
+        while self._waiting:
+            if self._waiting[0][2].done(): # cancelled while waiting
+                heappop(self._waiting)
+                continue
+            pause = self._refill()
+            if pause == 0 and self._tokens >= 1:
+                self._tokens -= 1
+                self.stats["granted"] += 1
+                heappop(self._waiting)[2].set_result(None)
+                continue
+            await asyncio.sleep(pause or (1 - self._tokens) / self.getRate())
+
+    def backoff(self, retryAfter=None):
+        """Slows down after a 429 response: pause for retryAfter seconds and halve the rate"""
+        self.stats["rate_limited"] += 1
+        pausedUntil = self.clock() + (self.defaultRetryAfter if retryAfter is None else retryAfter)
+        if self._pausedUntil is None or pausedUntil > self._pausedUntil:
+            self._slowedRate = self.getRate() / 2
+            self._pausedUntil = pausedUntil
+        self._tokens = 0.0
+
+    @staticmethod
+    def parseRetryAfter(value):
+        """Returns the seconds of a Retry-After header (delay-seconds or HTTP-date), None if absent or invalid"""
+        if not value:
+            return None
+        try:
+            return max(float(value), 0)
+        except ValueError:
+            pass
+        try:
+            return max(parsedate_to_datetime(value).timestamp() - time(), 0)
+        except (TypeError, ValueError):
+            return None
+
 
 class RedbackInverter:
     """Gather Redback Inverter data from the cloud API"""
@@ -33,17 +279,23 @@ class RedbackInverter:
     _OAuth2_client_id = ""
     _OAuth2_client_secret = ""
     _OAuth2_bearer_token = ""
-    _OAuth2_next_update = datetime.now()
+    _OAuth2_next_update = None
     _apiResponse = "json"
     _inverterInfo = None
     _energyData = None
+    _phaseIds = None
     _energyDataUpdateInterval = timedelta(minutes=1)
-    _energyDataNextUpdate = datetime.now()
+    _energyDataNextUpdate = None
     _inverterInfoUpdateInterval = timedelta(minutes=15)
-    _inverterInfoNextUpdate = datetime.now()
+    _inverterInfoNextUpdate = None
     _scheduleData = None
     _scheduleDataUpdateInterval = timedelta(minutes=1)
-    _scheduleDataNextUpdate = datetime.now()
+    _scheduleDataNextUpdate = None
+    # callers polling on a fixed schedule may come back before an update is due, e.g. when the
+    # previous update started late (held back by the governor): at least this many seconds,
+    # and up to this share of the tier's interval
+    _dueTolerance = 2.0  # seconds
+    _dueToleranceShare = 0.25
     _apiPublicRequestMap = {
         "public_BasicData": "EnergyData/With/Nodes",
         "public_StaticData": "EnergyData/{self.siteId}/Static",
@@ -51,6 +303,24 @@ class RedbackInverter:
         "public_ScheduleData": "Schedule/By/Site/{self.siteId}?includeStale=false",
         "public_ConfigData": "Configuration/{self.siteId}/Configuration"
     }
+    # per-request timeouts (seconds): dynamic data is small and time-critical, the rest can take longer
+    _apiTimeouts = {
+        "Auth/token": 15,
+        "public_BasicData": 20,
+        "public_StaticData": 20,
+        "public_DynamicData": 10,
+        "public_ScheduleData": 15,
+        "public_ConfigData": 15,
+    }
+    _apiDefaultTimeout = 15
+    # governor priorities: dynamic data first, static data can wait
+    _apiPriorities = {
+        "Auth/token": RedbackRateGovernor.PRIORITY_AUTH,
+        "public_DynamicData": RedbackRateGovernor.PRIORITY_DYNAMIC,
+        "energyflowd2": RedbackRateGovernor.PRIORITY_DYNAMIC,
+        "public_ConfigData": RedbackRateGovernor.PRIORITY_CONFIG,
+        "public_ScheduleData": RedbackRateGovernor.PRIORITY_CONFIG,
+    }
     _ordinalMap = {
         "first": 1,
         "second": 2,
@@ -64,9 +334,24 @@ class RedbackInverter:
         "tenth": 10,
     }
 
-    def __init__(self, auth_id, auth, apimethod, session, site_index=1):
-        """Constructor: needs API details (public = OAuth2 client_id and secret, private = auth cookie and inverter serial number)"""
+    def __init__(self, auth_id, auth, apimethod, session, site_index=1, requests=None, clock=monotonic, site_id=None, base_url=None, token_owner=None, governor=None):
+        """Constructor: needs API details (public = OAuth2 client_id and secret, private = auth cookie and inverter serial number)
+
+        requests is an optional RedbackSingleFlight shared between clients, so identical concurrent HTTP requests are only sent once
+        clock returns monotonic seconds and drives all rate limiting (immune to NTP/DST steps), inject a ManualClock in tests
+        site_id skips the site lookup by index, base_url points the client at another API host (e.g. a local stand-in server)
+        token_owner is another public API client of the same account whose bearer token is used instead of requesting one
+        governor is the RedbackRateGovernor of the account, share one between all clients of an account (defaults to the token owner's)
+        """
         self._session = session
+        self.clock = clock
+        self.siteId = site_id
+        self._tokenOwner = token_owner
+        if governor is None:
+            governor = token_owner._governor if token_owner is not None else RedbackRateGovernor(clock=clock)
+        self._governor = governor
+        self._requests = requests if requests is not None else RedbackSingleFlight()
+        self._calls = RedbackSingleFlight() # per-client dedupe of the methods that update client state
         self._apiPrivate = (apimethod == 'private') # Public API vs Private API
         if type(site_index) is str:
             self.siteIndex = self._ordinalMap.get(site_index.lower(), 1)
@@ -86,79 +371,146 @@ class RedbackInverter:
             self._OAuth2_client_id = auth_id.encode()
             self._OAuth2_client_secret = auth.encode()
 
+        if base_url is not None:
+            self._apiBaseURL = base_url.rstrip("/") + "/"
+
     def isPrivateAPI(self):
         return self._apiPrivate
 
+    def _isDue(self, nextUpdate, interval=None):
+        """True when a rate-limited update scheduled at nextUpdate (clock seconds, None = never fetched) is due"""
+        tolerance = self._dueTolerance
+        if interval is not None:
+            tolerance = max(tolerance, interval.total_seconds() * self._dueToleranceShare)
+        return nextUpdate is None or self.clock() >= nextUpdate - tolerance
+
+    def setUpdateIntervals(self, energyData=None, inverterInfo=None, scheduleData=None):
+        """Overrides the rate-limit intervals (timedelta) for each data tier, None leaves a tier unchanged.
+
+        Can be called at any time: cached data is kept, a pending update is moved to the
+        previous update time plus the new interval (so it may become due immediately).
+        """
+        for tier, interval in (("energyData", energyData), ("inverterInfo", inverterInfo), ("scheduleData", scheduleData)):
+            if interval is None:
+                continue
+            nextUpdate = getattr(self, f"_{tier}NextUpdate")
+            if nextUpdate is not None:
+                shift = (interval - getattr(self, f"_{tier}UpdateInterval")).total_seconds()
+                setattr(self, f"_{tier}NextUpdate", nextUpdate + shift)
+            setattr(self, f"_{tier}UpdateInterval", interval)
+
     async def hasBattery(self):
         # Note: private API doesn't have "BatteryCount", need examples without
         # battery so the hasBattery() method can be updated to suit
         inverter_info = await self.getInverterInfo()
         return inverter_info.get("BatteryCount", 0) > 0
 
+    def getPhaseIds(self):
+        """Returns the ids of the grid phases in the latest energy data (e.g. ['A']), None before it or with the private API"""
+        return self._phaseIds
+
     async def _apiGetBearerToken(self):
         """Returns an active OAuth2 bearer token for use with public API methods"""
+        if self._tokenOwner is not None:
+            return await self._tokenOwner._apiGetBearerToken()
 
-        # do we need to request a new bearer token?
-        if datetime.now() > self._OAuth2_next_update:
-            full_url = self._apiBaseURL + 'Auth/token'
-            data = b'client_id=' + self._OAuth2_client_id + b'&client_secret=' + self._OAuth2_client_secret
-            headers = { "Content-Type": "application/x-www-form-urlencoded" }
-
-            # retry API request if connection error
-            retries = 3
-            for i in range(retries):
-                try:
-                    response = await self._session.post(url=full_url, data=data, headers=headers) 
-
-                except aiohttp.ClientConnectorError as e:
-                    # retry logic for error "Cannot connect to host api.redbacktech.com:443 ssl:default [Try again]"
-                    if i < retries-1:
-                        continue
-                    else:
-                        raise RedbackConnectionError(
-                            f"HTTP OAuth2 Connection Error. {e}"
-                        ) from e
-                except aiohttp.ClientResponseError as e:
-                    raise RedbackError(
-                        f"HTTP Response Error. {e.code} {e.reason}"
-                    ) from e
-                except HTTPError as e:
-                    # 400 Bad Request = client_id not found
-                    # 401 Unauthorized = client_secret incorrect
-                    # 404 Not Found = bad endpoint
-                    # e.read().decode() returns Unicode string JSON, the "error" key defines the error type (https://www.oauth.com/oauth2-servers/access-tokens/access-token-response/)
-                    raise RedbackError(
-                        f"HTTP Error. {e.code} {e.reason}"
-                    ) from e
-                except URLError as e:
-                    # If we get here, the URL is wrong or down
-                    raise RedbackError(
-                        f"URL Error. {e.reason}"
-                    ) from e
+        # do we need to request a new bearer token? (concurrent callers share one request)
+        if self._isDue(self._OAuth2_next_update) or self._calls.inFlight("token"):
+            await self._calls.run("token", self._apiRequestBearerToken)
+
+        return self._OAuth2_bearer_token
+
+    async def refreshBearerToken(self):
+        """Requests a new OAuth2 bearer token now, regardless of the current token's expiry"""
+        await self._calls.run("token", self._apiRequestBearerToken)
+        return self._OAuth2_bearer_token
 
-                break
+    def getTokenExpiresIn(self):
+        """Returns the seconds left before the current bearer token expires (None without a token)"""
+        if self._apiPrivate or not self._OAuth2_bearer_token:
+            return None
+        return self._OAuth2_next_update - self.clock()
+
+    def getTokenState(self):
+        """Returns the current bearer token and its expiry (POSIX timestamp), so it can be persisted"""
+        if self._apiPrivate or not self._OAuth2_bearer_token:
+            return None
+        # the monotonic clock means nothing after a restart, persist wall-clock time
+        return {"token": self._OAuth2_bearer_token, "expires": time() + self.getTokenExpiresIn()}
+
+    def setTokenState(self, state):
+        """Restores a bearer token saved by getTokenState(), ignored once expired"""
+        expiresIn = state["expires"] - time()
+        if not self._apiPrivate and expiresIn > 0:
+            self._OAuth2_bearer_token = state["token"]
+            self._OAuth2_next_update = self.clock() + expiresIn
+
+    async def _apiRequestBearerToken(self):
+        """Requests a new OAuth2 bearer token"""
+        full_url = self._apiBaseURL + 'Auth/token'
+        data = b'client_id=' + self._OAuth2_client_id + b'&client_secret=' + self._OAuth2_client_secret
+        headers = { "Content-Type": "application/x-www-form-urlencoded" }
 
-            # collect data packet
+        # retry API request if connection error
+        retries = 3
+        for i in range(retries):
             try:
-                data = await response.json()
-            except JSONDecodeError as e:
-                raise RedbackAPIError(
-                    f"JSON Error. {e.msg}. Pos={e.pos} Line={e.lineno} Col={e.colno}"
+                # the response is released back to the pool as soon as the body has been read
+                timeout = aiohttp.ClientTimeout(total=self._apiTimeouts.get("Auth/token", self._apiDefaultTimeout))
+                await self._governor.acquire(RedbackRateGovernor.PRIORITY_AUTH)
+                async with self._session.post(url=full_url, data=data, headers=headers, timeout=timeout) as response:
+                    self._checkRateLimit(response)
+                    # collect data packet
+                    try:
+                        data = await response.json()
+                    except JSONDecodeError as e:
+                        raise RedbackAPIError(
+                            f"JSON Error. {e.msg}. Pos={e.pos} Line={e.lineno} Col={e.colno}"
+                        ) from e
+
+            except aiohttp.ClientConnectorError as e:
+                # retry logic for error "Cannot connect to host api.redbacktech.com:443 ssl:default [Try again]"
+                if i < retries-1:
+                    continue
+                else:
+                    raise RedbackConnectionError(
+                        f"HTTP OAuth2 Connection Error. {e}"
+                    ) from e
+            except asyncio.TimeoutError as e:
+                raise RedbackConnectionError(
+                    f"HTTP OAuth2 Timeout. {full_url}"
+                ) from e
+            except aiohttp.ClientResponseError as e:
+                raise RedbackError(
+                    f"HTTP Response Error. {e.code} {e.reason}"
+                ) from e
+            except HTTPError as e:
+                # 400 Bad Request = client_id not found
+                # 401 Unauthorized = client_secret incorrect
+                # 404 Not Found = bad endpoint
+                # e.read().decode() returns Unicode string JSON, the "error" key defines the error type (https://www.oauth.com/oauth2-servers/access-tokens/access-token-response/)
+                raise RedbackError(
+                    f"HTTP Error. {e.code} {e.reason}"
+                ) from e
+            except URLError as e:
+                # If we get here, the URL is wrong or down
+                raise RedbackError(
+                    f"URL Error. {e.reason}"
                 ) from e
 
-            # build authorization string
-            # (KeyError means the auth was unsuccessful)
-            try:
-                self._OAuth2_bearer_token = data['token_type'] + ' ' + data['access_token']
-            except KeyError as e:
-                raise RedbackAPIError(
-                    f"OAuth2 Error. {data['error']}: {data['error_description']}"
-                )
+            break
 
-            # set update timeout
-            self._OAuth2_next_update = datetime.now() + timedelta(seconds=int(data['expires_in']))
+        # build authorization string
+        # (KeyError means the auth was unsuccessful)
+        try:
+            self._OAuth2_bearer_token = data['token_type'] + ' ' + data['access_token']
+        except KeyError as e:
+            raise RedbackAPIError(
+                f"OAuth2 Error. {data['error']}: {data['error_description']}"
+            )
 
-        return self._OAuth2_bearer_token
+        # set update timeout
+        self._OAuth2_next_update = self.clock() + int(data['expires_in'])
 
     async def _apiRequest(self, endpoint):
         """Call into Redback cloud API"""
@@ -169,7 +521,7 @@ class RedbackInverter:
         # Public API endpoint
         if endpoint.startswith("public_"):
             if not self.siteId and endpoint != "public_BasicData":
-                self.siteId = await self.getSiteId()
+                await self.getSiteId()
             full_url = self._apiBaseURL + self._apiPublicRequestMap[endpoint]
             full_url = eval(f"f'{full_url}'") # replace {vars} in full_url
             request_headers = {"authorization": await self._apiGetBearerToken()} 
@@ -184,11 +536,38 @@ class RedbackInverter:
                 # https://portal.redbacktech.com/api/v2/inverterinfo?SerialNumber=$SERIAL
                 full_url = self._apiBaseURL + endpoint + self._apiSerial
 
+        # identical concurrent requests (same credentials and URL) share a single HTTP round trip
+        credential = self._apiCookie if self._apiPrivate else self._OAuth2_client_id
+        return await self._requests.run(
+            (credential, full_url),
+            lambda: self._apiFetch(endpoint, full_url, request_headers),
+            copyResult=True, # callers post-process (and mutate) the returned data
+        )
+
+    async def _apiFetch(self, endpoint, full_url, request_headers):
+        """Performs one Redback cloud API GET request (with connection retries)"""
+
         # retry API request if connection error
         retries = 3
         for i in range(retries):
             try:
-                response = await self._session.get(full_url, headers=request_headers) 
+                # the response is released back to the pool as soon as the body has been read
+                timeout = aiohttp.ClientTimeout(total=self._apiTimeouts.get(endpoint, self._apiDefaultTimeout))
+                await self._governor.acquire(self._apiPriorities.get(endpoint, RedbackRateGovernor.PRIORITY_STATIC))
+                async with self._session.get(full_url, headers=request_headers, timeout=timeout) as response:
+                    self._checkRateLimit(response)
+                    # check for API error (e.g. expired credentials or invalid serial)
+                    if not response.ok:
+                        message = await response.text()
+                        raise RedbackAPIError(f"{response.status} {response.reason}. {message}")
+
+                    # collect data packet
+                    try:
+                        data = await response.json()
+                    except JSONDecodeError as e:
+                        raise RedbackAPIError(
+                            f"JSON Error. {e.msg}. Pos={e.pos} Line={e.lineno} Col={e.colno}"
+                        ) from e
 
             except aiohttp.ClientConnectorError as e:
                 # retry logic for error "Cannot connect to host api.redbacktech.com:443 ssl:default [Try again]"
@@ -198,6 +577,11 @@ class RedbackInverter:
                     raise RedbackConnectionError(
                         f"HTTP Connection Error. {e}"
                     ) from e
+            except asyncio.TimeoutError as e:
+                # no retry, a hung endpoint would only eat into the caller's refresh budget
+                raise RedbackConnectionError(
+                    f"HTTP Timeout. {endpoint}"
+                ) from e
             except aiohttp.ClientResponseError as e:
                 raise RedbackError(
                     f"HTTP Response Error. {e.code} {e.reason}"
@@ -211,21 +595,17 @@ class RedbackInverter:
 
             break
 
-        # check for API error (e.g. expired credentials or invalid serial)
-        if not response.ok:
-            message = await response.text()
-            raise RedbackAPIError(f"{response.status} {response.reason}. {message}")
-
-        # collect data packet
-        try:
-            data = await response.json()
-        except JSONDecodeError as e:
-            raise RedbackAPIError(
-                f"JSON Error. {e.msg}. Pos={e.pos} Line={e.lineno} Col={e.colno}"
-            ) from e
-
         return data
 
+    def _checkRateLimit(self, response):
+        """Raises RedbackRateLimitError on a 429 response, after telling the governor to slow down"""
+        if response.status == 429:
+            retryAfter = RedbackRateGovernor.parseRetryAfter(response.headers.get("Retry-After"))
+            self._governor.backoff(retryAfter)
+            raise RedbackRateLimitError(
+                f"HTTP 429 Too Many Requests. Retry after {self._governor.defaultRetryAfter if retryAfter is None else retryAfter:.0f}s"
+            )
+
     async def testConnection(self):
         """Tests the API connection, will return True or raise RedbackError or RedbackAPIError"""
 
@@ -238,9 +618,17 @@ class RedbackInverter:
 
     async def getSiteId(self):
         """Returns site ID via public API"""
-        if self.siteId is not None:
-            return self.siteId
+        if self.siteId is None:
+            self.siteId = await self._calls.run("siteId", self._apiRequestSiteId)
+        return self.siteId
+
+    async def getSiteIds(self):
+        """Returns the IDs of every site of the account via public API"""
+        data = await self._apiRequest("public_BasicData")
+        return [item["Id"] for item in data["Data"] if item["Type"] == "Site"]
 
+    async def _apiRequestSiteId(self):
+        """Looks up the site ID at self.siteIndex"""
         index = 0
         siteId = None
         data = await self._apiRequest("public_BasicData")
@@ -256,354 +644,102 @@ class RedbackInverter:
         """Returns inverter info (static data, updated first use only)"""
 
         # we rate-limit the inverter info updates, it is meant to be static data but some values do change
-        if datetime.now() > self._inverterInfoNextUpdate or self._inverterInfo == None:
-            self._inverterInfoNextUpdate = datetime.now() + self._inverterInfoUpdateInterval
-
-            if self._apiPrivate:
-                self._inverterInfo = await self._apiRequest("inverterinfo")
-                self._inverterInfo["ModelName"] = self._inverterInfo["Model"]
-                self._inverterInfo["FirmwareVersion"] = self._inverterInfo["Firmware"]
-                bannerInfo = await self._apiRequest("BannerInfo")
-                self._inverterInfo["ProductDisplayname"] = bannerInfo["ProductDisplayname"]
-                self._inverterInfo["InstalledPvSizeWatts"] = bannerInfo[
-                    "InstalledPvSizeWatts"
-                ]
-                self._inverterInfo["BatteryCapacityWattHours"] = bannerInfo[
-                    "BatteryCapacityWattHours"
-                ]
-
-                # Private API keys: Model, Firmware, RossVersion, IsThreePhaseInverter, IsSmartBatteryInverter, IsSinglePhaseInverter, IsGridTieInverter, ProductDisplayname, InstalledPvSizeWatts, BatteryCapacityWattHours
-
-            else:
-                dataPacket = (await self._apiRequest("public_StaticData"))["Data"]
-                dataConfig = (await self._apiRequest("public_ConfigData"))["Data"]
-                staticData = dataPacket["StaticData"]
-                nodesData = dataPacket["Nodes"][0]["StaticData"] # assumes node 0 is the inverter, node 1 is usually house load
-                self._inverterInfo = staticData["SiteDetails"]
-                self._inverterInfo["RemoteAccessConnection.Type"] = staticData["RemoteAccessConnection"]["Type"]
-                self._inverterInfo["NMI"] = staticData["NMI"]
-                self._inverterInfo["CommissioningDate"] = staticData["CommissioningDate"]
-                self._inverterInfo["SiteId"] = staticData["Id"]
-                self._inverterInfo["ModelName"] = nodesData["ModelName"]
-                self._inverterInfo["BatteryCount"] = nodesData["BatteryCount"]
-                self._inverterInfo["BatteryModels"] = ','.join(nodesData["BatteryModels"])
-                self._inverterInfo["SoftwareVersion"] = nodesData["SoftwareVersion"]
-                self._inverterInfo["FirmwareVersion"] = nodesData["FirmwareVersion"]
-                self._inverterInfo["SerialNumber"] = nodesData["Id"]
-                self._inverterInfo["Status"] = staticData["Status"]
-                self._inverterInfo["BatteryMaxChargePowerW"] = staticData["SiteDetails"]["BatteryMaxChargePowerkW"] * 1000
-                self._inverterInfo["BatteryMaxDischargePowerW"] = staticData["SiteDetails"]["BatteryMaxDischargePowerkW"] * 1000
-                self._inverterInfo["InverterMaxExportPowerW"] = staticData["SiteDetails"]["InverterMaxExportPowerkW"] * 1000
-                self._inverterInfo["InverterMaxImportPowerW"] = staticData["SiteDetails"]["InverterMaxImportPowerkW"] * 1000
-                self._inverterInfo["UsableBatteryCapacityOnGridkWh"] = staticData["SiteDetails"]["BatteryCapacitykWh"] * (1-dataConfig["MinSoC0to1"])
-                self._inverterInfo["MinSoC0to1"] = dataConfig["MinSoC0to1"]
-                self._inverterInfo["MinOffgridSoC0to1"] = dataConfig["MinOffgridSoC0to1"]
-                                
-                
-                
-                # Public API keys: BatteryMaxChargePowerkW, BatteryMaxDischargePowerkW, BatteryCapacitykWh, UsableBatteryCapacitykWh, BatteryModels, PanelModel, PanelSizekW, SystemType, InverterMaxExportPowerkW, InverterMaxImportPowerkW, RemoteAccessConnection.Type, NMI, CommissioningDate, ModelName, BatteryCount, SoftwareVersion, FirmwareVersion, SerialNumber
+        # (callers arriving while an update is in flight wait for it rather than starting another)
+        if self._isDue(self._inverterInfoNextUpdate, self._inverterInfoUpdateInterval) or self._inverterInfo == None or self._calls.inFlight("inverterInfo"):
+            await self._calls.run("inverterInfo", self._updateInverterInfo)
 
         return self._inverterInfo
 
+    async def _updateInverterInfo(self):
+        """Downloads and flattens the inverter info"""
+        self._inverterInfoNextUpdate = self.clock() + self._inverterInfoUpdateInterval.total_seconds()
+
+        if self._apiPrivate:
+            self._inverterInfo = await self._apiRequest("inverterinfo")
+            self._inverterInfo["ModelName"] = self._inverterInfo["Model"]
+            self._inverterInfo["FirmwareVersion"] = self._inverterInfo["Firmware"]
+            bannerInfo = await self._apiRequest("BannerInfo")
+            self._inverterInfo["ProductDisplayname"] = bannerInfo["ProductDisplayname"]
+            self._inverterInfo["InstalledPvSizeWatts"] = bannerInfo[
+                "InstalledPvSizeWatts"
+            ]
+            self._inverterInfo["BatteryCapacityWattHours"] = bannerInfo[
+                "BatteryCapacityWattHours"
+            ]
+
+            # Private API keys: Model, Firmware, RossVersion, IsThreePhaseInverter, IsSmartBatteryInverter, IsSinglePhaseInverter, IsGridTieInverter, ProductDisplayname, InstalledPvSizeWatts, BatteryCapacityWattHours
+
+        else:
+            dataPacket = (await self._apiRequest("public_StaticData"))["Data"]
+            dataConfig = (await self._apiRequest("public_ConfigData"))["Data"]
+            staticData = dataPacket["StaticData"]
+            nodesData = dataPacket["Nodes"][0]["StaticData"] # assumes node 0 is the inverter, node 1 is usually house load
+            self._inverterInfo = staticData["SiteDetails"]
+            self._inverterInfo["RemoteAccessConnection.Type"] = staticData["RemoteAccessConnection"]["Type"]
+            self._inverterInfo["NMI"] = staticData["NMI"]
+            self._inverterInfo["CommissioningDate"] = staticData["CommissioningDate"]
+            self._inverterInfo["SiteId"] = staticData["Id"]
+            self._inverterInfo["ModelName"] = nodesData["ModelName"]
+            self._inverterInfo["BatteryCount"] = nodesData["BatteryCount"]
+            self._inverterInfo["BatteryModels"] = ','.join(nodesData["BatteryModels"])
+            self._inverterInfo["SoftwareVersion"] = nodesData["SoftwareVersion"]
+            self._inverterInfo["FirmwareVersion"] = nodesData["FirmwareVersion"]
+            self._inverterInfo["SerialNumber"] = nodesData["Id"]
+            self._inverterInfo["Status"] = staticData["Status"]
+            self._inverterInfo["LatestDynamicDataUtc"] = staticData.get("LatestDynamicDataUtc")
+            # Measured flag of each dynamic data field (False: calculated by the cloud, or not reported at all)
+            self._inverterInfo["DynamicDataMeasured"] = {
+                key.removesuffix("Metadata"): value.get("Measured")
+                for key, value in (staticData.get("DynamicDataMetadata") or {}).items() if value
+            }
+            self._inverterInfo["BatteryMaxChargePowerW"] = staticData["SiteDetails"]["BatteryMaxChargePowerkW"] * 1000
+            self._inverterInfo["BatteryMaxDischargePowerW"] = staticData["SiteDetails"]["BatteryMaxDischargePowerkW"] * 1000
+            self._inverterInfo["InverterMaxExportPowerW"] = staticData["SiteDetails"]["InverterMaxExportPowerkW"] * 1000
+            self._inverterInfo["InverterMaxImportPowerW"] = staticData["SiteDetails"]["InverterMaxImportPowerkW"] * 1000
+            self._inverterInfo["UsableBatteryCapacityOnGridkWh"] = staticData["SiteDetails"]["BatteryCapacitykWh"] * (1-dataConfig["MinSoC0to1"])
+            self._inverterInfo["MinSoC0to1"] = dataConfig["MinSoC0to1"]
+            self._inverterInfo["MinOffgridSoC0to1"] = dataConfig["MinOffgridSoC0to1"]
+                            
+            
+            
+            # Public API keys: BatteryMaxChargePowerkW, BatteryMaxDischargePowerkW, BatteryCapacitykWh, UsableBatteryCapacitykWh, BatteryModels, PanelModel, PanelSizekW, SystemType, InverterMaxExportPowerkW, InverterMaxImportPowerkW, RemoteAccessConnection.Type, NMI, CommissioningDate, LatestDynamicDataUtc, DynamicDataMeasured, ModelName, BatteryCount, SoftwareVersion, FirmwareVersion, SerialNumber
+
     async def getEnergyData(self):
         """Returns energy data (dynamic data, instantaneous with 60s resolution)"""
 
         # energy data in the cloud data store is only refreshed by the Ouija device every 60s
-        if datetime.now() > self._energyDataNextUpdate or self._energyData == None:
-            self._energyDataNextUpdate = datetime.now() + self._energyDataUpdateInterval
-            if self._apiPrivate:
-                self._energyData = (await self._apiRequest("energyflowd2"))["Data"]["Input"]
-
-                # Private API keys: ACLoadW, BackupLoadW, SupportsConnectedPV, PVW, ThirdPartyW, GridStatus, GridNegativeIsImportW, ConfiguredWithBatteries, BatteryNegativeIsChargingW, BatteryStatus, BatterySoC0to100, CtComms
-
-            else:
-                self._energyData = (await self._apiRequest("public_DynamicData"))["Data"]
-                # gather individual voltage and current per phase
-                for phase in self._energyData["Phases"]:
-                    self._energyData["VoltageInstantaneousV_" + phase["Id"]] = phase["VoltageInstantaneousV"]
-                    self._energyData["CurrentInstantaneousA_" + phase["Id"]] = phase["CurrentInstantaneousA"]
-                    self._energyData["PowerFactorInstantaneousMinus1to1_" + phase["Id"]] = phase["PowerFactorInstantaneousMinus1to1"]
-                # store an average value too (by calculating total available voltage for three-phase)
-                phaseCount = len(self._energyData["Phases"])
-                self._energyData["VoltageInstantaneousV"] = round( sum(list(map(lambda x: x["VoltageInstantaneousV"], self._energyData["Phases"]))) / phaseCount * sqrt(phaseCount), 1)
-                self._energyData["ActiveExportedPowerInstantaneouskW"] = sum(list(map(lambda x: x["ActiveExportedPowerInstantaneouskW"], self._energyData["Phases"])))
-                self._energyData["ActiveImportedPowerInstantaneouskW"] = sum(list(map(lambda x: x["ActiveImportedPowerInstantaneouskW"], self._energyData["Phases"])))
-                self._energyData["ActiveNetPowerInstantaneouskW"] = self._energyData["ActiveExportedPowerInstantaneouskW"] - self._energyData["ActiveImportedPowerInstantaneouskW"]
-                self._energyData["CurrentInstantaneousA"] = sum(list(map(lambda x: x["CurrentInstantaneousA"], self._energyData["Phases"])))
-                self._energyData["InverterMode"] = self._energyData["Inverters"][0]["PowerMode"]["InverterMode"] 
-                self._energyData["InverterPowerW"] = self._energyData["Inverters"][0]["PowerMode"]["PowerW"] 
-                del self._energyData["TimestampUtc"]
-                del self._energyData["SiteId"]
-                del self._energyData["Inverters"]
-                del self._energyData["Phases"]
-                
-                # Public API keys: FrequencyInstantaneousHz, BatterySoCInstantaneous0to1, PvPowerInstantaneouskW, InverterTemperatureC, BatteryPowerNegativeIsChargingkW, PvAllTimeEnergykWh, ExportAllTimeEnergykWh, ImportAllTimeEnergykWh, LoadAllTimeEnergykWh, Status, VoltageInstantaneousV, ActiveExportedPowerInstantaneouskW, ActiveImportedPowerInstantaneouskW
+        if self._isDue(self._energyDataNextUpdate, self._energyDataUpdateInterval) or self._energyData == None or self._calls.inFlight("energyData"):
+            await self._calls.run("energyData", self._updateEnergyData)
 
         return self._energyData
-    
 
-class TestRedbackInverter(RedbackInverter):
-    
-    """Test class for Redback Inverter integration, returns sample data without any API calls"""
+    async def _updateEnergyData(self):
+        """Downloads and flattens the energy data"""
+        self._energyDataNextUpdate = self.clock() + self._energyDataUpdateInterval.total_seconds()
+        if self._apiPrivate:
+            self._energyData = (await self._apiRequest("energyflowd2"))["Data"]["Input"]
+
+            # Private API keys: ACLoadW, BackupLoadW, SupportsConnectedPV, PVW, ThirdPartyW, GridStatus, GridNegativeIsImportW, ConfiguredWithBatteries, BatteryNegativeIsChargingW, BatteryStatus, BatterySoC0to100, CtComms
 
-    async def _apiRequest(self, endpoint):
-        if endpoint == "inverterinfo":
-            return {
-                "Model": "ST10000",
-                "Firmware": "080819",
-                "RossVersion": "2.15.32207.13",
-                "IsThreePhaseInverter": True,
-                "IsSmartBatteryInverter": False,
-                "IsSinglePhaseInverter": False,
-                "IsGridTieInverter": False,
-            }
-        elif endpoint == "BannerInfo":
-            return {
-                "ProductDisplayname": "Smart Inverter TEST",
-                "InstalledPvSizeWatts": 9960.0,
-                "BatteryCapacityWattHours": 14200.001,
-            }
-        elif endpoint == "energyflowd2":
-            return {
-                "Data": {
-                    "Input": {
-                        "ACLoadW": 1450.0,
-                        "BackupLoadW": 11.0,
-                        "SupportsConnectedPV": True,
-                        "PVW": 7579.0,
-                        "ThirdPartyW": None,
-                        "GridStatus": "Export",
-                        "GridNegativeIsImportW": 6200.0,
-                        "ConfiguredWithBatteries": True,
-                        "BatteryNegativeIsChargingW": 0.0,
-                        "BatteryStatus": "Idle",
-                        "BatterySoC0to100": 98.0,
-                        "CtComms": True,
-                    }
-                }
-            }
-        elif endpoint == "public_BasicData":
-            return {
-                "Page": 0,
-                "PageSize": 100,
-                "PageCount": 1,
-                "TotalCount": 1,
-                "Data": [
-                    {
-                        "Id": "S1234123412341",
-                        "Nmi": None,
-                        "Type": "Site",
-                        "Nodes": [
-                            {
-                                "SerialNumber": "RB12341234123412",
-                                "Id": "RB12341234123412",
-                                "Nmi": None,
-                                "Type": "Inverter",
-                                "Nodes": None
-                            },
-                            {
-                                "Id": "Houseload",
-                                "Nmi": None,
-                                "Type": "Houseload",
-                                "Nodes": None
-                            }
-                        ]
-                    }
-                ]
-            }
-        elif endpoint == "public_StaticData":
-            return {
-                "Data": {
-                    "StaticData": {
-                        "TimestampUtc": "2022-12-12T06:04:02.0155057Z",
-                        "Location": {
-                            "Latitude": -27.123,
-                            "Longitude": 153.123,
-                            "AddressLineOne": "123 Sesame St",
-                            "AddressLineTwo": None,
-                            "Suburb": "Brisbane",
-                            "State": "Qld",
-                            "Country": "Australia ",
-                            "PostCode": "4000"
-                        },
-                        "TechnologyProvider": "ABC",
-                        "RemoteAccessConnection": {
-                            "Type": "ETHERNET",
-                            "CustomerChoice": True
-                        },
-                        "ApprovedCapacityW": None,
-                        "SolarRetailer": {
-                            "Name": "Retailer Name",
-                            "ABN": "81231231231"
-                        },
-                        "SiteDetails": {
-                            "GenerationHardLimitVA": None,
-                            "GenerationSoftLimitVA": None,
-                            "ExportHardLimitkW": None,
-                            "ExportHardLimitW": None,
-                            "ExportSoftLimitkW": None,
-                            "ExportSoftLimitW": None,
-                            "SiteExportLimitkW": None,
-                            "BatteryMaxChargePowerkW": 10,
-                            "BatteryMaxDischargePowerkW": 10,
-                            "BatteryCapacitykWh": 14.22,
-                            "UsableBatteryCapacitykWh": 12.798,
-                            "PanelModel": " ",
-                            "PanelSizekW": 9.96,
-                            "SystemType": "Hybrid",
-                            "InverterMaxExportPowerkW": 10,
-                            "InverterMaxImportPowerkW": 10
-                        },
-                        "CommissioningDate": "2022-08-18",
-                        "NMI": None,
-                        "LatestDynamicDataUtc": "2022-12-12T06:03:05Z",
-                        "Status": "OK",
-                        "Id": "S1234123412341",
-                        "Type": "Site",
-                        "DynamicDataMetadata": {
-                            "ActiveExportedPowerInstantaneouskWMetadata": {
-                                "Measured": True
-                            },
-                            "ActiveImportedPowerInstantaneouskWMetadata": {
-                                "Measured": True
-                            },
-                            "VoltageInstantaneousVMetadata": {
-                                "Measured": True
-                            },
-                            "CurrentInstantaneousAMetadata": {
-                                "Measured": True
-                            },
-                            "PowerFactorInstantaneousMinus1to1Metadata": {
-                                "Measured": True
-                            },
-                            "FrequencyInstantaneousHzMetadata": {
-                                "Measured": True
-                            },
-                            "BatterySoCInstantaneous0to1Metadata": {
-                                "Measured": False
-                            },
-                            "PvPowerInstantaneouskWMetadata": {
-                                "Measured": False
-                            },
-                            "InverterTemperatureCMetadata": {
-                                "Measured": True
-                            },
-                            "BatteryPowerNegativeIsChargingkWMetadata": {
-                                "Measured": False
-                            },
-                            "PvAllTimeEnergykWhMetadata": {
-                                "Measured": False
-                            },
-                            "ExportAllTimeEnergykWhMetadata": {
-                                "Measured": True
-                            },
-                            "ImportAllTimeEnergykWhMetadata": {
-                                "Measured": True
-                            },
-                            "LoadAllTimeEnergykWhMetadata": {
-                                "Measured": False
-                            }
-                        }
-                    },
-                    "Nodes": [
-                        {
-                            "StaticData": {
-                                "ModelName": "ST10000",
-                                "BatteryCount": 4,
-                                "SoftwareVersion": "2.16.32211.1",
-                                "FirmwareVersion": "080819",
-                                "BatteryModels": [
-                                    "RB600",
-                                    "Unknown",
-                                    "Unknown",
-                                    "Unknown"
-                                    ],
-                                "Id": "RB12341234123412",
-                                "Type": "Inverter",
-                                "DynamicDataMetadata": None
-                            },
-                            "Nodes": None
-                        },
-                        {
-                            "StaticData": {
-                                "Id": "HouseLoad",
-                                "Type": "Houseload",
-                                "DynamicDataMetadata": None
-                            },
-                            "Nodes": None
-                        }
-                    ]
-                }
-            }
-        elif endpoint == "public_DynamicData":
-            return {
-                "Data": {
-                    "TimestampUtc": "2022-12-12T06:08:05Z",
-                    "SiteId": "S1234123412341",
-                    "Phases": [
-                        {
-                            "Id": "A",
-                            "ActiveExportedPowerInstantaneouskW": 0.33,
-                            "ActiveImportedPowerInstantaneouskW": 0,
-                            "VoltageInstantaneousV": 233.1,
-                            "CurrentInstantaneousA": 1.42,
-                            "PowerFactorInstantaneousMinus1to1": 0.79
-                        },
-                        {
-                            "Id": "B",
-                            "ActiveExportedPowerInstantaneouskW": 0.347,
-                            "ActiveImportedPowerInstantaneouskW": 0,
-                            "VoltageInstantaneousV": 235.3,
-                            "CurrentInstantaneousA": 1.47,
-                            "PowerFactorInstantaneousMinus1to1": 0.785
-                        },
-                        {
-                            "Id": "C",
-                            "ActiveExportedPowerInstantaneouskW": 0.422,
-                            "ActiveImportedPowerInstantaneouskW": 0,
-                            "VoltageInstantaneousV": 236.1,
-                            "CurrentInstantaneousA": 1.79,
-                            "PowerFactorInstantaneousMinus1to1": 0.829
-                        }
-                    ],
-                    "FrequencyInstantaneousHz": 50.02,
-                    "BatterySoCInstantaneous0to1": 0.98,
-                    "PvPowerInstantaneouskW": 1.416,
-                    "InverterTemperatureC": 45.9,
-                    "BatteryPowerNegativeIsChargingkW": 0,
-                    "PvAllTimeEnergykWh": 5413.9,
-                    "ExportAllTimeEnergykWh": 2612.829,
-                    "ImportAllTimeEnergykWh": 175.108,
-                    "LoadAllTimeEnergykWh": 3157.7,
-                    "Status": "OK",
-                    "Inverters": [
-                        {
-                            "SerialNumber": "RB12341234123412",
-                            "PowerMode": {
-                                "InverterMode": "Auto",
-                                "PowerW": 0
-                            }
-                        }
-                    ]
-                },
-                "Metadata": {
-                    "Latest": "/Api/v2/EnergyData/S1234123412341/Dynamic?metadata=True",
-                    "Permalink": "/Api/v2/EnergyData/S1234123412341/Dynamic/At/20221212T060805Z?metadata=True",
-                    "Back": {
-                        "1m": "/Api/v2/EnergyData/S1234123412341/Dynamic/LatestBeforeUtc/20221212T060706Z/1?metadata=true",
-                        "10m": "/Api/v2/EnergyData/S1234123412341/Dynamic/LatestBeforeUtc/20221212T055806Z/2?metadata=true",
-                        "1h": "/Api/v2/EnergyData/S1234123412341/Dynamic/LatestBeforeUtc/20221212T050806Z/5?metadata=true",
-                        "1d": "/Api/v2/EnergyData/S1234123412341/Dynamic/LatestBeforeUtc/20221211T060806Z/60?metadata=true",
-                        "1w": "/Api/v2/EnergyData/S1234123412341/Dynamic/LatestBeforeUtc/20221205T060806Z/60?metadata=true"
-                    },
-                    "Forward": {
-                        "1m": "/Api/v2/EnergyData/S1234123412341/Dynamic/LatestBeforeUtc/20221212T060906Z/1?metadata=true",
-                        "10m": "/Api/v2/EnergyData/S1234123412341/Dynamic/LatestBeforeUtc/20221212T061806Z/2?metadata=true",
-                        "1h": "/Api/v2/EnergyData/S1234123412341/Dynamic/LatestBeforeUtc/20221212T070806Z/5?metadata=true",
-                        "1d": "/Api/v2/EnergyData/S1234123412341/Dynamic/LatestBeforeUtc/20221213T060806Z/60?metadata=true",
-                        "1w": "/Api/v2/EnergyData/S1234123412341/Dynamic/LatestBeforeUtc/20221219T060806Z/60?metadata=true"
-                    }
-                }
-            }
         else:
-            raise RedbackAPIError(f"TestRedbackInverter: unknown API endpoint {endpoint}")
+            self._energyData = (await self._apiRequest("public_DynamicData"))["Data"]
+            # gather individual voltage and current per phase
+            self._phaseIds = [phase["Id"] for phase in self._energyData["Phases"]]
+            for phase in self._energyData["Phases"]:
+                self._energyData["VoltageInstantaneousV_" + phase["Id"]] = phase["VoltageInstantaneousV"]
+                self._energyData["CurrentInstantaneousA_" + phase["Id"]] = phase["CurrentInstantaneousA"]
+                self._energyData["PowerFactorInstantaneousMinus1to1_" + phase["Id"]] = phase["PowerFactorInstantaneousMinus1to1"]
+            # store an average value too (by calculating total available voltage for three-phase)
+            phaseCount = len(self._energyData["Phases"])
+            self._energyData["VoltageInstantaneousV"] = round( sum(list(map(lambda x: x["VoltageInstantaneousV"], self._energyData["Phases"]))) / phaseCount * sqrt(phaseCount), 1)
+            self._energyData["ActiveExportedPowerInstantaneouskW"] = sum(list(map(lambda x: x["ActiveExportedPowerInstantaneouskW"], self._energyData["Phases"])))
+            self._energyData["ActiveImportedPowerInstantaneouskW"] = sum(list(map(lambda x: x["ActiveImportedPowerInstantaneouskW"], self._energyData["Phases"])))
+            self._energyData["ActiveNetPowerInstantaneouskW"] = self._energyData["ActiveExportedPowerInstantaneouskW"] - self._energyData["ActiveImportedPowerInstantaneouskW"]
+            self._energyData["CurrentInstantaneousA"] = sum(list(map(lambda x: x["CurrentInstantaneousA"], self._energyData["Phases"])))
+            self._energyData["InverterMode"] = self._energyData["Inverters"][0]["PowerMode"]["InverterMode"] 
+            self._energyData["InverterPowerW"] = self._energyData["Inverters"][0]["PowerMode"]["PowerW"] 
+            del self._energyData["SiteId"]
+            del self._energyData["Inverters"]
+            del self._energyData["Phases"]
+            
+            # Public API keys: TimestampUtc (device sample time), FrequencyInstantaneousHz, BatterySoCInstantaneous0to1, PvPowerInstantaneouskW, InverterTemperatureC, BatteryPowerNegativeIsChargingkW, PvAllTimeEnergykWh, ExportAllTimeEnergykWh, ImportAllTimeEnergykWh, LoadAllTimeEnergykWh, Status, VoltageInstantaneousV, ActiveExportedPowerInstantaneouskW, ActiveImportedPowerInstantaneouskW
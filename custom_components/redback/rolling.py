@@ -0,0 +1,96 @@
+"""Incremental rolling-window statistics for the Redback integration."""
+from __future__ import annotations
+
+from bisect import bisect_left, insort
+from collections import deque
+from collections.abc import Iterable, Mapping
+from math import ceil
+
+
+class _FieldWindow:
+    """Running state of one field inside a RollingStatistics window"""
+
+    __slots__ = ("values", "total", "count", "peak", "ordered")
+
+    def __init__(self) -> None:
+        self.values: deque[float | None] = deque()
+        self.total = 0.0
+        self.count = 0
+        # (sequence, value) pairs with decreasing values, the head is the window peak
+        self.peak: deque[tuple[int, float]] = deque()
+        # window values kept in sorted order for percentiles
+        self.ordered: list[float] = []
+
+    def push(self, seq: int, value: float | None) -> None:
+        self.values.append(value)
+        if value is None:
+            return
+        self.total += value
+        self.count += 1
+        while self.peak and self.peak[-1][1] <= value:
+            self.peak.pop()
+        self.peak.append((seq, value))
+        insort(self.ordered, value)
+
+    def pop(self, seq: int) -> None:
+        value = self.values.popleft()
+        if value is None:
+            return
+        self.count -= 1
+        # reset rather than subtract on an empty window, so float error can't accumulate forever
+        self.total = self.total - value if self.count else 0.0
+        if self.peak and self.peak[0][0] <= seq:
+            self.peak.popleft()
+        del self.ordered[bisect_left(self.ordered, value)]
+
+
+class RollingStatistics:
+    """Time-based sliding window over several fields of the same sample stream.
+
+    Mean and peak are maintained in O(1) (amortised) per sample; percentiles read a
+    sorted copy of the window that is updated by bisection on every sample. Inserting and
+    removing in that list moves O(window) pointers, but in one memmove: a five minute
+    window holds a few dozen samples (at most SAMPLE_BUFFER_SIZE, 360), where this costs
+    a few microseconds per sample, less than heaps or a skip list would in Python, and
+    any percentile stays a single index.
+    """
+
+    def __init__(self, fields: Iterable[str], duration: float) -> None:
+        self.duration = duration
+        self._times: deque[float] = deque()
+        self._first = 0  # sequence number of the oldest sample in the window
+        self._next = 0
+        self._fields = {field: _FieldWindow() for field in fields}
+
+    def __len__(self) -> int:
+        return len(self._times)
+
+    def add(self, timestamp: float, sample: Mapping[str, float | None]) -> None:
+        """Add a sample taken at timestamp (seconds) and drop samples older than the window"""
+        cutoff = timestamp - self.duration
+        while self._times and self._times[0] <= cutoff:
+            self._times.popleft()
+            for window in self._fields.values():
+                window.pop(self._first)
+            self._first += 1
+
+        self._times.append(timestamp)
+        for field, window in self._fields.items():
+            window.push(self._next, sample.get(field))
+        self._next += 1
+
+    def mean(self, field: str) -> float | None:
+        window = self._fields[field]
+        return window.total / window.count if window.count else None
+
+    def peak(self, field: str) -> float | None:
+        window = self._fields[field]
+        return window.peak[0][1] if window.peak else None
+
+    def percentile(self, field: str, percent: float) -> float | None:
+        """Nearest-rank percentile of the window"""
+        ordered = self._fields[field].ordered
+        if not ordered:
+            return None
+        rank = max(ceil(percent / 100 * len(ordered)), 1)
+        return ordered[rank - 1]
@@ -0,0 +1,110 @@
+"""Staggered and activity-adaptive refresh scheduling for the Redback integration."""
+from __future__ import annotations
+
+from bisect import insort
+from collections.abc import Mapping
+from hashlib import sha256
+from math import floor
+from typing import Any
+
+# below this, PV and battery power (kW) count as idle
+QUIET_POWER = 0.05
+# grid power (kW) changing less than this between samples counts as steady
+QUIET_GRID_CHANGE = 0.25
+
+
+def _position(key: str) -> float:
+    """Deterministic [0, 1) position of a key, the same in every process (unlike hash())"""
+    return int.from_bytes(sha256(key.encode()).digest()[:8], "big") / (1 << 64)
+
+
+class RedbackRefreshScheduler:
+    """Spreads the refreshes of every site evenly over the poll interval.
+
+    Sites are ordered by a hash of their key (site id) and the k-th of n sites refreshes
+    k/n of its interval after the first one, on a grid aligned to the epoch and placed by the
+    first site's hash (so separate installations don't all poll in the same second either).
+    The same sites get the same refresh times after a restart, and adding or removing a site
+    moves the others by about one slot (interval / n).
+    """
+
+    def __init__(self) -> None:
+        self._order: list[tuple[float, str]] = []
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def add(self, key: str) -> None:
+        if (entry := (_position(key), key)) not in self._order:
+            insort(self._order, entry)
+
+    def remove(self, key: str) -> None:
+        if (entry := (_position(key), key)) in self._order:
+            self._order.remove(entry)
+
+    def phase(self, key: str) -> float:
+        """Fraction of the interval at which the site refreshes (its hash position when it isn't registered)"""
+        entry = (_position(key), key)
+        if entry not in self._order:
+            return entry[0]
+        return (self._order[0][0] + self._order.index(entry) / len(self._order)) % 1
+
+    def next_refresh(self, key: str, interval: float, now: float) -> float:
+        """Returns the site's next refresh time (epoch seconds) after now.
+
+        Slots less than half an interval away are skipped, so refreshes are never closer
+        than that (e.g. after the first refresh, or when the site's slot moved).
+        """
+        offset = self.phase(key) * interval
+        slot = offset + (floor((now - offset) / interval) + 1) * interval
+        if slot - now < interval / 2:
+            slot += interval
+        return slot
+
+
+class AdaptivePollingPolicy:
+    """Stretches the poll interval while a site is quiet, and restores it on the first sign of activity.
+
+    A sample is quiet when the inverter is Offline, or when there is no PV, the battery is
+    idle (or hibernating) and the grid power is steady. After patience quiet samples in a
+    row the interval doubles with every further quiet sample, up to maximum seconds.
+    Snapshots without public API power fields (private API) always count as active.
+    """
+
+    def __init__(self, base: float, maximum: float, patience: int = 3) -> None:
+        self.base = base
+        self.maximum = maximum
+        self.patience = patience
+        self.interval = base
+        self.quiet_samples = 0
+        self._grid: float | None = None
+
+    def update(self, snapshot: Mapping[str, Any]) -> float:
+        """Returns the poll interval (seconds) to use after this snapshot"""
+        if self._is_quiet(snapshot):
+            self.quiet_samples += 1
+            if self.quiet_samples > self.patience:
+                self.interval = min(max(self.interval * 2, self.base), max(self.maximum, self.base))
+        else:
+            self.quiet_samples = 0
+            self.interval = self.base
+        return self.interval
+
+    def reset(self, base: float) -> None:
+        """Use a new base interval, starting at full rate"""
+        self.base = self.interval = base
+        self.quiet_samples = 0
+
+    def _is_quiet(self, snapshot: Mapping[str, Any]) -> bool:
+        grid, self._grid = self._grid, snapshot.get("ActiveNetPowerInstantaneouskW")
+        if snapshot.get("Status") == "Offline":
+            return True
+        pv = snapshot.get("PvPowerInstantaneouskW")
+        if pv is None or grid is None or self._grid is None:
+            return False
+        battery = snapshot.get("BatteryPowerNegativeIsChargingkW") or 0
+        return (
+            pv < QUIET_POWER
+            and (abs(battery) < QUIET_POWER or snapshot.get("InverterMode") == "Hibernate")
+            and abs(self._grid - grid) < QUIET_GRID_CHANGE
+        )
@@ -1,16 +1,14 @@
 """Redback sensors for the Redback integration."""
 from __future__ import annotations
-from collections.abc import Mapping
 
 from datetime import (datetime, timedelta)
-from typing import Any
+from typing import TYPE_CHECKING
 from homeassistant.core import (
     HomeAssistant,
     callback,
 )
 from homeassistant.config_entries import ConfigEntry
 
-import re
 
 from homeassistant.const import (
     UnitOfElectricCurrent,
@@ -20,7 +18,9 @@ from homeassistant.const import (
     UnitOfFrequency,
     UnitOfTemperature,
     UnitOfElectricCurrent,
+    UnitOfTime,
     PERCENTAGE,
+    EntityCategory,
 )
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.components.sensor import (
@@ -29,9 +29,23 @@ from homeassistant.components.sensor import (
     SensorStateClass,
 )
 
-from .const import DOMAIN, LOGGER, INVERTER_MODES, INVERTER_STATUS
+from .const import DOMAIN, LOGGER, INVERTER_MODES, INVERTER_STATUS, STATISTICS_WINDOW, STATISTICS_PERCENTILE, FRESHNESS_WINDOW, FRESHNESS_PERCENTILES
+from .energy import COUNTERS, COUNTER_FIELDS
 from .entity import RedbackEntity
 
+if TYPE_CHECKING:
+    from .coordinator import RedbackDataUpdateCoordinator
+
+# device class of a derived metric sensor, from the unit given in its definition
+DERIVED_DEVICE_CLASSES = {
+    UnitOfPower.KILO_WATT: SensorDeviceClass.POWER,
+    UnitOfPower.WATT: SensorDeviceClass.POWER,
+    UnitOfElectricPotential.VOLT: SensorDeviceClass.VOLTAGE,
+    UnitOfElectricCurrent.AMPERE: SensorDeviceClass.CURRENT,
+    UnitOfFrequency.HERTZ: SensorDeviceClass.FREQUENCY,
+    UnitOfTemperature.CELSIUS: SensorDeviceClass.TEMPERATURE,
+}
+
 
 async def async_setup_entry(
     hass: HomeAssistant,
@@ -42,7 +56,8 @@ async def async_setup_entry(
 
     coordinator = hass.data[DOMAIN][entry.entry_id]
     privateAPI = coordinator.redback.isPrivateAPI()
-    hasBattery = await coordinator.redback.hasBattery()
+    capabilities = coordinator.capabilities
+    hasBattery = capabilities.has_battery
 
     # Private API has different entities
     # Note: private API always creates battery entities, need examples without
@@ -183,6 +198,7 @@ async def async_setup_entry(
                     "name": "Grid Voltage A",
                     "id_suffix": "grid_v_a",
                     "data_source": "VoltageInstantaneousV_A",
+                    "enabled_default": False,
                 },
             ),
             RedbackCurrentSensor(
@@ -191,6 +207,7 @@ async def async_setup_entry(
                     "name": "Grid Current A",
                     "id_suffix": "grid_a_a",
                     "data_source": "CurrentInstantaneousA_A",
+                    "enabled_default": False,
                 },
             ),
             RedbackVoltageSensor(
@@ -199,6 +216,7 @@ async def async_setup_entry(
                     "name": "Grid Voltage B",
                     "id_suffix": "grid_v_b",
                     "data_source": "VoltageInstantaneousV_B",
+                    "enabled_default": False,
                 },
             ),
             RedbackCurrentSensor(
@@ -207,6 +225,7 @@ async def async_setup_entry(
                     "name": "Grid Current B",
                     "id_suffix": "grid_a_b",
                     "data_source": "CurrentInstantaneousA_B",
+                    "enabled_default": False,
                 },
             ),
             RedbackVoltageSensor(
@@ -215,6 +234,7 @@ async def async_setup_entry(
                     "name": "Grid Voltage C",
                     "id_suffix": "grid_v_c",
                     "data_source": "VoltageInstantaneousV_C",
+                    "enabled_default": False,
                 },
             ),
             RedbackCurrentSensor(
@@ -223,6 +243,7 @@ async def async_setup_entry(
                     "name": "Grid Current C",
                     "id_suffix": "grid_a_c",
                     "data_source": "CurrentInstantaneousA_C",
+                    "enabled_default": False,
                 },
             ),
             RedbackVoltageSensor(
@@ -326,7 +347,7 @@ async def async_setup_entry(
                 {
                     "name": "Site Load",
                     "id_suffix": "load_power",
-                    "data_source": "$calc$ float(ed['PvPowerInstantaneouskW']) + float(ed['BatteryPowerNegativeIsChargingkW'] if ed['BatteryPowerNegativeIsChargingkW'] else 0) - float(ed['ActiveExportedPowerInstantaneouskW']) + float(ed['ActiveImportedPowerInstantaneouskW'])",
+                    "data_source": "SiteLoadkW",
                 },
             ),
             RedbackStatusSensor(
@@ -391,22 +412,20 @@ async def async_setup_entry(
                         "direction": "negative",
                     },
                 ),
-                RedbackEnergySensor(
+                RedbackEnergyTotalSensor(
                     coordinator,
                     {
                         "name": "Battery Discharge Total",
                         "id_suffix": "battery_discharge_total",
-                        "data_source": "BatteryPowerNegativeIsChargingkW",
-                        "direction": "positive",
+                        "data_source": "battery_discharge",
                     },
                 ),
-                RedbackEnergySensor(
+                RedbackEnergyTotalSensor(
                     coordinator,
                     {
                         "name": "Battery Charge Total",
                         "id_suffix": "battery_charge_total",
-                        "data_source": "BatteryPowerNegativeIsChargingkW",
-                        "direction": "negative",
+                        "data_source": "battery_charge",
                     },
                 ),
                 RedbackEnergyStorageSensor(
@@ -427,7 +446,137 @@ async def async_setup_entry(
                 ),
             ])
 
-    async_add_entities(entities)
+        # rolling-window statistics of the main power flows (mean, peak and percentile over STATISTICS_WINDOW)
+        window = int(STATISTICS_WINDOW.total_seconds() // 60)
+        flows = {
+            "grid_import": ("Grid Import", "ActiveImportedPowerInstantaneouskW"),
+            "pv": ("Solar Generation", "PvPowerInstantaneouskW"),
+            "load": ("Site Load", "SiteLoadkW"),
+        }
+        if hasBattery:
+            flows["battery"] = ("Battery Power Flow", "BatteryPowerNegativeIsChargingkW")
+        for source, (name, field) in flows.items():
+            entities.extend([
+                RedbackPowerStatisticSensor(
+                    coordinator,
+                    {
+                        "name": f"{name} {window}m Mean",
+                        "id_suffix": f"{source}_mean_{window}m",
+                        "data_source": source,
+                        "requires": field,
+                        "statistic": "mean",
+                    },
+                ),
+                RedbackPowerStatisticSensor(
+                    coordinator,
+                    {
+                        "name": f"{name} {window}m Peak",
+                        "id_suffix": f"{source}_peak_{window}m",
+                        "data_source": source,
+                        "requires": field,
+                        "statistic": "peak",
+                        "enabled_default": False,
+                    },
+                ),
+                RedbackPowerStatisticSensor(
+                    coordinator,
+                    {
+                        "name": f"{name} {window}m P{STATISTICS_PERCENTILE}",
+                        "id_suffix": f"{source}_p{STATISTICS_PERCENTILE}_{window}m",
+                        "data_source": source,
+                        "requires": field,
+                        "statistic": "percentile",
+                        "enabled_default": False,
+                    },
+                ),
+            ])
+
+        # period totals as entities, for dashboards that need their history (disabled by default,
+        # the same values are attributes of the energy total sensors)
+        periods = {"pv": "Solar Generation", "load": "Site Load", "export": "Grid Export", "import": "Grid Import"}
+        if hasBattery:
+            periods.update({"battery_charge": "Battery Charge", "battery_discharge": "Battery Discharge"})
+        for source, name in periods.items():
+            entities.extend([
+                RedbackEnergyPeriodSensor(
+                    coordinator,
+                    {
+                        "name": f"{name} Today",
+                        "id_suffix": f"{source}_today",
+                        "data_source": source,
+                        "requires": COUNTERS.get(source, source),
+                        "period": "today",
+                    },
+                ),
+                RedbackEnergyPeriodSensor(
+                    coordinator,
+                    {
+                        "name": f"{name} This Month",
+                        "id_suffix": f"{source}_this_month",
+                        "data_source": source,
+                        "requires": COUNTERS.get(source, source),
+                        "period": "this_month",
+                    },
+                ),
+            ])
+
+    # data freshness telemetry, the device sample time is only known with the public API
+    freshness = {"publish_delay": "Poll to Publish Delay"}
+    if not privateAPI:
+        freshness.update({"fetch_age": "Sample Age at Fetch", "publish_age": "Sample Age at Publish"})
+    for source, name in freshness.items():
+        entities.append(
+            RedbackFreshnessSensor(
+                coordinator,
+                {
+                    "name": name,
+                    "id_suffix": source,
+                    "data_source": source,
+                },
+            )
+        )
+
+    # values replaced by the coordinator's filters (range checks, held values, spikes)
+    entities.append(
+        RedbackRejectedValuesSensor(
+            coordinator,
+            {
+                "name": "Rejected Values",
+                "id_suffix": "rejected_values",
+                "data_source": "rejected_values",
+            },
+        )
+    )
+
+    # user-defined derived metrics (options), evaluated by the coordinator like SiteLoadkW
+    for metric in coordinator.user_metrics:
+        entities.append(
+            RedbackDerivedSensor(
+                coordinator,
+                {
+                    "name": metric.name,
+                    "id_suffix": f"derived_{metric.name.lower()}",
+                    "data_source": metric.name,
+                    "unit": metric.unit,
+                },
+            )
+        )
+
+    # only the fields the site reports (phases, battery, metadata) get entities, the others would stay unknown.
+    # Fields the cloud only calculates get theirs once it fills them in.
+    pending = [entity for entity in entities if not capabilities.supports(entity.requires)]
+    async_add_entities([entity for entity in entities if entity not in pending])
+
+    if pending:
+        @callback
+        def add_supported() -> None:
+            supported = [entity for entity in pending if coordinator.capabilities.supports(entity.requires)]
+            for entity in supported:
+                pending.remove(entity)
+            if supported:
+                async_add_entities(supported)
+
+        entry.async_on_unload(coordinator.async_add_capability_listener(add_supported))
 
 class RedbackChargeSensor(RedbackEntity, SensorEntity):
     """Sensor for battery state-of-charge"""
@@ -437,33 +586,29 @@ class RedbackChargeSensor(RedbackEntity, SensorEntity):
     _attr_state_class = SensorStateClass.MEASUREMENT
     _attr_native_unit_of_measurement = PERCENTAGE
     _attr_device_class = SensorDeviceClass.BATTERY
+    _default_aggregate = "mean"
+    # static attributes, not worth storing with every state change
+    _unrecorded_attributes = RedbackEntity._unrecorded_attributes | frozenset({
+        "min_offgrid_soc_0to1",
+        "min_ongrid_soc_0to1",
+    })
     
     @property
     def unique_id(self) -> str:
         """Device Uniqueid."""
         return f"{self.base_unique_id}_{self.id_suffix}"
     
-    @property
-    def extra_state_attributes(self) -> Mapping[str, Any] | None:
-        """Return additional pieces of information."""
-        dataAttributes = self.coordinator.inverter_info
-
-        if dataAttributes is None:
-            data["min_offgrid_soc_0to1"] = None
-            data["min_ongrid_soc_0to1"] = None
-        else:
-            data = {
-                "min_offgrid_soc_0to1": (dataAttributes["MinOffgridSoC0to1"] ),
-                "min_ongrid_soc_0to1": (dataAttributes["MinSoC0to1"] )
-            }
-        return data
-    
     @callback
     def _handle_coordinator_update(self) -> None:
         """Handle updated data from the coordinator."""
         LOGGER.debug("Updating entity: %s", self.unique_id)
-        self._attr_native_value = self.coordinator.energy_data[self.data_source]
+        measurement = self.coordinator.window_value(self.data_source, self.aggregate)
+        if measurement is None:
+            # no valid value (e.g. rejected by the filters), keep the previous state
+            return
+        self._attr_native_value = measurement
         if self.convertPercent: self._attr_native_value *= 100
+        self._attr_extra_state_attributes = self.coordinator.static_attributes.get("charge")
         self.async_write_ha_state()
  
 class RedbackTempSensor(RedbackEntity, SensorEntity):
@@ -473,6 +618,7 @@ class RedbackTempSensor(RedbackEntity, SensorEntity):
     _attr_state_class = SensorStateClass.MEASUREMENT
     _attr_native_unit_of_measurement = UnitOfTemperature.CELSIUS
     _attr_device_class = SensorDeviceClass.TEMPERATURE
+    _default_aggregate = "mean"
 
     @property
     def unique_id(self) -> str:
@@ -483,7 +629,11 @@ class RedbackTempSensor(RedbackEntity, SensorEntity):
     def _handle_coordinator_update(self) -> None:
         """Handle updated data from the coordinator."""
         LOGGER.debug("Updating entity: %s", self.unique_id)
-        self._attr_native_value = self.coordinator.energy_data[self.data_source]
+        measurement = self.coordinator.window_value(self.data_source, self.aggregate)
+        if measurement is None:
+            # no valid value (e.g. rejected by the filters), keep the previous state
+            return
+        self._attr_native_value = measurement
         self.async_write_ha_state()
 
 class RedbackFrequencySensor(RedbackEntity, SensorEntity):
@@ -493,6 +643,7 @@ class RedbackFrequencySensor(RedbackEntity, SensorEntity):
     _attr_state_class = SensorStateClass.MEASUREMENT
     _attr_native_unit_of_measurement = UnitOfFrequency.HERTZ
     _attr_device_class = SensorDeviceClass.FREQUENCY
+    _default_aggregate = "mean"
 
     @property
     def unique_id(self) -> str:
@@ -503,7 +654,11 @@ class RedbackFrequencySensor(RedbackEntity, SensorEntity):
     def _handle_coordinator_update(self) -> None:
         """Handle updated data from the coordinator."""
         LOGGER.debug("Updating entity: %s", self.unique_id)
-        self._attr_native_value = self.coordinator.energy_data[self.data_source]
+        measurement = self.coordinator.window_value(self.data_source, self.aggregate)
+        if measurement is None:
+            # no valid value (e.g. rejected by the filters), keep the previous state
+            return
+        self._attr_native_value = measurement
         self.async_write_ha_state()
 
 class RedbackVoltageSensor(RedbackEntity, SensorEntity):
@@ -513,6 +668,7 @@ class RedbackVoltageSensor(RedbackEntity, SensorEntity):
     _attr_state_class = SensorStateClass.MEASUREMENT
     _attr_native_unit_of_measurement = UnitOfElectricPotential.VOLT
     _attr_device_class = SensorDeviceClass.VOLTAGE
+    _default_aggregate = "mean"
 
     @property
     def unique_id(self) -> str:
@@ -523,7 +679,11 @@ class RedbackVoltageSensor(RedbackEntity, SensorEntity):
     def _handle_coordinator_update(self) -> None:
         """Handle updated data from the coordinator."""
         LOGGER.debug("Updating entity: %s", self.unique_id)
-        self._attr_native_value = self.coordinator.energy_data.get(self.data_source, 0)
+        measurement = self.coordinator.window_value(self.data_source, self.aggregate)
+        if measurement is None:
+            # no valid value (e.g. rejected by the filters), keep the previous state
+            return
+        self._attr_native_value = measurement
         self.async_write_ha_state()
 
 class RedbackPowerSensor(RedbackEntity, SensorEntity):
@@ -533,6 +693,7 @@ class RedbackPowerSensor(RedbackEntity, SensorEntity):
     _attr_state_class = SensorStateClass.MEASUREMENT
     _attr_native_unit_of_measurement = UnitOfPower.KILO_WATT
     _attr_device_class = SensorDeviceClass.POWER
+    _default_aggregate = "mean"
 
     @property
     def unique_id(self) -> str:
@@ -544,17 +705,11 @@ class RedbackPowerSensor(RedbackEntity, SensorEntity):
         """Handle updated data from the coordinator."""
         LOGGER.debug("Updating entity: %s", self.unique_id)
 
-        measurement = 0
-        # dynamically calculated power measurement
-        if self.data_source.startswith("$calc$"):
-            measurement = re.sub("^\$calc\$\s*", "", self.data_source)
-            ed = self.coordinator.energy_data
-            measurement = float(eval(measurement, {"ed":ed}))
-
-        # direct power measurement
-        else:
-            measurement = self.coordinator.energy_data[self.data_source]
-
+        # derived metrics (e.g. SiteLoadkW) are evaluated into every snapshot by the coordinator
+        measurement = self.coordinator.window_value(self.data_source, self.aggregate)
+        if measurement is None:
+            # no valid value (e.g. rejected by the filters), keep the previous state
+            return
         if (self.direction == "positive"):
             measurement = max(measurement, 0)
         elif (self.direction == "negative"):
@@ -563,6 +718,122 @@ class RedbackPowerSensor(RedbackEntity, SensorEntity):
         if self.convertkW: self._attr_native_value /= 1000 # convert from W to kW
         self.async_write_ha_state()
         
+class RedbackDerivedSensor(RedbackEntity, SensorEntity):
+    """Sensor for a user-defined derived metric"""
+
+    _attr_name = "Derived"
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _default_aggregate = "mean"
+
+    def __init__(self, coordinator: RedbackDataUpdateCoordinator, details) -> None:
+        super().__init__(coordinator, details)
+        self._attr_native_unit_of_measurement = details["unit"]
+        self._attr_device_class = DERIVED_DEVICE_CLASSES.get(details["unit"])
+
+    @property
+    def unique_id(self) -> str:
+        """Device Uniqueid."""
+        return f"{self.base_unique_id}_{self.id_suffix}"
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Handle updated data from the coordinator."""
+        LOGGER.debug("Updating entity: %s", self.unique_id)
+        self._attr_native_value = self.coordinator.window_value(self.data_source, self.aggregate, None)
+        self.async_write_ha_state()
+
+class RedbackFreshnessSensor(RedbackEntity, SensorEntity):
+    """Diagnostic sensor for data freshness, with rolling percentiles"""
+
+    _attr_name = "Freshness"
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_native_unit_of_measurement = UnitOfTime.SECONDS
+    _attr_device_class = SensorDeviceClass.DURATION
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_suggested_display_precision = 0
+
+    @property
+    def unique_id(self) -> str:
+        """Device Uniqueid."""
+        return f"{self.base_unique_id}_{self.id_suffix}"
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Handle updated data from the coordinator."""
+        LOGGER.debug("Updating entity: %s", self.unique_id)
+        freshness = self.coordinator.freshness
+        # percentiles over FRESHNESS_WINDOW, to tune the polling interval with evidence
+        window = f"{int(FRESHNESS_WINDOW.total_seconds() // 60)}m"
+        values = {
+            "latest": self.coordinator.freshness_latest[self.data_source],
+            **{f"p{percent}_{window}": freshness.percentile(self.data_source, percent) for percent in FRESHNESS_PERCENTILES},
+            f"max_{window}": freshness.peak(self.data_source),
+        }
+        values = {key: round(value, 1) if value is not None else None for key, value in values.items()}
+        self._attr_native_value = values.pop("latest")
+        self._attr_extra_state_attributes = values
+        self.async_write_ha_state()
+
+class RedbackRejectedValuesSensor(RedbackEntity, SensorEntity):
+    """Diagnostic sensor counting the snapshot values rejected by the filters, per reason"""
+
+    _attr_name = "Rejected Values"
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+
+    @property
+    def unique_id(self) -> str:
+        """Device Uniqueid."""
+        return f"{self.base_unique_id}_{self.id_suffix}"
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Handle updated data from the coordinator."""
+        LOGGER.debug("Updating entity: %s", self.unique_id)
+        filters = self.coordinator.filters
+        self._attr_native_value = filters.total
+        self._attr_extra_state_attributes = {
+            reason: sum(fields.values()) for reason, fields in filters.stats().items()
+        }
+        self.async_write_ha_state()
+
+class RedbackPowerStatisticSensor(RedbackEntity, SensorEntity):
+    """Sensor for rolling-window power statistics"""
+
+    _attr_name = "Power Statistic"
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_native_unit_of_measurement = UnitOfPower.KILO_WATT
+    _attr_device_class = SensorDeviceClass.POWER
+    _attr_suggested_display_precision = 3
+
+    def __init__(self, coordinator: RedbackDataUpdateCoordinator, details) -> None:
+        super().__init__(coordinator, details)
+        self.statistic = details["statistic"]
+
+    @property
+    def unique_id(self) -> str:
+        """Device Uniqueid."""
+        return f"{self.base_unique_id}_{self.id_suffix}"
+
+    @property
+    def demand(self) -> str:
+        """The coordinator only maintains the statistics of fields with enabled sensors."""
+        return self.data_source
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Handle updated data from the coordinator."""
+        LOGGER.debug("Updating entity: %s", self.unique_id)
+        # the coordinator keeps the statistics up to date with every sample, we only read them
+        statistics = self.coordinator.statistics
+        if self.statistic == "mean":
+            self._attr_native_value = statistics.mean(self.data_source)
+        elif self.statistic == "peak":
+            self._attr_native_value = statistics.peak(self.data_source)
+        else:
+            self._attr_native_value = statistics.percentile(self.data_source, STATISTICS_PERCENTILE)
+        self.async_write_ha_state()
+
 class RedbackPowerSensorW(RedbackEntity, SensorEntity):
     _attr_name = "Power"
     _attr_state_class = SensorStateClass.MEASUREMENT
@@ -578,7 +849,7 @@ class RedbackPowerSensorW(RedbackEntity, SensorEntity):
     def _handle_coordinator_update(self) -> None:
         """Handle updated data from the coordinator."""
         LOGGER.debug("Updating entity: %s", self.unique_id)
-        self._attr_native_value = self.coordinator.energy_data.get(self.data_source, 0)
+        self._attr_native_value = self.coordinator.window_value(self.data_source, self.aggregate, 0)
         self.async_write_ha_state()
 
 class RedbackEnergySensor(RedbackEntity, SensorEntity):
@@ -588,13 +859,14 @@ class RedbackEnergySensor(RedbackEntity, SensorEntity):
     _attr_state_class = SensorStateClass.TOTAL
     _attr_native_unit_of_measurement = UnitOfEnergy.KILO_WATT_HOUR
     _attr_device_class = SensorDeviceClass.ENERGY
+    _default_aggregate = "mean"
     _suggested_display_precision = 3
 
     def __init__(self, coordinator: RedbackDataUpdateCoordinator, details) -> None:        
         super().__init__(coordinator, details)
         self._attr_native_value = 0
         self._attr_last_reset = datetime.now()
-        self._last_update = datetime.now()
+        self._last_update = coordinator.clock()
         
 
     @property
@@ -606,17 +878,19 @@ class RedbackEnergySensor(RedbackEntity, SensorEntity):
     def _handle_coordinator_update(self) -> None:
         """Handle updated data from the coordinator."""
         LOGGER.debug("Updating entity: %s", self.unique_id)
-        measurement = self.coordinator.energy_data[self.data_source]
+        measurement = self.coordinator.window_value(self.data_source, self.aggregate)
+        if measurement is None:
+            return
         if(self.direction == "positive"):
             measurement = max(measurement, 0)
         else:
             measurement = 0 - min(measurement, 0)
-        sample_time = datetime.now()
+        sample_time = self.coordinator.clock() # monotonic, so clock steps can't distort the integration
         time_delta = sample_time - self._last_update    # Assume sample value is representative of the time since last update
         self._last_update = sample_time
-        hours = time_delta.total_seconds()/3600
+        hours = time_delta/3600
         measurement = measurement * hours  # multiply watts by hours to get Wh        
-        if self.convertkW: self.measurement /= 1000 # convert from Wh to kWh
+        if self.convertkW: measurement /= 1000 # convert from Wh to kWh
         self._attr_native_value = round(self._attr_native_value + measurement, 2)
         self.async_write_ha_state()
 
@@ -627,6 +901,68 @@ class RedbackEnergyMeter(RedbackEntity, SensorEntity):
     _attr_state_class = SensorStateClass.TOTAL_INCREASING
     _attr_native_unit_of_measurement = UnitOfEnergy.KILO_WATT_HOUR
     _attr_device_class = SensorDeviceClass.ENERGY
+    # period totals change with every update, not worth storing with every state change
+    _unrecorded_attributes = RedbackEntity._unrecorded_attributes | frozenset({
+        "today",
+        "yesterday",
+        "this_month",
+    })
+
+    @property
+    def unique_id(self) -> str:
+        """Device Uniqueid."""
+        return f"{self.base_unique_id}_{self.id_suffix}"
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Handle updated data from the coordinator."""
+        LOGGER.debug("Updating entity: %s", self.unique_id)
+        self._attr_native_value = self.coordinator.window_value(self.data_source, self.aggregate)
+        self._attr_extra_state_attributes = self.coordinator.period_attributes(COUNTER_FIELDS[self.data_source])
+        self.async_write_ha_state()
+
+class RedbackEnergyTotalSensor(RedbackEntity, SensorEntity):
+    """Sensor for energy totals of the coordinator's energy delta engine"""
+
+    _attr_name = "Energy Total"
+    # TOTAL as before (the battery totals kept their unique_ids), changing it would break their long-term statistics
+    _attr_state_class = SensorStateClass.TOTAL
+    _attr_native_unit_of_measurement = UnitOfEnergy.KILO_WATT_HOUR
+    _attr_device_class = SensorDeviceClass.ENERGY
+    _attr_suggested_display_precision = 3
+    # period totals change with every update, not worth storing with every state change
+    _unrecorded_attributes = RedbackEntity._unrecorded_attributes | frozenset({
+        "today",
+        "yesterday",
+        "this_month",
+    })
+
+    @property
+    def unique_id(self) -> str:
+        """Device Uniqueid."""
+        return f"{self.base_unique_id}_{self.id_suffix}"
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Handle updated data from the coordinator."""
+        LOGGER.debug("Updating entity: %s", self.unique_id)
+        self._attr_native_value = round(self.coordinator.energy.totals[self.data_source], 3)
+        self._attr_extra_state_attributes = self.coordinator.period_attributes(self.data_source)
+        self.async_write_ha_state()
+
+class RedbackEnergyPeriodSensor(RedbackEntity, SensorEntity):
+    """Sensor for the energy of a period (today, this month), restarts at local midnight"""
+
+    _attr_name = "Energy Period"
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+    _attr_native_unit_of_measurement = UnitOfEnergy.KILO_WATT_HOUR
+    _attr_device_class = SensorDeviceClass.ENERGY
+    _attr_suggested_display_precision = 3
+    _attr_entity_registry_enabled_default = False
+
+    def __init__(self, coordinator: RedbackDataUpdateCoordinator, details) -> None:
+        super().__init__(coordinator, details)
+        self.period = details["period"]
 
     @property
     def unique_id(self) -> str:
@@ -637,7 +973,7 @@ class RedbackEnergyMeter(RedbackEntity, SensorEntity):
     def _handle_coordinator_update(self) -> None:
         """Handle updated data from the coordinator."""
         LOGGER.debug("Updating entity: %s", self.unique_id)
-        self._attr_native_value = self.coordinator.energy_data[self.data_source]
+        self._attr_native_value = round(self.coordinator.periods.periods[self.period][self.data_source], 3)
         self.async_write_ha_state()
 
 class RedbackEnergyStorageSensor(RedbackEntity, SensorEntity):
@@ -648,37 +984,26 @@ class RedbackEnergyStorageSensor(RedbackEntity, SensorEntity):
     _attr_native_unit_of_measurement = UnitOfEnergy.KILO_WATT_HOUR
     _attr_device_class = SensorDeviceClass.ENERGY_STORAGE 
     _attr_icon = "mdi:home-battery"
+    # static attributes, not worth storing with every state change
+    _unrecorded_attributes = RedbackEntity._unrecorded_attributes | frozenset({
+        "usable_battery_offgrid_kwh",
+        "usable_battery_ongrid_kwh",
+        "max_discharge_power_w",
+        "max_charge_power_w",
+    })
 
     @property
     def unique_id(self) -> str:
         """Device Uniqueid."""
         return f"{self.base_unique_id}_{self.id_suffix}"
     
-    @property
-    def extra_state_attributes(self) -> Mapping[str, Any] | None:
-        """Return additional pieces of information."""
-        dataAttributes = self.coordinator.inverter_info
-
-        if dataAttributes is None:
-            data["usable_battery_offgrid_kwh"] = None
-            data["usable_battery_ongrid_kwh"] = None
-            data["max_discharge_power_w"] = None
-            data["max_charge_power_w"] = None
-        else: 
-            data = {
-				"usable_battery_offgrid_kwh": dataAttributes["UsableBatteryCapacitykWh"],
-				"usable_battery_ongrid_kwh": dataAttributes["UsableBatteryCapacityOnGridkWh"],
-				"max_discharge_power_w": dataAttributes["BatteryMaxDischargePowerW"],
-				"max_charge_power_w": dataAttributes["BatteryMaxChargePowerW"]
-			}
-        return data
-
     @callback
     def _handle_coordinator_update(self) -> None:
         """Handle updated data from the coordinator."""
         LOGGER.debug("Updating entity: %s", self.unique_id)
         # note: this sensor type always draws from inverter_info, not energy_data
         self._attr_native_value = self.coordinator.inverter_info[self.data_source]
+        self._attr_extra_state_attributes = self.coordinator.static_attributes.get("storage")
         self.async_write_ha_state()
 
 class RedbackCurrentSensor(RedbackEntity, SensorEntity):
@@ -688,6 +1013,7 @@ class RedbackCurrentSensor(RedbackEntity, SensorEntity):
     _attr_state_class = SensorStateClass.MEASUREMENT
     _attr_native_unit_of_measurement = UnitOfElectricCurrent.AMPERE
     _attr_device_class = SensorDeviceClass.CURRENT
+    _default_aggregate = "mean"
     _suggested_display_precision = 3
 
     @property
@@ -699,7 +1025,11 @@ class RedbackCurrentSensor(RedbackEntity, SensorEntity):
     def _handle_coordinator_update(self) -> None:
         """Handle updated data from the coordinator."""
         LOGGER.debug("Updating entity: %s", self.unique_id)
-        self._attr_native_value = round(self.coordinator.energy_data[self.data_source],0)
+        measurement = self.coordinator.window_value(self.data_source, self.aggregate)
+        if measurement is None:
+            # no valid value (e.g. rejected by the filters), keep the previous state
+            return
+        self._attr_native_value = round(measurement, 0)
         self.async_write_ha_state()
 
 class RedbackStatusSensor(RedbackEntity, SensorEntity):
@@ -710,45 +1040,29 @@ class RedbackStatusSensor(RedbackEntity, SensorEntity):
     _attr_options = INVERTER_STATUS
     _attr_native_unit_of_measurement = None
     _attr_icon = "mdi:information-outline"
+    # static attributes, not worth storing with every state change
+    _unrecorded_attributes = RedbackEntity._unrecorded_attributes | frozenset({
+        "serial_number",
+        "software_version",
+        "ross_version",
+        "model_name",
+        "system_type",
+        "site_id",
+        "inverter_max_export_power_w",
+        "inverter_max_import_power_w",
+    })
 
     @property
     def unique_id(self) -> str:
         """Device Uniqueid."""
         return f"{self.base_unique_id}_{self.id_suffix}"
 
-    @property
-    def extra_state_attributes(self) -> Mapping[str, Any] | None:
-        """Return additional pieces of information."""
-        dataAttributes = self.coordinator.inverter_info
-
-        if dataAttributes is None:
-            data["serial_number"] = None
-            data["software_version"] = None
-            data["ross_version"] = None
-            data["model_name"] = None
-            data["system_type"] = None
-            data["site_id"] = None
-            data ["inverter_max_export_power_w"] = None
-            data ["inverter_max_import_power_w"] = None
-            
-        else: 
-            data = {
-				"serial_number": dataAttributes["SerialNumber"],
-				"software_version": dataAttributes["SoftwareVersion"],
-				"ross_version": dataAttributes["SoftwareVersion"],
-                "model_name": dataAttributes["ModelName"],
-                "system_type": dataAttributes["SystemType"],
-                "site_id": dataAttributes["SiteId"],
-                "inverter_max_export_power_w": dataAttributes["InverterMaxExportPowerW"],
-                "inverter_max_import_power_w": dataAttributes["InverterMaxImportPowerW"]
-			}
-        return data
-
     @callback
     def _handle_coordinator_update(self) -> None:
         """Handle updated data from the coordinator."""
         LOGGER.debug("Updating entity: %s", self.unique_id)
         self._attr_native_value = self.coordinator.inverter_info[self.data_source]
+        self._attr_extra_state_attributes = self.coordinator.static_attributes.get("status")
         self.async_write_ha_state()
         
 class RedbackInverterModeSensor(RedbackEntity, SensorEntity):
@@ -765,25 +1079,15 @@ class RedbackInverterModeSensor(RedbackEntity, SensorEntity):
         """Device Uniqueid."""
         return f"{self.base_unique_id}_{self.id_suffix}"
 
-    @property
-    def extra_state_attributes(self) -> Mapping[str, Any] | None:
-        """Return additional pieces of information."""
-        dataAttributes = self.coordinator.energy_data
-
-        if dataAttributes is None:
-            data["inverter_power_setting"] = None
-        else: 
-            data = {
-				"inverter_power_setting": dataAttributes["InverterPowerW"]
-			}
-        return data
-
-
     @callback
     def _handle_coordinator_update(self) -> None:
         """Handle updated data from the coordinator."""
         LOGGER.debug("Updating entity: %s", self.unique_id)
-        self._attr_native_value = self.coordinator.energy_data[self.data_source]
+        self._attr_native_value = self.coordinator.window_value(self.data_source, self.aggregate)
+        # set here rather than in a property, so the snapshot age can be added by RedbackEntity
+        self._attr_extra_state_attributes = {
+            "inverter_power_setting": self.coordinator.energy_data.get("InverterPowerW"),
+        }
         self.async_write_ha_state()
         
 class RedbackBatteryChargeSensor(RedbackEntity, SensorEntity):
@@ -800,25 +1104,20 @@ class RedbackBatteryChargeSensor(RedbackEntity, SensorEntity):
         """Device Uniqueid."""
         return f"{self.base_unique_id}_{self.id_suffix}"
 
-    @property
-    def extra_state_attributes(self) -> Mapping[str, Any] | None:
-        """Return additional pieces of information."""
-        dataAttributesEnergy = self.coordinator.energy_data
-        dataAttributesInfo = self.coordinator.inverter_info
-
-        data = {
-		    "battery_current_ongrid_usable": round( ((dataAttributesEnergy["BatterySoCInstantaneous0to1"]  - dataAttributesInfo["MinSoC0to1"]) * dataAttributesInfo["BatteryCapacitykWh"]), 3),
-            "battery_current_offgrid_usable": round( ((dataAttributesEnergy["BatterySoCInstantaneous0to1"] - dataAttributesInfo["MinOffgridSoC0to1"]) * dataAttributesInfo["BatteryCapacitykWh"]), 3),
-			}
-        return data
-
     @callback
     def _handle_coordinator_update(self) -> None:
         """Handle updated data from the coordinator."""
         LOGGER.debug("Updating entity: %s", self.unique_id)
-        batterySoc= self.coordinator.energy_data["BatterySoCInstantaneous0to1"]
+        batterySoc= self.coordinator.energy_data.get("BatterySoCInstantaneous0to1")
+        if batterySoc is None:
+            return
         batteryCapacity= self.coordinator.inverter_info["BatteryCapacitykWh"]
         self._attr_native_value = round( (batterySoc * batteryCapacity), 3)
+        # computed once per publish instead of on every state write
+        self._attr_extra_state_attributes = {
+            "battery_current_ongrid_usable": round( ((batterySoc - self.coordinator.inverter_info["MinSoC0to1"]) * batteryCapacity), 3),
+            "battery_current_offgrid_usable": round( ((batterySoc - self.coordinator.inverter_info["MinOffgridSoC0to1"]) * batteryCapacity), 3),
+        }
         self.async_write_ha_state()
         
 
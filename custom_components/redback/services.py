@@ -0,0 +1,62 @@
+"""Services of the Redback integration."""
+from __future__ import annotations
+
+import voluptuous as vol
+
+from homeassistant.core import HomeAssistant, ServiceCall, ServiceResponse, SupportsResponse, callback
+from homeassistant.exceptions import ServiceValidationError
+import homeassistant.helpers.config_validation as cv
+from homeassistant.util import dt as dt_util
+
+from .buffer import AGGREGATES
+from .const import DOMAIN, MIN_POLL_INTERVAL, ARCHIVE_QUERY_LIMIT
+
+SERVICE_QUERY_ARCHIVE = "query_archive"
+
+QUERY_ARCHIVE_SCHEMA = vol.Schema({
+    vol.Required("config_entry_id"): cv.string,
+    vol.Required("start"): cv.datetime,
+    vol.Optional("end"): cv.datetime,
+    vol.Optional("fields"): vol.All(cv.ensure_list, [cv.string]),
+    vol.Optional("interval", default=300): vol.All(vol.Coerce(int), vol.Range(min=MIN_POLL_INTERVAL)),
+    vol.Optional("aggregate", default="mean"): vol.In(AGGREGATES),
+})
+
+
+@callback
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the Redback services."""
+
+    async def query_archive(call: ServiceCall) -> ServiceResponse:
+        """Return archived dynamic data of a site, aggregated over buckets of interval seconds."""
+        coordinator = hass.data.get(DOMAIN, {}).get(call.data["config_entry_id"])
+        if coordinator is None:
+            raise ServiceValidationError(f"Redback config entry {call.data['config_entry_id']} is not loaded")
+        if coordinator.archive is None:
+            raise ServiceValidationError(f"The archive is not enabled for {coordinator.config_entry.title}")
+
+        start = dt_util.as_utc(call.data["start"]).timestamp()
+        end = dt_util.as_utc(call.data.get("end") or dt_util.utcnow()).timestamp()
+        interval = call.data["interval"]
+        if end <= start:
+            raise ServiceValidationError("end must be after start")
+        if (end - start) / interval > ARCHIVE_QUERY_LIMIT:
+            raise ServiceValidationError(f"More than {ARCHIVE_QUERY_LIMIT} intervals requested, use a longer interval")
+
+        result = await hass.async_add_executor_job(
+            coordinator.archive.query, start, end, call.data.get("fields"), interval, call.data["aggregate"]
+        )
+        return {
+            "interval": interval,
+            "aggregate": call.data["aggregate"],
+            "timestamps": [dt_util.utc_from_timestamp(timestamp).isoformat() for timestamp in result["timestamps"]],
+            "values": result["values"],
+        }
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_QUERY_ARCHIVE,
+        query_archive,
+        schema=QUERY_ARCHIVE_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
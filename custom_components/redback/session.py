@@ -0,0 +1,75 @@
+"""Integration-owned HTTP connection pool for the Redback integration."""
+from __future__ import annotations
+
+from homeassistant.const import EVENT_HOMEASSISTANT_CLOSE
+from homeassistant.core import Event, HomeAssistant, callback
+from homeassistant.util import ssl as ssl_util
+
+from .const import (
+    DOMAIN,
+    POOL_LIMIT,
+    POOL_LIMIT_PER_HOST,
+    POOL_KEEPALIVE_TIMEOUT,
+    POOL_DNS_CACHE_TTL,
+    GOVERNOR_RATE,
+    GOVERNOR_BURST,
+)
+from .redbacklib import RedbackConnectionPool, RedbackRateGovernor, RedbackSingleFlight
+from .scheduler import RedbackRefreshScheduler
+
+DATA_POOL = f"{DOMAIN}_pool"
+DATA_REQUESTS = f"{DOMAIN}_requests"
+DATA_GOVERNORS = f"{DOMAIN}_governors"
+DATA_SCHEDULER = f"{DOMAIN}_scheduler"
+
+
+@callback
+def async_get_pool(hass: HomeAssistant) -> RedbackConnectionPool:
+    """Return the connection pool shared by all Redback config entries."""
+    if (pool := hass.data.get(DATA_POOL)) is not None:
+        return pool
+
+    pool = hass.data[DATA_POOL] = RedbackConnectionPool(
+        limit=POOL_LIMIT,
+        limitPerHost=POOL_LIMIT_PER_HOST,
+        keepaliveTimeout=POOL_KEEPALIVE_TIMEOUT,
+        dnsCacheTtl=POOL_DNS_CACHE_TTL,
+        ssl=ssl_util.client_context(),
+    )
+
+    async def _async_close_pool(event: Event) -> None:
+        await pool.close()
+
+    hass.bus.async_listen_once(EVENT_HOMEASSISTANT_CLOSE, _async_close_pool)
+    return pool
+
+
+async def async_close_pool(hass: HomeAssistant) -> None:
+    """Close the shared connection pool (once the last config entry is unloaded)."""
+    if (pool := hass.data.pop(DATA_POOL, None)) is not None:
+        await pool.close()
+
+
+@callback
+def async_get_requests(hass: HomeAssistant) -> RedbackSingleFlight:
+    """Return the in-flight request registry shared by every Redback client (config flow and coordinators)."""
+    if (requests := hass.data.get(DATA_REQUESTS)) is None:
+        requests = hass.data[DATA_REQUESTS] = RedbackSingleFlight()
+    return requests
+
+
+@callback
+def async_get_governor(hass: HomeAssistant, client_id: str) -> RedbackRateGovernor:
+    """Return the request governor of a Redback account, shared by all its config entries."""
+    governors = hass.data.setdefault(DATA_GOVERNORS, {})
+    if (governor := governors.get(client_id)) is None:
+        governor = governors[client_id] = RedbackRateGovernor(rate=GOVERNOR_RATE, burst=GOVERNOR_BURST)
+    return governor
+
+
+@callback
+def async_get_scheduler(hass: HomeAssistant) -> RedbackRefreshScheduler:
+    """Return the refresh scheduler staggering the polls of all Redback config entries."""
+    if (scheduler := hass.data.get(DATA_SCHEDULER)) is None:
+        scheduler = hass.data[DATA_SCHEDULER] = RedbackRefreshScheduler()
+    return scheduler
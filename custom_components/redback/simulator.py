@@ -0,0 +1,478 @@
+"""Synthetic Redback fleet, serves public API payloads that evolve over time without any network
+
+Drives TEST_MODE, load tests and benchmarks. Every site is generated from the fleet seed and its
+index, so the same seed always gives the same fleet. Run as a script to serve the fleet over HTTP
+(e.g. for fleet.py --base-url) or to benchmark the client library:
+
+    python custom_components/redback/simulator.py serve --sites 1000 --port 8765
+    python custom_components/redback/simulator.py bench --sites 10000 --rounds 3
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import copy
+import re
+from datetime import datetime, timedelta, timezone
+from math import pi, sin
+from time import monotonic, time
+
+try:
+    from .redbacklib import RedbackInverter, RedbackAPIError
+except ImportError:  # run as a script
+    from redbacklib import RedbackInverter, RedbackAPIError
+
+_MASK64 = (1 << 64) - 1
+
+# site mix of a generated fleet (fractions of the sites)
+THREE_PHASE_SHARE = 0.35
+NO_BATTERY_SHARE = 0.25
+MULTI_INVERTER_SHARE = 0.1
+
+# fixed answers of the (deprecated) private API endpoints, its data doesn't evolve
+PRIVATE_RESPONSES = {
+    "inverterinfo": {
+        "Model": "ST10000",
+        "Firmware": "080819",
+        "RossVersion": "2.15.32207.13",
+        "IsThreePhaseInverter": True,
+        "IsSmartBatteryInverter": False,
+        "IsSinglePhaseInverter": False,
+        "IsGridTieInverter": False,
+    },
+    "BannerInfo": {
+        "ProductDisplayname": "Smart Inverter TEST",
+        "InstalledPvSizeWatts": 9960.0,
+        "BatteryCapacityWattHours": 14200.001,
+    },
+    "energyflowd2": {
+        "Data": {
+            "Input": {
+                "ACLoadW": 1450.0,
+                "BackupLoadW": 11.0,
+                "SupportsConnectedPV": True,
+                "PVW": 7579.0,
+                "ThirdPartyW": None,
+                "GridStatus": "Export",
+                "GridNegativeIsImportW": 6200.0,
+                "ConfiguredWithBatteries": True,
+                "BatteryNegativeIsChargingW": 0.0,
+                "BatteryStatus": "Idle",
+                "BatterySoC0to100": 98.0,
+                "CtComms": True,
+            }
+        }
+    },
+}
+
+STEP_SECONDS = 60 # integration step of the energy counters
+MAX_CATCH_UP = 7 * 86400 # longer gaps (e.g. a clock jump) restart the integration
+
+
+def _unit(*values):
+    """Deterministic uniform [0, 1) value from integers (splitmix64 finalizer)"""
+    x = 0x9E3779B97F4A7C15
+    for value in values:
+        x = (x ^ (value & _MASK64)) * 0xBF58476D1CE4E5B9 & _MASK64
+        x = (x ^ (x >> 31)) * 0x94D049BB133111EB & _MASK64
+        x ^= x >> 29
+    return (x >> 11) / (1 << 53)
+
+
+def _isoformat(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class SimulatedSite:
+    """One generated site: static configuration plus the state that evolves with time"""
+
+    def __init__(self, seed, index, now):
+        self.key = seed * 1_000_003 + index
+        rnd = lambda n: _unit(self.key, n)
+
+        self.siteId = f"S{seed % 1000:03d}{index:010d}"
+        self.phases = ("A", "B", "C") if rnd(1) < THREE_PHASE_SHARE else ("A",)
+        inverterCount = 2 if rnd(2) < MULTI_INVERTER_SHARE else 1
+        self.serials = [f"RB{seed % 1000:03d}{index:09d}{n:02d}" for n in range(inverterCount)]
+        self.batteryCount = 0 if rnd(3) < NO_BATTERY_SHARE else 1 + int(rnd(4) * 4)
+        perPhaseKw = 5 if len(self.phases) == 1 else 10
+        self.inverterMaxkW = perPhaseKw * inverterCount
+        self.panelSizekW = round(self.inverterMaxkW * (0.6 + 0.7 * rnd(5)), 2)
+        self.batteryCapacitykWh = round(self.batteryCount * 3.55, 2)
+        self.batteryMaxkW = min(self.inverterMaxkW, 2.5 * self.batteryCount)
+        self.minSoC = 0.1 if self.batteryCount else 0
+        self.minOffgridSoC = 0.05 if self.batteryCount else 0
+        self.longitude = round(115 + 38 * rnd(6), 3) # Australia, for local solar time
+        self.latitude = round(-12 - 30 * rnd(7), 3)
+        self.cloudiness = 0.6 * rnd(8)
+        self.baseLoadkW = 0.2 + 0.6 * rnd(9)
+        self.commissioned = _isoformat(now - 86400 * (30 + int(rnd(10) * 2000)))[:10]
+
+        # counters start somewhere in the site's life, SoC anywhere in its range
+        age = 200 + 3000 * rnd(11)
+        self.pvkWh = round(age * self.panelSizekW * 4, 3)
+        self.loadkWh = round(age * (self.baseLoadkW * 24 + 6), 3)
+        self.exportkWh = round(self.pvkWh * 0.45, 3)
+        self.importkWh = round(self.loadkWh * 0.35, 3)
+        self.soc = self.minSoC + (1 - self.minSoC) * rnd(12)
+        # the device uploads a sample every minute, at a site-specific second
+        self.uploadOffset = 60 * rnd(13)
+        self.updated = now
+        self.flows = self._flows(now)
+
+    def _mode(self, now):
+        """Inverter mode and power setpoint (W), changes at most once an hour"""
+        if not self.batteryCount:
+            return "Auto", 0
+        u = _unit(self.key, 100, int(now // 3600))
+        if u < 0.05:
+            return "ChargeBattery", int(self.batteryMaxkW * 500)
+        if u < 0.08:
+            return "DischargeBattery", int(self.batteryMaxkW * 500)
+        return "Auto", 0
+
+    def _sampleTime(self, now):
+        """Time of the latest sample uploaded by the device"""
+        return now - (now - self.uploadOffset) % 60
+
+    def _status(self, now):
+        """Offline for about 1% of the hours"""
+        return "Offline" if _unit(self.key, 200, int(now // 3600)) < 0.01 else "OK"
+
+    def _flows(self, now):
+        """Instantaneous power flows (kW) at time now, from the solar curve, load profile and mode"""
+        status = self._status(now)
+        mode, powerW = self._mode(now)
+        hour = (now / 3600 + self.longitude / 15) % 24 # local solar time
+        sun = max(sin(pi * (hour - 6) / 12), 0) ** 1.2
+        slot = int(now // 600)
+        clouds = 1 - self.cloudiness * (_unit(self.key, 300, slot) * 0.7 + _unit(self.key, 301, int(now // 60)) * 0.3)
+        pv = 0.0 if status == "Offline" else self.panelSizekW * sun * clouds
+        evening = max(sin(pi * (hour - 16) / 6), 0) if 16 <= hour <= 22 else 0
+        load = self.baseLoadkW + 2.5 * evening + 1.5 * _unit(self.key, 400, int(now // 120)) ** 4
+
+        battery = 0.0
+        if self.batteryCount and status == "OK":
+            if mode == "ChargeBattery":
+                battery = -powerW / 1000
+            elif mode == "DischargeBattery":
+                battery = powerW / 1000
+            else:
+                battery = min(max(load - pv, -self.batteryMaxkW), self.batteryMaxkW)
+            # no charging when full, no discharging below the minimum SoC
+            if (battery < 0 and self.soc >= 1) or (battery > 0 and self.soc <= self.minSoC):
+                battery = 0.0
+        net = pv + battery - load # positive is export
+        return {"status": status, "mode": mode, "powerW": powerW, "pv": pv, "load": load, "battery": battery, "net": net, "sun": sun}
+
+    def advance(self, now):
+        """Integrates the energy counters and SoC up to time now"""
+        if now <= self.updated:
+            return
+        if now - self.updated > MAX_CATCH_UP:
+            self.updated = now - STEP_SECONDS
+        t = self.updated
+        while t < now:
+            step = min(STEP_SECONDS, now - t)
+            t += step
+            flows = self._flows(t)
+            hours = step / 3600
+            self.pvkWh += flows["pv"] * hours
+            self.loadkWh += flows["load"] * hours
+            self.exportkWh += max(flows["net"], 0) * hours
+            self.importkWh += max(-flows["net"], 0) * hours
+            if self.batteryCapacitykWh:
+                self.soc = min(max(self.soc - flows["battery"] * hours / self.batteryCapacitykWh, 0), 1)
+        self.updated = now
+        self.flows = self._flows(now)
+
+    def basicData(self):
+        return {
+            "Id": self.siteId,
+            "Nmi": None,
+            "Type": "Site",
+            "Nodes": [
+                *({"SerialNumber": serial, "Id": serial, "Nmi": None, "Type": "Inverter", "Nodes": None} for serial in self.serials),
+                {"Id": "Houseload", "Nmi": None, "Type": "Houseload", "Nodes": None},
+            ],
+        }
+
+    def staticData(self, now):
+        hasBattery = bool(self.batteryCount)
+        metadata = {
+            f"{field}Metadata": {"Measured": measured}
+            for field, measured in [
+                ("ActiveExportedPowerInstantaneouskW", True),
+                ("ActiveImportedPowerInstantaneouskW", True),
+                ("VoltageInstantaneousV", True),
+                ("CurrentInstantaneousA", True),
+                ("PowerFactorInstantaneousMinus1to1", True),
+                ("FrequencyInstantaneousHz", True),
+                ("BatterySoCInstantaneous0to1", hasBattery),
+                ("PvPowerInstantaneouskW", False),
+                ("InverterTemperatureC", True),
+                ("BatteryPowerNegativeIsChargingkW", hasBattery),
+                ("PvAllTimeEnergykWh", False),
+                ("ExportAllTimeEnergykWh", True),
+                ("ImportAllTimeEnergykWh", True),
+                ("LoadAllTimeEnergykWh", False),
+            ]
+        }
+        modelName = ("ST" if len(self.phases) == 3 else "SH") + str(int(self.inverterMaxkW / len(self.serials) * 1000))
+        return {
+            "Data": {
+                "StaticData": {
+                    "TimestampUtc": _isoformat(now),
+                    "Location": {
+                        "Latitude": self.latitude,
+                        "Longitude": self.longitude,
+                        "AddressLineOne": f"{int(_unit(self.key, 12) * 200) + 1} Simulated St",
+                        "AddressLineTwo": None,
+                        "Suburb": "Simulated",
+                        "State": "Qld",
+                        "Country": "Australia",
+                        "PostCode": "4000",
+                    },
+                    "TechnologyProvider": "Simulator",
+                    "RemoteAccessConnection": {"Type": "ETHERNET", "CustomerChoice": True},
+                    "ApprovedCapacityW": None,
+                    "SolarRetailer": {"Name": "Simulated Retailer", "ABN": "00000000000"},
+                    "SiteDetails": {
+                        "GenerationHardLimitVA": None,
+                        "GenerationSoftLimitVA": None,
+                        "ExportHardLimitkW": None,
+                        "ExportHardLimitW": None,
+                        "ExportSoftLimitkW": None,
+                        "ExportSoftLimitW": None,
+                        "SiteExportLimitkW": None,
+                        "BatteryMaxChargePowerkW": self.batteryMaxkW,
+                        "BatteryMaxDischargePowerkW": self.batteryMaxkW,
+                        "BatteryCapacitykWh": self.batteryCapacitykWh,
+                        "UsableBatteryCapacitykWh": round(self.batteryCapacitykWh * (1 - self.minOffgridSoC), 3),
+                        "PanelModel": " ",
+                        "PanelSizekW": self.panelSizekW,
+                        "SystemType": "Hybrid" if hasBattery else "GridTie",
+                        "InverterMaxExportPowerkW": self.inverterMaxkW,
+                        "InverterMaxImportPowerkW": self.inverterMaxkW,
+                    },
+                    "CommissioningDate": self.commissioned,
+                    "NMI": None,
+                    "LatestDynamicDataUtc": _isoformat(self._sampleTime(now)),
+                    "Status": self._status(now),
+                    "Id": self.siteId,
+                    "Type": "Site",
+                    "DynamicDataMetadata": metadata,
+                },
+                "Nodes": [
+                    *(
+                        {
+                            "StaticData": {
+                                "ModelName": modelName,
+                                "BatteryCount": self.batteryCount if n == 0 else 0,
+                                "SoftwareVersion": "2.16.32211.1",
+                                "FirmwareVersion": "080819",
+                                "BatteryModels": ["RB600"] * self.batteryCount if n == 0 else [],
+                                "Id": serial,
+                                "Type": "Inverter",
+                                "DynamicDataMetadata": None,
+                            },
+                            "Nodes": None,
+                        }
+                        for n, serial in enumerate(self.serials)
+                    ),
+                    {"StaticData": {"Id": "HouseLoad", "Type": "Houseload", "DynamicDataMetadata": None}, "Nodes": None},
+                ],
+            }
+        }
+
+    def configData(self):
+        return {"Data": {"MinSoC0to1": self.minSoC, "MinOffgridSoC0to1": self.minOffgridSoC}}
+
+    def scheduleData(self):
+        return {"Data": {"SiteId": self.siteId, "Schedules": []}}
+
+    def dynamicData(self, now):
+        flows = self.flows
+        minute = int(now // 60)
+        phaseCount = len(self.phases)
+        phases = []
+        for n, phase in enumerate(self.phases):
+            share = (1 + 0.1 * (_unit(self.key, 500 + n, minute) - 0.5)) / phaseCount
+            voltage = round(230 + 12 * _unit(self.key, 510 + n, minute), 1)
+            powerFactor = round(0.75 + 0.25 * _unit(self.key, 520 + n, minute), 3)
+            phasePower = flows["net"] * share
+            phases.append({
+                "Id": phase,
+                "ActiveExportedPowerInstantaneouskW": round(max(phasePower, 0), 3),
+                "ActiveImportedPowerInstantaneouskW": round(max(-phasePower, 0), 3),
+                "VoltageInstantaneousV": voltage,
+                "CurrentInstantaneousA": round(abs(phasePower) * 1000 / voltage / powerFactor, 2),
+                "PowerFactorInstantaneousMinus1to1": powerFactor,
+            })
+        inverterCount = len(self.serials)
+        return {
+            "Data": {
+                "TimestampUtc": _isoformat(self._sampleTime(now)),
+                "SiteId": self.siteId,
+                "Phases": phases,
+                "FrequencyInstantaneousHz": round(49.95 + 0.1 * _unit(self.key, 530, minute), 2),
+                "BatterySoCInstantaneous0to1": round(self.soc, 3) if self.batteryCount else None,
+                "PvPowerInstantaneouskW": round(flows["pv"], 3),
+                "InverterTemperatureC": round(25 + 25 * flows["sun"] + 3 * _unit(self.key, 540, minute), 1),
+                "BatteryPowerNegativeIsChargingkW": round(flows["battery"], 3) if self.batteryCount else None,
+                "PvAllTimeEnergykWh": round(self.pvkWh, 3),
+                "ExportAllTimeEnergykWh": round(self.exportkWh, 3),
+                "ImportAllTimeEnergykWh": round(self.importkWh, 3),
+                "LoadAllTimeEnergykWh": round(self.loadkWh, 3),
+                "Status": flows["status"],
+                "Inverters": [
+                    {"SerialNumber": serial, "PowerMode": {"InverterMode": flows["mode"], "PowerW": flows["powerW"] // inverterCount}}
+                    for serial in self.serials
+                ],
+            },
+            "Metadata": {
+                "Latest": f"/Api/v2/EnergyData/{self.siteId}/Dynamic?metadata=True",
+            },
+        }
+
+
+class RedbackSimulator:
+    """Account of 1 to 10,000 generated sites, answers public API paths with payloads of the real schema
+
+    clock returns POSIX seconds (wall time drives the solar curve), a ManualClock started at a
+    POSIX time makes the simulation fully deterministic.
+    """
+
+    _paths = [
+        (re.compile(r"EnergyData/With/Nodes"), "basic"),
+        (re.compile(r"EnergyData/(?P<site>[^/?]+)/Static"), "static"),
+        (re.compile(r"EnergyData/(?P<site>[^/?]+)/Dynamic"), "dynamic"),
+        (re.compile(r"Configuration/(?P<site>[^/?]+)/Configuration"), "config"),
+        (re.compile(r"Schedule/By/Site/(?P<site>[^/?]+)"), "schedule"),
+    ]
+
+    def __init__(self, siteCount=1, seed=0, clock=time):
+        if not 1 <= siteCount <= 10_000:
+            raise ValueError("siteCount must be between 1 and 10,000")
+        self.clock = clock
+        now = clock()
+        self.sites = {}
+        for index in range(siteCount):
+            site = SimulatedSite(seed, index, now)
+            self.sites[site.siteId] = site
+        self.requests = 0
+
+    def token(self):
+        return {"token_type": "Bearer", "access_token": "simulated", "expires_in": 3600}
+
+    def basicData(self):
+        sites = [site.basicData() for site in self.sites.values()]
+        return {"Page": 0, "PageSize": len(sites), "PageCount": 1, "TotalCount": len(sites), "Data": sites}
+
+    def respond(self, path):
+        """Returns the payload of a public API GET path (relative to the API base URL)"""
+        self.requests += 1
+        for pattern, kind in self._paths:
+            match = pattern.match(path)
+            if match is None:
+                continue
+            if kind == "basic":
+                return self.basicData()
+            site = self.sites.get(match["site"])
+            if site is None:
+                raise RedbackAPIError(f"404 Not Found. Unknown site {match['site']}")
+            now = self.clock()
+            site.advance(now)
+            if kind == "static":
+                return site.staticData(now)
+            if kind == "dynamic":
+                return site.dynamicData(now)
+            if kind == "config":
+                return site.configData()
+            return site.scheduleData()
+        raise RedbackAPIError(f"404 Not Found. Unknown endpoint {path}")
+
+
+class SimulatedRedbackInverter(RedbackInverter):
+    """Redback Inverter client answered by a RedbackSimulator instead of the cloud API
+
+    Without a simulator, the client gets a fleet of 10 sites of its own (enough for every site index).
+    Private API endpoints are answered with the fixed PRIVATE_RESPONSES.
+    """
+
+    def __init__(self, *args, simulator=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.simulator = simulator if simulator is not None else RedbackSimulator(10)
+
+    async def _apiRequestBearerToken(self):
+        data = self.simulator.token()
+        self._OAuth2_bearer_token = data['token_type'] + ' ' + data['access_token']
+        self._OAuth2_next_update = self.clock() + int(data['expires_in'])
+
+    async def _apiFetch(self, endpoint, full_url, request_headers):
+        if not endpoint.startswith("public_"):
+            if endpoint not in PRIVATE_RESPONSES:
+                raise RedbackAPIError(f"404 Not Found. Unknown endpoint {endpoint}")
+            self.simulator.requests += 1
+            return copy.deepcopy(PRIVATE_RESPONSES[endpoint])
+        return self.simulator.respond(full_url[len(self._apiBaseURL):])
+
+
+def serve(args):
+    """Serves the simulated fleet over HTTP, as a stand-in for the Redback public API"""
+    from aiohttp import web
+
+    simulator = RedbackSimulator(args.sites, args.seed)
+
+    async def token(request):
+        return web.json_response(simulator.token())
+
+    async def get(request):
+        try:
+            return web.json_response(simulator.respond(request.match_info["path"] + ("?" + request.query_string if request.query_string else "")))
+        except RedbackAPIError as e:
+            return web.Response(status=404, text=str(e))
+
+    app = web.Application()
+    app.router.add_post("/Api/v2/Auth/token", token)
+    app.router.add_get("/Api/v2/{path:.*}", get)
+    print(f"Serving {len(simulator.sites)} simulated sites on http://{args.host}:{args.port}/Api/v2/")
+    web.run_app(app, host=args.host, port=args.port, print=None)
+
+
+async def bench(args):
+    """Polls every simulated site through the client library and reports the throughput"""
+    simulator = RedbackSimulator(args.sites, args.seed)
+    account = SimulatedRedbackInverter(auth_id="simulated", auth="simulated", apimethod="public", session=None, simulator=simulator)
+    inverters = [
+        SimulatedRedbackInverter(auth_id="simulated", auth="simulated", apimethod="public", session=None, site_id=siteId, token_owner=account, simulator=simulator)
+        for siteId in await account.getSiteIds()
+    ]
+    for inverter in inverters:
+        inverter.setUpdateIntervals(energyData=timedelta(0))
+    await asyncio.gather(*(inverter.getInverterInfo() for inverter in inverters))
+    for n in range(1, args.rounds + 1):
+        started = monotonic()
+        await asyncio.gather(*(inverter.getEnergyData() for inverter in inverters))
+        elapsed = monotonic() - started
+        print(f"round {n}: {len(inverters)} sites in {elapsed:.3f}s ({len(inverters) / elapsed:.0f} sites/s)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulated Redback fleet.")
+    parser.add_argument("command", choices=["serve", "bench"])
+    parser.add_argument("--sites", type=int, default=10, help="number of simulated sites (1 to 10,000)")
+    parser.add_argument("--seed", type=int, default=0, help="fleet seed, the same seed always generates the same sites")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--rounds", type=int, default=3, help="bench: polling rounds")
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        serve(args)
+    else:
+        asyncio.run(bench(args))
+
+
+if __name__ == "__main__":
+    main()
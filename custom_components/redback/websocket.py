@@ -0,0 +1,81 @@
+"""Websocket API of the Redback integration: live snapshot streams for dashboard cards."""
+from __future__ import annotations
+
+from typing import Any
+
+import voluptuous as vol
+
+from homeassistant.components import websocket_api
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.util import dt as dt_util
+
+from .const import DOMAIN
+from .coordinator import RedbackDataUpdateCoordinator
+
+_MISSING = object()
+
+
+@callback
+def async_setup_websocket(hass: HomeAssistant) -> None:
+    """Register the Redback websocket commands."""
+    websocket_api.async_register_command(hass, websocket_subscribe)
+
+
+@websocket_api.websocket_command(
+    {
+        vol.Required("type"): "redback/subscribe",
+        vol.Required("config_entry_id"): str,
+        vol.Optional("fields"): [str],
+        vol.Optional("history", default=True): bool,
+    }
+)
+@callback
+def websocket_subscribe(
+    hass: HomeAssistant, connection: websocket_api.ActiveConnection, msg: dict[str, Any]
+) -> None:
+    """Subscribe to the snapshots of a site, bypassing the state machine and the recorder.
+
+    The first event holds the buffered samples (numeric fields, column-wise), every later
+    event one new snapshot with only the fields that changed since the previous one.
+    Times are epoch seconds. When the entry unloads or reloads a last {"unloaded": true}
+    event ends the subscription, clients subscribe again once it's loaded.
+    """
+    coordinator: RedbackDataUpdateCoordinator | None = hass.data.get(DOMAIN, {}).get(msg["config_entry_id"])
+    if coordinator is None:
+        connection.send_error(msg["id"], websocket_api.const.ERR_NOT_FOUND, "Redback config entry not loaded")
+        return
+
+    fields = msg.get("fields")
+    previous: dict[str, Any] = dict(coordinator.energy_data or {})
+
+    @callback
+    def forward_snapshot(timestamp: float, snapshot: dict[str, Any]) -> None:
+        changed = {
+            key: value
+            for key, value in snapshot.items()
+            if (fields is None or key in fields) and previous.get(key, _MISSING) != value
+        }
+        previous.clear()
+        previous.update(snapshot)
+        connection.send_message(
+            websocket_api.event_message(msg["id"], {"t": round(timestamp, 3), "changed": changed})
+        )
+
+    @callback
+    def close_subscription() -> None:
+        connection.subscriptions.pop(msg["id"], None)
+        connection.send_message(websocket_api.event_message(msg["id"], {"unloaded": True}))
+
+    connection.subscriptions[msg["id"]] = coordinator.async_add_sample_listener(forward_snapshot, close_subscription)
+    connection.send_result(msg["id"])
+
+    if msg["history"]:
+        # the buffer is timed with the coordinator's monotonic clock
+        offset = dt_util.utcnow().timestamp() - coordinator.clock()
+        times, columns = coordinator.samples.columns(fields)
+        connection.send_message(
+            websocket_api.event_message(
+                msg["id"],
+                {"history": {"t": [round(t + offset, 3) for t in times], "fields": columns}},
+            )
+        )
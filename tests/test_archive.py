@@ -0,0 +1,103 @@
+"""Tests of the memory-mapped snapshot archive."""
+import json
+from datetime import date
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from custom_components.redback.archive import ArchiveDay, SnapshotArchive  # noqa: E402
+
+DAY = date(2024, 1, 1)
+T0 = 1_704_067_200.0  # 2024-01-01 00:00 UTC
+
+
+def test_create_is_empty_and_sparse(tmp_path):
+    path = tmp_path / "day.bin"
+    day = ArchiveDay.create(path, ["a", "b"], capacity=100)
+    assert day.count == 0
+    assert path.stat().st_size == 100 * (8 + 2 * 4)
+    # nothing was written, a sparse file has no allocated blocks
+    assert getattr(path.stat(), "st_blocks", 0) * 512 < path.stat().st_size
+
+
+def test_append_and_read(tmp_path):
+    day = ArchiveDay.create(tmp_path / "day.bin", ["a", "b"], capacity=10)
+    assert day.append(T0, {"a": 1.0, "b": None})
+    assert day.append(T0 + 10, {"a": 2.0, "b": 5.0, "Status": "OK"})
+    # not after the last sample
+    assert not day.append(T0 + 10, {"a": 3.0})
+    times, columns = day.read(T0, T0 + 20, ["a", "b", "unknown"])
+    assert times.tolist() == [T0, T0 + 10]
+    assert columns["a"].tolist() == [1.0, 2.0]
+    assert np.isnan(columns["b"][0]) and columns["b"][1] == 5.0
+    assert np.isnan(columns["unknown"]).all()
+
+
+def test_full_file(tmp_path):
+    day = ArchiveDay.create(tmp_path / "day.bin", ["a"], capacity=2)
+    assert day.append(T0, {"a": 1.0})
+    assert day.append(T0 + 1, {"a": 1.0})
+    assert not day.append(T0 + 2, {"a": 1.0})
+
+
+def test_new_fields_are_added_as_columns(tmp_path):
+    path = tmp_path / "day.bin"
+    day = ArchiveDay.create(path, ["a"], capacity=10)
+    day.append(T0, {"a": 1.0, "b": None})
+    day.append(T0 + 10, {"a": 2.0, "b": 7.0})
+    assert day.fields == ["a", "b"]
+    assert json.loads(path.with_suffix(".json").read_text())["fields"] == ["a", "b"]
+    day.flush()
+    reopened = ArchiveDay.open(path, "r")
+    assert reopened.count == 2
+    _, columns = reopened.read(T0, T0 + 20, ["a", "b"])
+    assert columns["a"].tolist() == [1.0, 2.0]
+    assert np.isnan(columns["b"][0]) and columns["b"][1] == 7.0
+
+
+def test_new_day_keeps_previous_columns(tmp_path):
+    archive = SnapshotArchive(tmp_path, retention=30, capacity=10)
+    archive.append(T0, DAY, {"a": 1.0, "b": 2.0})
+    # b is missing from the first snapshot of the next day
+    archive.append(T0 + 86400, date(2024, 1, 2), {"a": 1.0, "b": None})
+    assert archive.fields() == ["a", "b"]
+    assert archive.days() == [DAY, date(2024, 1, 2)]
+
+
+def test_reopen_during_the_day(tmp_path):
+    archive = SnapshotArchive(tmp_path, retention=30, capacity=10)
+    archive.append(T0, DAY, {"a": 1.0})
+    archive.close()
+    archive = SnapshotArchive(tmp_path, retention=30, capacity=10)
+    archive.append(T0 + 10, DAY, {"a": 2.0})
+    result = archive.query(T0, T0 + 20, ["a"], 20, "mean")
+    assert result == {"timestamps": [T0], "values": {"a": [1.5]}}
+
+
+def test_purge(tmp_path):
+    archive = SnapshotArchive(tmp_path, retention=1, capacity=10)
+    archive.append(T0, DAY, {"a": 1.0})
+    archive.append(T0 + 2 * 86400, date(2024, 1, 3), {"a": 1.0})
+    assert archive.days() == [date(2024, 1, 3)]
+    assert not (tmp_path / "2024-01-01.json").exists()
+
+
+@pytest.mark.parametrize(
+    ("aggregate", "expected"),
+    [("mean", [1.5, 4.0, None]), ("min", [1.0, 4.0, None]), ("max", [2.0, 4.0, None]), ("last", [2.0, 4.0, None])],
+)
+def test_query_aggregates(tmp_path, aggregate, expected):
+    archive = SnapshotArchive(tmp_path, retention=30, capacity=10)
+    for offset, a, b in [(0, 1.0, None), (10, 2.0, None), (60, 4.0, None), (120, None, 1.0)]:
+        archive.append(T0 + offset, DAY, {"a": a, "b": b})
+    result = archive.query(T0, T0 + 180, ["a"], 60, aggregate)
+    assert result["timestamps"] == [T0, T0 + 60, T0 + 120]
+    assert result["values"]["a"] == expected
+
+
+def test_query_empty(tmp_path):
+    archive = SnapshotArchive(tmp_path, retention=30, capacity=10)
+    assert archive.query(T0, T0 + 60, ["a"], 60) == {"timestamps": [], "values": {"a": []}}
+    with pytest.raises(ValueError):
+        archive.query(T0, T0 + 60, ["a"], 60, "median")
@@ -0,0 +1,65 @@
+"""Tests of the in-memory sample ring buffer."""
+import pytest
+
+from custom_components.redback.buffer import SampleRingBuffer
+
+
+def test_append_and_read_columns():
+    buffer = SampleRingBuffer(4)
+    buffer.append(1.0, {"a": 1.0, "Status": "OK"})
+    buffer.append(2.0, {"a": 2.0, "b": 5.0})
+    assert len(buffer) == 2
+    # non-numeric fields only keep their latest snapshot
+    assert buffer.fields == ["a", "b"]
+    assert buffer.latest == {"a": 2.0, "b": 5.0}
+    times, columns = buffer.columns()
+    assert times == [1.0, 2.0]
+    assert columns == {"a": [1.0, 2.0], "b": [None, 5.0]}
+
+
+def test_wraps_around_oldest_first():
+    buffer = SampleRingBuffer(3)
+    for t in range(5):
+        buffer.append(float(t), {"a": float(t)})
+    assert len(buffer) == 3
+    assert buffer.values("a") == [2.0, 3.0, 4.0]
+    assert [t for t, _ in buffer.samples()] == [2.0, 3.0, 4.0]
+
+
+def test_missing_and_non_numeric_values_are_skipped():
+    buffer = SampleRingBuffer(4)
+    buffer.append(1.0, {"a": 1.0})
+    buffer.append(2.0, {"a": None})
+    buffer.append(3.0, {"a": True})
+    buffer.append(4.0, {})
+    assert buffer.values("a") == [1.0]
+    assert buffer.values("unknown") == []
+    assert buffer.samples()[1] == (2.0, {})
+
+
+def test_since_is_exclusive():
+    buffer = SampleRingBuffer(4)
+    for t in range(4):
+        buffer.append(float(t), {"a": float(t)})
+    assert buffer.values("a", since=1.0) == [2.0, 3.0]
+    times, columns = buffer.columns(["a"], since=2.0)
+    assert times == [3.0]
+    assert columns == {"a": [3.0]}
+
+
+@pytest.mark.parametrize(
+    ("aggregate", "expected"), [("mean", 2.0), ("min", 1.0), ("max", 3.0), ("last", 2.0)]
+)
+def test_aggregate(aggregate, expected):
+    buffer = SampleRingBuffer(4)
+    for t, value in enumerate([1.0, 3.0, 2.0]):
+        buffer.append(float(t), {"a": value})
+    assert buffer.aggregate("a", aggregate) == expected
+
+
+def test_aggregate_without_values_or_unknown():
+    buffer = SampleRingBuffer(4)
+    assert buffer.aggregate("a", "mean") is None
+    buffer.append(1.0, {"a": 1.0})
+    with pytest.raises(ValueError):
+        buffer.aggregate("a", "median")
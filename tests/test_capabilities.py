@@ -0,0 +1,61 @@
+"""Tests of the per-site capability map."""
+from custom_components.redback.capabilities import SiteCapabilities
+
+MEASURED = {
+    "VoltageInstantaneousV": True,
+    "CurrentInstantaneousA": True,
+    "PvPowerInstantaneouskW": False,
+    "BatterySoCInstantaneous0to1": False,
+    "BatteryPowerNegativeIsChargingkW": False,
+}
+
+
+def test_unknowns_are_supported():
+    capabilities = SiteCapabilities()
+    assert capabilities.has_battery
+    assert capabilities.supports("VoltageInstantaneousV_C")
+    assert capabilities.supports("BatterySoC0to100")
+
+
+def test_phase_fields_of_missing_phases():
+    capabilities = SiteCapabilities(MEASURED, 1, ["A"])
+    assert capabilities.supports("VoltageInstantaneousV_A")
+    assert not capabilities.supports("VoltageInstantaneousV_B")
+    assert not capabilities.supports("CurrentInstantaneousA_C")
+    # the site-wide value and unrelated fields with underscores are not phase fields
+    assert capabilities.supports("VoltageInstantaneousV")
+    assert capabilities.supports("battery_charge")
+
+
+def test_battery_fields_need_a_battery():
+    capabilities = SiteCapabilities(MEASURED, 0, ["A"])
+    capabilities.observe({"BatterySoCInstantaneous0to1": 0.5})
+    assert not capabilities.has_battery
+    assert not capabilities.supports("BatterySoCInstantaneous0to1")
+
+
+def test_calculated_fields_are_supported_once_reported():
+    capabilities = SiteCapabilities(MEASURED, 1, ["A"])
+    assert not capabilities.supports("PvPowerInstantaneouskW")
+    # a measured field with a transient None stays supported
+    assert capabilities.observe({"PvPowerInstantaneouskW": None, "VoltageInstantaneousV": None}) == set()
+    assert capabilities.supports("VoltageInstantaneousV")
+    assert capabilities.observe({"PvPowerInstantaneouskW": 1.2, "VoltageInstantaneousV": 240.0}) == {"PvPowerInstantaneouskW"}
+    assert capabilities.supports("PvPowerInstantaneouskW")
+    # support is never removed, and only reported once
+    assert capabilities.observe({"PvPowerInstantaneouskW": None}) == set()
+    assert capabilities.supports("PvPowerInstantaneouskW")
+
+
+def test_from_site_keeps_reported_fields():
+    capabilities = SiteCapabilities.from_site(
+        {"DynamicDataMeasured": MEASURED, "BatteryCount": 2}, ["A", "B", "C"], {"PvPowerInstantaneouskW"}
+    )
+    assert capabilities.battery_count == 2
+    assert capabilities.supports("PvPowerInstantaneouskW")
+    assert capabilities.as_dict() == {
+        "battery_count": 2,
+        "phases": ["A", "B", "C"],
+        "calculated": ["PvPowerInstantaneouskW"],
+        "unreported": ["BatteryPowerNegativeIsChargingkW", "BatterySoCInstantaneous0to1"],
+    }
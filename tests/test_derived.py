@@ -0,0 +1,105 @@
+"""Tests of the derived metrics."""
+import pytest
+
+from custom_components.redback.derived import (
+    BUILTIN_METRICS,
+    DerivedMetric,
+    DerivedMetricEngine,
+    DerivedMetricError,
+    parse_metrics,
+)
+
+
+def test_evaluate_expression():
+    metric = DerivedMetric("net", "max(a - b, 0) / 2 if a > 0 else -1", "kW")
+    assert metric.dependencies == {"a", "b"}
+    assert metric.unit == "kW"
+    assert metric.evaluate({"a": 5, "b": 1}) == 2.0
+    assert metric.evaluate({"a": 0, "b": 1}) == -1.0
+    assert metric.evaluate({"a": True, "b": 0}) == 0.5
+
+
+def test_unusable_values_evaluate_to_none():
+    metric = DerivedMetric("ratio", "a / b")
+    assert metric.evaluate({"a": 1}) is None
+    assert metric.evaluate({"a": 1, "b": None}) is None
+    assert metric.evaluate({"a": 1, "b": 0}) is None
+    assert DerivedMetric("text", "a").evaluate({"a": "OK"}) is None
+    assert DerivedMetric("flag", "a > 1").evaluate({"a": 2}) == 1.0
+
+
+@pytest.mark.parametrize(
+    "expression",
+    [
+        "a.__class__",
+        "a[0]",
+        "(lambda: 1)()",
+        "__import__('os')",
+        "open('x')",
+        "max(a, key=abs)",
+        "_secret + 1",
+        "[a]",
+        "a if",
+        "None",
+        "'a' * 9999999999",
+        "f'{a}'",
+    ],
+)
+def test_whitelist_rejects(expression):
+    with pytest.raises(DerivedMetricError):
+        DerivedMetric("m", expression)
+
+
+@pytest.mark.parametrize("name", ["1m", "if", "_m", "max", "Status", "PvPowerInstantaneouskW", "VoltageInstantaneousV_A"])
+def test_invalid_names(name):
+    with pytest.raises(DerivedMetricError):
+        DerivedMetric(name, "1")
+
+
+def test_engine_evaluates_in_dependency_order():
+    engine = DerivedMetricEngine([DerivedMetric("c", "b * 2"), DerivedMetric("b", "a + 1")])
+    assert [metric.name for metric in engine.metrics] == ["b", "c"]
+    snapshot = {"a": 1.0}
+    engine.evaluate(snapshot)
+    assert snapshot == {"a": 1.0, "b": 2.0, "c": 4.0}
+    # API fields take precedence
+    snapshot = {"a": 1.0, "b": 10.0}
+    engine.evaluate(snapshot)
+    assert snapshot["c"] == 20.0
+
+
+def test_engine_hides_non_numeric_fields():
+    engine = DerivedMetricEngine([DerivedMetric("m", "InverterMode * 9999999999"), DerivedMetric("n", "a * 2")])
+    snapshot = {"InverterMode": "Auto", "a": True}
+    engine.evaluate(snapshot)
+    assert snapshot["m"] is None
+    assert snapshot["n"] == 2.0
+
+
+def test_engine_rejects_cycles_and_duplicates():
+    with pytest.raises(DerivedMetricError, match="Circular"):
+        DerivedMetricEngine([DerivedMetric("a", "b"), DerivedMetric("b", "a")])
+    with pytest.raises(DerivedMetricError, match="more than once"):
+        DerivedMetricEngine([DerivedMetric("a", "1"), DerivedMetric("a", "2")])
+
+
+def test_parse_metrics():
+    metrics = parse_metrics("# comment\n\nself_use [%] = 100 * (1 - x / y)\nz = 1\n")
+    assert [(metric.name, metric.unit) for metric in metrics] == [("self_use", "%"), ("z", None)]
+    with pytest.raises(DerivedMetricError, match="Line 2"):
+        parse_metrics("a = 1\nb 2\n")
+    with pytest.raises(DerivedMetricError, match="Line 1: 'Status' is a Redback data field"):
+        parse_metrics("Status = 1\n")
+    with pytest.raises(DerivedMetricError, match="defined twice"):
+        parse_metrics("a = 1\na = 2\n")
+
+
+def test_builtin_site_load():
+    snapshot = {
+        "PvPowerInstantaneouskW": 3.0,
+        "BatteryPowerNegativeIsChargingkW": None,
+        "ActiveExportedPowerInstantaneouskW": 1.0,
+        "ActiveImportedPowerInstantaneouskW": 0.5,
+    }
+    DerivedMetricEngine(BUILTIN_METRICS).evaluate(snapshot)
+    assert snapshot["SiteLoadkW"] == 2.5
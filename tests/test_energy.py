@@ -0,0 +1,106 @@
+"""Tests of the energy delta engine and the period meters."""
+from datetime import date
+
+import pytest
+
+from custom_components.redback.energy import EnergyDeltaEngine, PeriodMeters
+
+
+def counters(pv, export, imported, load):
+    return {
+        "PvAllTimeEnergykWh": pv,
+        "ExportAllTimeEnergykWh": export,
+        "ImportAllTimeEnergykWh": imported,
+        "LoadAllTimeEnergykWh": load,
+    }
+
+
+def test_first_snapshot_sets_the_baselines():
+    engine = EnergyDeltaEngine()
+    assert engine.update(counters(100, 50, 20, 60)) == {"pv": 0.0, "export": 0.0, "import": 0.0, "load": 0.0}
+    deltas = engine.update(counters(101, 50.5, 20, 60.5))
+    assert deltas == {"pv": 1.0, "export": 0.5, "import": 0.0, "load": 0.5}
+    assert engine.totals["pv"] == 1.0
+
+
+def test_missing_counters_are_skipped():
+    engine = EnergyDeltaEngine()
+    engine.update(counters(100, 50, 20, 60))
+    assert engine.update({"PvAllTimeEnergykWh": 101, "LoadAllTimeEnergykWh": None}) == {"pv": 1.0}
+    # no battery attribution without all counters
+    assert engine.totals["battery_charge"] == 0.0
+
+
+def test_small_regression_keeps_the_baseline():
+    engine = EnergyDeltaEngine()
+    engine.update({"PvAllTimeEnergykWh": 100})
+    assert engine.update({"PvAllTimeEnergykWh": 99.9}) == {}
+    assert engine.update({"PvAllTimeEnergykWh": 100.5}) == {"pv": 0.5}
+
+
+def test_counter_reset():
+    engine = EnergyDeltaEngine()
+    engine.update({"PvAllTimeEnergykWh": 100})
+    assert engine.update({"PvAllTimeEnergykWh": 2}) == {"pv": 0.0}
+    assert engine.resets == 1
+    assert engine.update({"PvAllTimeEnergykWh": 3}) == {"pv": 1.0}
+
+
+def test_battery_balance_with_deadband():
+    engine = EnergyDeltaEngine()
+    engine.update(counters(100, 50, 20, 60))
+    # 0.1 kWh of rounding is carried over, not attributed
+    assert "battery_charge" not in engine.update(counters(100.1, 50, 20, 60))
+    deltas = engine.update(counters(102.1, 50, 20, 60))
+    assert deltas["battery_charge"] == pytest.approx(2.1)
+    deltas = engine.update(counters(102.1, 50, 20, 61))
+    assert deltas["battery_discharge"] == pytest.approx(1.0)
+    assert engine.totals["battery_charge"] == pytest.approx(2.1)
+
+
+def test_no_battery_balance_without_battery():
+    engine = EnergyDeltaEngine()
+    engine.battery = False
+    engine.update(counters(100, 50, 20, 60))
+    assert "battery_charge" not in engine.update(counters(105, 50, 20, 60))
+
+
+def test_restore_continues_from_the_baselines():
+    engine = EnergyDeltaEngine()
+    engine.update(counters(100, 50, 20, 60))
+    engine.update(counters(101, 50, 20, 61))
+    restored = EnergyDeltaEngine()
+    restored.restore(engine.as_dict())
+    # growth while stopped is counted
+    assert restored.update(counters(103, 50, 20, 61))["pv"] == 2.0
+    assert restored.totals["pv"] == 3.0
+
+
+def test_period_meters_roll_over():
+    meters = PeriodMeters()
+    meters.update(date(2024, 1, 31), {"pv": 2.0})
+    meters.update(date(2024, 1, 31), {"pv": 1.0})
+    assert meters.values("pv") == {"today": 3.0, "yesterday": 0.0, "this_month": 3.0}
+    meters.update(date(2024, 2, 1), {"pv": 0.5})
+    assert meters.values("pv") == {"today": 0.5, "yesterday": 3.0, "this_month": 0.5}
+    # a gap of more than a day: yesterday had nothing
+    meters.update(date(2024, 2, 3), {"pv": 1.0})
+    assert meters.values("pv") == {"today": 1.0, "yesterday": 0.0, "this_month": 1.5}
+
+
+def test_period_meters_ignore_an_earlier_date():
+    meters = PeriodMeters()
+    meters.update(date(2024, 1, 2), {"pv": 1.0})
+    meters.rollover(date(2024, 1, 1))
+    assert meters.day == date(2024, 1, 1)
+    assert meters.values("pv")["today"] == 1.0
+
+
+def test_period_meters_restore():
+    meters = PeriodMeters()
+    meters.update(date(2024, 1, 2), {"load": 4.0})
+    restored = PeriodMeters()
+    restored.restore(meters.as_dict())
+    assert restored.day == date(2024, 1, 2)
+    restored.update(date(2024, 1, 3), {"load": 1.0})
+    assert restored.values("load") == {"today": 1.0, "yesterday": 4.0, "this_month": 5.0}
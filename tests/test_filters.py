@@ -0,0 +1,139 @@
+"""Tests of the snapshot filter stages."""
+import pytest
+
+from custom_components.redback.filters import (
+    FilterChain,
+    HampelFilter,
+    MissingFilter,
+    RangeFilter,
+    SampleFilter,
+    default_filters,
+)
+
+
+def test_sample_filter_is_abstract():
+    with pytest.raises(TypeError):
+        SampleFilter()
+
+
+def test_range_filter_replaces_with_last_good_value():
+    stage = RangeFilter()
+    stage.apply({"VoltageInstantaneousV_A": 240.0})
+    snapshot = {"VoltageInstantaneousV_A": 0.0, "FrequencyInstantaneousHz": 50.0}
+    stage.apply(snapshot)
+    assert snapshot == {"VoltageInstantaneousV_A": 240.0, "FrequencyInstantaneousHz": 50.0}
+    assert stage.rejected == {"VoltageInstantaneousV_A": 1}
+
+
+def test_range_filter_drops_field_without_good_value():
+    stage = RangeFilter()
+    snapshot = {"BatterySoCInstantaneous0to1": 1.7, "Status": "OK"}
+    stage.apply(snapshot)
+    # never None: entities keep their previous state
+    assert snapshot == {"Status": "OK"}
+    assert stage.rejected == {"BatterySoCInstantaneous0to1": 1}
+
+
+def test_range_filter_ignores_unknown_and_non_numeric_fields():
+    stage = RangeFilter()
+    snapshot = {"Whatever": 1e9, "VoltageInstantaneousV": None, "InverterMode": "Auto"}
+    stage.apply(snapshot)
+    assert snapshot == {"Whatever": 1e9, "VoltageInstantaneousV": None, "InverterMode": "Auto"}
+    assert not stage.rejected
+
+
+def test_range_filter_accepts_signed_current():
+    stage = RangeFilter()
+    snapshot = {"CurrentInstantaneousA_A": -12.5, "CurrentInstantaneousA": -12.5}
+    stage.apply(snapshot)
+    assert snapshot == {"CurrentInstantaneousA_A": -12.5, "CurrentInstantaneousA": -12.5}
+    assert not stage.rejected
+
+
+def test_missing_filter_holds_previous_value():
+    stage = MissingFilter()
+    stage.apply({"BatteryPowerNegativeIsChargingkW": 1.5})
+    snapshot = {"BatteryPowerNegativeIsChargingkW": None}
+    stage.apply(snapshot)
+    assert snapshot == {"BatteryPowerNegativeIsChargingkW": 1.5}
+    assert stage.rejected == {"BatteryPowerNegativeIsChargingkW": 1}
+
+
+def test_missing_filter_keeps_none_of_sites_without_battery():
+    stage = MissingFilter()
+    for _ in range(3):
+        snapshot = {"BatteryPowerNegativeIsChargingkW": None}
+        stage.apply(snapshot)
+        assert snapshot == {"BatteryPowerNegativeIsChargingkW": None}
+    assert not stage.rejected
+
+
+def _feed(stage, values, field="VoltageInstantaneousV_A"):
+    out = []
+    for value in values:
+        snapshot = {field: value}
+        stage.apply(snapshot)
+        out.append(snapshot[field])
+    return out
+
+
+def test_hampel_filter_replaces_spike_by_median():
+    stage = HampelFilter()
+    out = _feed(stage, [240, 241, 239, 240, 242, 241, 240, 280, 241])
+    assert out == [240, 241, 239, 240, 242, 241, 240, 240, 241]
+    assert stage.rejected == {"VoltageInstantaneousV_A": 1}
+
+
+def test_hampel_filter_accepts_confirmed_level_change():
+    stage = HampelFilter()
+    out = _feed(stage, [240, 241, 239, 240, 242, 241, 240, 250, 251, 250])
+    # only the first value of the new level is replaced
+    assert out[-3:] == [240, 251, 250]
+    assert stage.rejected == {"VoltageInstantaneousV_A": 1}
+
+
+def test_hampel_filter_needs_half_a_window_first():
+    stage = HampelFilter()
+    assert _feed(stage, [240, 300, 240]) == [240, 300, 240]
+    assert not stage.rejected
+
+
+def test_hampel_filter_leaves_load_steps_alone():
+    stage = HampelFilter()
+    # e.g. a kettle switching on and off
+    values = [2.0] * 7 + [30.0, 2.0]
+    assert _feed(stage, values, field="CurrentInstantaneousA_A") == values
+    assert _feed(stage, [0.5] * 7 + [6.0], field="PvPowerInstantaneouskW")[-1] == 6.0
+    assert not stage.rejected
+
+
+def test_hampel_filter_minimum_deviation():
+    stage = HampelFilter()
+    # a constant signal has no spread, small deviations stay below the field's minimum
+    out = _feed(stage, [50.0] * 7 + [50.1, 49.9], field="FrequencyInstantaneousHz")
+    assert out[-2:] == [50.1, 49.9]
+    assert not stage.rejected
+
+
+def test_chain_counts_rejections_per_reason():
+    chain = default_filters()
+    for value in [240, 241, 239, 240, 242, 241, 240]:
+        chain.apply({"VoltageInstantaneousV_A": value, "BatteryPowerNegativeIsChargingkW": 1.0})
+    chain.apply({"VoltageInstantaneousV_A": 0.0, "BatteryPowerNegativeIsChargingkW": None})
+    chain.apply({"VoltageInstantaneousV_A": 300.0, "BatteryPowerNegativeIsChargingkW": 1.0})
+    assert chain.stats() == {
+        "range": {"VoltageInstantaneousV_A": 1},
+        "missing": {"BatteryPowerNegativeIsChargingkW": 1},
+        "outlier": {"VoltageInstantaneousV_A": 1},
+    }
+    assert chain.total == 3
+
+
+def test_chain_runs_stages_in_order():
+    # the range check runs first, an out of range value never reaches the median window
+    chain = FilterChain([RangeFilter(), HampelFilter()])
+    for value in [240.0] * 4 + [9999.0] + [240.0] * 3:
+        snapshot = {"VoltageInstantaneousV_A": value}
+        chain.apply(snapshot)
+        assert snapshot["VoltageInstantaneousV_A"] == 240.0
+    assert chain.stats() == {"range": {"VoltageInstantaneousV_A": 1}, "outlier": {}}
@@ -0,0 +1,154 @@
+"""Tests of the request governor and the single-flight helper of redbacklib."""
+import asyncio
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pytest
+
+from custom_components.redback.redbacklib import ManualClock, RedbackRateGovernor, RedbackSingleFlight
+
+
+@pytest.mark.parametrize(("value", "expected"), [(None, None), ("", None), ("30", 30.0), ("-5", 0), ("soon", None)])
+def test_parse_retry_after(value, expected):
+    assert RedbackRateGovernor.parseRetryAfter(value) == expected
+
+
+def test_parse_retry_after_http_date():
+    value = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=120), usegmt=True)
+    assert 110 <= RedbackRateGovernor.parseRetryAfter(value) <= 120
+    past = format_datetime(datetime.now(timezone.utc) - timedelta(seconds=120), usegmt=True)
+    assert RedbackRateGovernor.parseRetryAfter(past) == 0
+
+
+def test_backoff_pauses_and_recovers_linearly():
+    clock = ManualClock(1000.0)
+    governor = RedbackRateGovernor(rate=2.0, burst=5, recoveryTime=100, defaultRetryAfter=60, clock=clock)
+    assert governor.getRate() == 2.0
+    governor.backoff(30)
+    assert governor.stats["rate_limited"] == 1
+    # paused: no tokens until Retry-After has passed
+    clock.advance(20)
+    assert governor._refill() == 10
+    clock.advance(10)
+    assert governor.getRate() == 1.0
+    clock.advance(50)
+    assert governor.getRate() == pytest.approx(1.5)
+    clock.advance(50)
+    assert governor.getRate() == 2.0
+
+
+def test_backoff_uses_the_default_and_keeps_the_longest_pause():
+    clock = ManualClock()
+    governor = RedbackRateGovernor(rate=2.0, defaultRetryAfter=60, clock=clock)
+    governor.backoff()
+    governor.backoff(10)
+    assert governor._pausedUntil == 60
+    # the rate is only halved once per pause
+    assert governor.getRate() == 1.0
+
+
+def test_acquire_uses_the_burst_then_waits_in_priority_order():
+    clock = ManualClock()
+    governor = RedbackRateGovernor(rate=100.0, burst=2, clock=clock)
+    order = []
+
+    async def request(priority):
+        await governor.acquire(priority)
+        order.append(priority)
+
+    async def run():
+        await request(RedbackRateGovernor.PRIORITY_STATIC)
+        await request(RedbackRateGovernor.PRIORITY_STATIC)
+        assert governor.stats == {"granted": 2, "delayed": 0, "rate_limited": 0}
+        order.clear()
+        tasks = [
+            asyncio.ensure_future(request(priority))
+            for priority in (RedbackRateGovernor.PRIORITY_STATIC, RedbackRateGovernor.PRIORITY_CONFIG, RedbackRateGovernor.PRIORITY_AUTH)
+        ]
+        await asyncio.sleep(0.05)
+        # the clock didn't move, the bucket is empty
+        assert order == []
+        assert governor.getStats()["waiting"] == 3
+        # one token per step, the pump sleeps in real time until it's there
+        for _ in range(10):
+            if all(task.done() for task in tasks):
+                break
+            clock.advance(0.011)
+            await asyncio.sleep(0.03)
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+    assert order == [
+        RedbackRateGovernor.PRIORITY_AUTH,
+        RedbackRateGovernor.PRIORITY_CONFIG,
+        RedbackRateGovernor.PRIORITY_STATIC,
+    ]
+    assert governor.stats["delayed"] == 3
+
+
+def test_single_flight_shares_one_call():
+    flights = RedbackSingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"value": [1]}
+
+    async def run():
+        first, second = await asyncio.gather(flights.run("key", fetch, copyResult=True), flights.run("key", fetch, copyResult=True))
+        assert not flights.inFlight("key")
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert len(calls) == 1
+    assert first == second
+    # each caller got its own copy
+    assert first is not second
+
+
+def test_single_flight_propagates_errors_and_starts_over():
+    flights = RedbackSingleFlight()
+    calls = []
+
+    async def fail():
+        calls.append(1)
+        await asyncio.sleep(0)
+        raise RuntimeError("boom")
+
+    async def run():
+        results = await asyncio.gather(flights.run("key", fail), flights.run("key", fail), return_exceptions=True)
+        assert all(isinstance(result, RuntimeError) for result in results)
+        with pytest.raises(RuntimeError):
+            await flights.run("key", fail)
+
+    asyncio.run(run())
+    assert len(calls) == 2
+
+
+def test_single_flight_only_cancels_without_waiters():
+    flights = RedbackSingleFlight()
+    started = []
+
+    async def slow():
+        started.append(1)
+        await asyncio.sleep(0.05)
+        return 1
+
+    async def run():
+        first = asyncio.ensure_future(flights.run("key", slow))
+        second = asyncio.ensure_future(flights.run("key", slow))
+        await asyncio.sleep(0)
+        first.cancel()
+        # the other caller still gets the shared result
+        assert await second == 1
+        third = asyncio.ensure_future(flights.run("key", slow))
+        await asyncio.sleep(0)
+        third.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await third
+        await asyncio.sleep(0)
+        assert not flights.inFlight("key")
+
+    asyncio.run(run())
+    assert len(started) == 2
@@ -0,0 +1,58 @@
+"""Tests of the rolling-window statistics."""
+from custom_components.redback.rolling import RollingStatistics
+
+
+def test_empty_window():
+    stats = RollingStatistics(["a"], 60)
+    assert len(stats) == 0
+    assert stats.mean("a") is None
+    assert stats.peak("a") is None
+    assert stats.percentile("a", 95) is None
+
+
+def test_mean_peak_and_percentile():
+    stats = RollingStatistics(["a", "b"], 60)
+    for t, value in enumerate([4.0, 1.0, 3.0, 2.0]):
+        stats.add(float(t), {"a": value})
+    assert len(stats) == 4
+    assert stats.mean("a") == 2.5
+    assert stats.peak("a") == 4.0
+    # nearest rank
+    assert stats.percentile("a", 50) == 2.0
+    assert stats.percentile("a", 100) == 4.0
+    assert stats.percentile("a", 0) == 1.0
+    # a field without values
+    assert stats.mean("b") is None
+
+
+def test_old_samples_leave_the_window():
+    stats = RollingStatistics(["a"], 10)
+    stats.add(0.0, {"a": 9.0})
+    stats.add(5.0, {"a": 1.0})
+    stats.add(10.0, {"a": 3.0})
+    # the sample at 0 is exactly one duration old
+    assert len(stats) == 2
+    assert stats.mean("a") == 2.0
+    assert stats.peak("a") == 3.0
+    assert stats.percentile("a", 50) == 1.0
+
+
+def test_missing_values_are_not_counted():
+    stats = RollingStatistics(["a"], 10)
+    stats.add(0.0, {"a": None})
+    stats.add(1.0, {})
+    stats.add(2.0, {"a": 4.0})
+    assert stats.mean("a") == 4.0
+    stats.add(20.0, {"a": None})
+    assert len(stats) == 1
+    assert stats.mean("a") is None
+    assert stats.peak("a") is None
+
+
+def test_peak_follows_the_window():
+    stats = RollingStatistics(["a"], 3)
+    peaks = []
+    for t, value in enumerate([5.0, 4.0, 3.0, 2.0, 6.0, 1.0]):
+        stats.add(float(t), {"a": value})
+        peaks.append(stats.peak("a"))
+    assert peaks == [5.0, 5.0, 5.0, 4.0, 6.0, 6.0]
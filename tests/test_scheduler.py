@@ -0,0 +1,83 @@
+"""Tests of the refresh scheduler and the adaptive polling policy."""
+import pytest
+
+from custom_components.redback.scheduler import AdaptivePollingPolicy, RedbackRefreshScheduler
+
+QUIET = {
+    "PvPowerInstantaneouskW": 0.0,
+    "BatteryPowerNegativeIsChargingkW": 0.0,
+    "ActiveNetPowerInstantaneouskW": -0.4,
+    "Status": "OK",
+}
+
+
+def test_sites_are_spread_evenly():
+    scheduler = RedbackRefreshScheduler()
+    sites = [f"S{n}" for n in range(4)]
+    for site in sites:
+        scheduler.add(site)
+    scheduler.add("S0")
+    assert len(scheduler) == 4
+    phases = sorted(scheduler.phase(site) for site in sites)
+    gaps = [(b - a) % 1 for a, b in zip(phases, phases[1:] + phases[:1])]
+    assert gaps == pytest.approx([0.25] * 4)
+
+
+def test_phases_are_stable_and_removal_frees_a_slot():
+    first, second = RedbackRefreshScheduler(), RedbackRefreshScheduler()
+    for site in ["A", "B", "C"]:
+        first.add(site)
+    for site in ["C", "B", "A"]:
+        second.add(site)
+    assert [first.phase(site) for site in "ABC"] == [second.phase(site) for site in "ABC"]
+    first.remove("B")
+    first.remove("B")
+    assert len(first) == 2
+    assert abs(first.phase("A") - first.phase("C")) % 1 == pytest.approx(0.5)
+
+
+def test_unregistered_site_has_a_phase():
+    scheduler = RedbackRefreshScheduler()
+    scheduler.add("A")
+    scheduler.add("B")
+    scheduler.remove("B")
+    # e.g. a refresh scheduled while the entry unloads
+    assert 0 <= scheduler.phase("B") < 1
+
+
+def test_next_refresh_is_on_the_grid_and_not_too_close():
+    scheduler = RedbackRefreshScheduler()
+    scheduler.add("A")
+    offset = scheduler.phase("A") * 60
+    slot = scheduler.next_refresh("A", 60, 6000.0)
+    assert (slot - offset) % 60 == pytest.approx(0) or (slot - offset) % 60 == pytest.approx(60)
+    assert 30 <= slot - 6000.0 < 90
+    # just before the slot, the one after is taken
+    assert scheduler.next_refresh("A", 60, slot - 1) == pytest.approx(slot + 60)
+
+
+def test_policy_stretches_while_quiet():
+    policy = AdaptivePollingPolicy(60, 600, patience=2)
+    intervals = [policy.update(QUIET) for _ in range(7)]
+    # the first sample has no previous grid power to compare with
+    assert intervals == [60, 60, 60, 120, 240, 480, 600]
+    active = {**QUIET, "PvPowerInstantaneouskW": 1.2}
+    assert policy.update(active) == 60
+    assert policy.quiet_samples == 0
+
+
+def test_policy_grid_change_and_offline():
+    policy = AdaptivePollingPolicy(60, 600, patience=0)
+    policy.update(QUIET)
+    assert policy.update({**QUIET, "ActiveNetPowerInstantaneouskW": 1.0}) == 60
+    assert policy.update({"Status": "Offline"}) == 120
+    # private API snapshots have no power fields
+    assert policy.update({"Status": "OK"}) == 60
+
+
+def test_policy_reset():
+    policy = AdaptivePollingPolicy(60, 600, patience=0)
+    for _ in range(3):
+        policy.update(QUIET)
+    policy.reset(30)
+    assert (policy.interval, policy.quiet_samples) == (30, 0)